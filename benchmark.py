@@ -0,0 +1,316 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from fire import Fire
+from moviepy.config import get_setting
+from moviepy.editor import VideoClip
+
+from deep_poop.analytics.analysis_cache import AnalysisCache
+from deep_poop.effects.effect import Effect, EffectType
+from deep_poop.effects.audio.echo import echo
+from deep_poop.effects.audio.pitch import FAST_RES_TYPE, pitch_shift
+from deep_poop.effects.audio.robotify import oscillating_robotify, robotify
+from deep_poop.clips.frame_info import FrameInfo
+from deep_poop.effects.image.bulge import bulge_frame
+from deep_poop.effects.image.swirl import swirl_map
+from deep_poop.effects.utils import audio_to_frames, frames_to_audio
+from deep_poop.render_plan import RenderPlan
+from deep_poop.scene import Scene, VideoCache
+from deep_poop.scene_cutter import SceneCutter
+from deep_poop.utils import combine_video_clips
+from benchmarks.reference import (
+    legacy_bulge,
+    legacy_echo,
+    legacy_oscillating_robotify,
+    legacy_pitch,
+    legacy_robotify,
+)
+
+RESOLUTIONS = {
+    "480p": (480, 854),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+}
+
+
+def frames_per_second(fn, frames: int) -> float:
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return frames / (time.perf_counter() - start)
+
+
+def random_frame(resolution: str) -> np.ndarray:
+    height, width = RESOLUTIONS[resolution]
+    return np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def bulge(frames: int = 20, legacy_frames: int = 2, radius: float = 0.25):
+    """Compares frames/sec of per pixel and vectorized bulging.
+
+    Args:
+        frames (int): Amount of frames to time the vectorized version with
+        legacy_frames (int): Amount of frames to time the per pixel version with
+        radius (float): Radius relative to the longest side of the frame
+    """
+    for resolution in RESOLUTIONS:
+        frame = random_frame(resolution)
+        height, width = frame.shape[:2]
+        center = (width / 2, height / 2)
+        r = radius * max(height, width)
+        before = frames_per_second(
+            lambda: legacy_bulge(frame, center, r, 5), legacy_frames
+        )
+        after = frames_per_second(lambda: bulge_frame(frame, center, r, 5), frames)
+        print(
+            f"bulge {resolution}: {before:.2f} -> {after:.2f} frames/s ({after / before:.0f}x)"
+        )
+
+
+def swirl(frames: int = 20, radius: float = 0.2, strength: float = 8):
+    """Compares per frame time of skimage swirl and remapping with a swirl map.
+
+    Args:
+        frames (int): Amount of frames to time each version with
+        radius (float): Radius relative to the longest side of the frame
+        strength (float): Strength of swirl
+    """
+    from skimage.transform import swirl as skimage_swirl
+
+    for resolution in RESOLUTIONS:
+        frame = random_frame(resolution)
+        height, width = frame.shape[:2]
+        center = (width / 2, height / 2)
+        r = radius * max(height, width)
+        warp_map = swirl_map(frame.shape, center, r, strength)
+        timings = {
+            "skimage": frames_per_second(
+                lambda: skimage_swirl(frame, center, strength=strength, radius=r) * 255,
+                frames,
+            ),
+            "remap": frames_per_second(
+                lambda: swirl_map(frame.shape, center, r, strength).apply(frame),
+                frames,
+            ),
+            "cached remap": frames_per_second(lambda: warp_map.apply(frame), frames),
+        }
+        print(
+            f"swirl {resolution}: "
+            + ", ".join(f"{k} {1000 / fps:.1f} ms/frame" for k, fps in timings.items())
+        )
+
+
+def seconds(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def analysis_cache(minutes: float = 30, fps: float = 30, subscene: int = 90):
+    """Compares write and load time of the pickled and the columnar analysis cache.
+
+    The pickled cache is timed with metadata only frames. With decoded frames attached,
+    as stored by the pickled cache, its times grow with the size of the raw video.
+
+    Args:
+        minutes (float): Length of source video in minutes
+        fps (float): Frames per second of source video
+        subscene (int): Amount of frames analyzed in a single write
+    """
+    frame_count = int(minutes * 60 * fps)
+    frames = [FrameInfo([(10, 60, 60, 10)] * (i % 3)) for i in range(frame_count)]
+    start = frame_count // 2
+    with tempfile.TemporaryDirectory() as work_dir:
+        legacy_file = os.path.join(work_dir, "cache.pickle")
+        legacy_cache = VideoCache(legacy_file, frames)
+        legacy_write = seconds(
+            lambda: legacy_cache.write(start, frames[start : start + subscene])
+        )
+        legacy_load = seconds(lambda: VideoCache.from_file(legacy_file).read(0, 1))
+        cache_dir = os.path.join(work_dir, "analysis")
+        AnalysisCache.open(cache_dir, frame_count).write(0, frames)
+        cache = AnalysisCache.open(cache_dir, frame_count)
+        write = seconds(lambda: cache.write(start, frames[start : start + subscene]))
+        load = seconds(
+            lambda: AnalysisCache.open(cache_dir, frame_count).read(
+                start, start + subscene
+            )
+        )
+    print(f"analysis cache {minutes} min, {frame_count} frames:")
+    print(f"  write {subscene} frames: {legacy_write:.4f} s -> {write:.4f} s")
+    print(f"  load scene: {legacy_load:.4f} s -> {load:.4f} s")
+
+
+def audio(duration: float = 10, legacy_duration: float = 1, fps: int = 44100):
+    """Compares samples/sec of per sample and vectorized audio effects on stereo audio.
+
+    Args:
+        duration (float): Seconds of audio to time the vectorized versions with
+        legacy_duration (float): Seconds of audio to time the per sample versions with
+        fps (int): Sample rate of audio
+    """
+    effects = {
+        "echo": (
+            lambda s: legacy_echo(s, int(0.05 * fps), 0.7),
+            lambda s: echo(s, int(0.05 * fps), 0.7),
+        ),
+        "robotify": (
+            lambda s: legacy_robotify(s, 11),
+            lambda s: robotify(s, 11),
+        ),
+        "oscillating robotify": (
+            lambda s: legacy_oscillating_robotify(s, fps, 2, 300, 275),
+            lambda s: oscillating_robotify(s, fps, 2, 300, 275),
+        ),
+    }
+    for name, (legacy, vectorized) in effects.items():
+        legacy_samples = np.random.uniform(-1, 1, (int(legacy_duration * fps), 2))
+        samples = np.random.uniform(-1, 1, (int(duration * fps), 2))
+        before = len(legacy_samples) / seconds(lambda: legacy(legacy_samples))
+        after = len(samples) / seconds(lambda: vectorized(samples))
+        print(
+            f"{name}: {before:,.0f} -> {after:,.0f} samples/s ({after / before:.0f}x)"
+        )
+
+
+def pitch(duration: float = 2, steps: float = 7, fps: int = 44100):
+    """Compares time of a pitch shift through temporary files and in memory.
+
+    Args:
+        duration (float): Seconds of stereo audio to shift
+        steps (float): Semitone steps to shift
+        fps (int): Sample rate of audio
+    """
+    audio = frames_to_audio(np.random.uniform(-1, 1, (int(duration * fps), 2)), fps)
+    # Warm up librosa so that its one time setup is not timed
+    pitch_shift(audio_to_frames(audio)[:fps], fps, steps)
+    timings = {
+        "temporary files": seconds(lambda: legacy_pitch(audio, steps)),
+        "in memory": seconds(lambda: pitch_shift(audio_to_frames(audio), fps, steps)),
+        "in memory fast": seconds(
+            lambda: pitch_shift(
+                audio_to_frames(audio), fps, steps, res_type=FAST_RES_TYPE
+            )
+        ),
+    }
+    print(
+        f"pitch {duration}s: "
+        + ", ".join(f"{k} {t * 1000:.0f} ms" for k, t in timings.items())
+    )
+
+
+class _SplicedEffect(Effect):
+    """Effect of no composited kind, which RenderPlan splices into the rendered clip."""
+
+    def __init__(self, clip: VideoClip):
+        super(_SplicedEffect, self).__init__(1, EffectType.IMAGE)
+        self.clip = clip
+
+    def effect_function(self, scene: Scene, workers: int) -> VideoClip:
+        return self.clip.set_duration(scene.length())
+
+
+def splice(effects: int = 10, duration: float = 60, fps: int = 30, lookups: int = 300):
+    """Compares per frame get_frame latency of a scene with effects spliced in by
+    RenderPlan and with the same effects spliced in by nesting concatenated clips.
+
+    Clips return a constant frame so that only the lookup through the edits is timed.
+
+    Args:
+        effects (int): Amount of effect clips spliced into the scene
+        duration (float): Length of scene in seconds
+        fps (int): Frames per second of scene
+        lookups (int): Amount of random frames to look up
+    """
+    image = random_frame("480p")
+
+    def constant_clip(length: float) -> VideoClip:
+        clip = VideoClip(lambda t: image, duration=length).set_fps(fps)
+        silence = np.zeros((int(length * 44100), 2))
+        return clip.set_audio(frames_to_audio(silence, 44100))
+
+    scene = Scene(video_clip=constant_clip(duration))
+    scene.frames = [FrameInfo([]) for _ in range(scene.frame_length())]
+    plan = RenderPlan(scene)
+    nested = scene.clip
+    for start in np.linspace(0, duration - 1, effects):
+        start = int(start * fps) / fps
+        end = start + 0.5
+        plan.add(_SplicedEffect(constant_clip(0.5)), start, end, 1)
+        nested = combine_video_clips(
+            [nested.subclip(0, start), constant_clip(0.5), nested.subclip(end)]
+        ).set_fps(fps)
+    flat = plan.render()
+    times = np.random.uniform(0, duration - 1 / fps, lookups)
+    timings = {}
+    for name, clip in (("nested", nested), ("flat", flat)):
+        timings[name] = seconds(lambda: [clip.get_frame(t) for t in times]) / lookups
+    print(
+        f"get_frame with {effects} spliced effects: "
+        f"{timings['nested'] * 1e6:.0f} us -> {timings['flat'] * 1e6:.0f} us"
+    )
+
+
+def scene_detection(
+    duration: float = 120,
+    resolution: str = "1080p",
+    processes: tuple = (1, 2, 4),
+    threshold: float = 30,
+    min_len: int = 15,
+):
+    """Compares wall time of scene detection in one pass and in time ranges detected by
+    parallel processes, on a generated video with a cut every two seconds.
+
+    Args:
+        duration (float): Length of generated video in seconds
+        resolution (str): Resolution of generated video
+        processes (tuple): Amounts of processes to time
+        threshold (float): Scene detection threshold
+        min_len (int): Minimum length of scenes in frames
+    """
+    height, width = RESOLUTIONS[resolution]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        video_file = os.path.join(tmpdir, "cuts.mp4")
+        source = (
+            f"testsrc2=size={width}x{height}:rate=30:duration={duration},"
+            "hue=H=2*PI*floor(t/2)/5"
+        )
+        subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-v", "error", "-f", "lavfi", "-i", source]
+            + ["-pix_fmt", "yuv420p", "-preset", "ultrafast", video_file],
+            check=True,
+        )
+        work_dir = os.path.join(tmpdir, "work")
+        scene_lists = {}
+        for amount in processes:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            cutter = SceneCutter(threshold, 0, min_len, 0, work_dir, processes=amount)
+            elapsed = seconds(
+                lambda: scene_lists.setdefault(
+                    amount, cutter.split_scenes(video_file, threshold, min_len)
+                )
+            )
+            equal = scene_lists[amount] == scene_lists[processes[0]]
+            print(
+                f"scene detection {duration}s {resolution}, {amount} processes: "
+                f"{elapsed:.2f} s, {len(scene_lists[amount])} scenes"
+                + ("" if equal else " (scenes differ)")
+            )
+
+
+if __name__ == "__main__":
+    Fire(
+        {
+            "bulge": bulge,
+            "swirl": swirl,
+            "analysis_cache": analysis_cache,
+            "audio": audio,
+            "pitch": pitch,
+            "splice": splice,
+            "scene_detection": scene_detection,
+        }
+    )
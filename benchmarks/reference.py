@@ -0,0 +1,87 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+
+
+def legacy_bulge(
+    image: np.ndarray, center: tuple, radius: float, strength: float
+) -> np.ndarray:
+    """Per pixel reference implementation of bulging, kept to verify
+    and benchmark the vectorized version against."""
+    height, width = image.shape[:2]
+    center_width, center_height = center
+    dst = image.copy()
+    for y in range(len(image)):
+        v = y - center_height
+        if abs(v) > radius:
+            continue
+        x_start = max(0, math.floor(-math.sqrt(radius ** 2 - v ** 2) + center_width))
+        x_end = min(width, math.ceil(math.sqrt(radius ** 2 - v ** 2) + center_width))
+        for x in range(x_start, x_end):
+            u = x - center_width
+            r = math.sqrt(u ** 2 + v ** 2)
+            r = 1 - r / radius
+            if r > 0:
+                r2 = 1 - strength * r * r
+                xp = u * r2
+                yp = v * r2
+
+                src_y = max(0, min(int(yp + center_height), height - 1))
+                src_x = max(0, min(int(xp + center_width), width - 1))
+
+                dst[y][x] = image[src_y][src_x]
+    return dst
+
+
+def legacy_echo(samples: np.ndarray, delay: int, strength: float) -> np.ndarray:
+    """Per sample reference implementation of echo, kept to verify
+    and benchmark the vectorized version against."""
+    samples = samples.copy()
+    for i in range(len(samples) - delay):
+        samples[i] += samples[i - delay] * strength
+    return samples
+
+
+def legacy_robotify(samples: np.ndarray, frequency: float) -> np.ndarray:
+    """Per sample reference implementation of robotify."""
+    samples = samples.copy()
+    for t in range(len(samples)):
+        samples[t] *= math.sin(t / frequency)
+    return samples
+
+
+def legacy_oscillating_robotify(
+    samples: np.ndarray,
+    fps: int,
+    min_freq: float,
+    max_freq: float,
+    oscillation: float,
+) -> np.ndarray:
+    """Per sample reference implementation of oscillating robotify."""
+    samples = samples.copy()
+    for t in range(len(samples)):
+        frequency = min_freq + (max_freq - min_freq) * math.sin(t / (oscillation * fps))
+        samples[t] *= math.sin(t / frequency)
+    return samples
+
+
+def legacy_pitch(audio, steps: float):
+    """Temporary file based reference implementation of pitch shifting,
+    kept to benchmark the in memory version against."""
+    import librosa
+    import soundfile as sf
+    from moviepy.audio.io.AudioFileClip import AudioFileClip
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp_file = os.path.join(tmpdir, "tmp.wav")
+        pitched_file = os.path.join(tmpdir, "pitched.wav")
+        audio.write_audiofile(tmp_file, logger=None)
+        y, sr = librosa.core.load(tmp_file, sr=audio.fps)
+        y_shifted = librosa.effects.pitch_shift(y, sr=sr, n_steps=steps)
+        sf.write(pitched_file, y_shifted, sr, "PCM_24")
+        pitched = AudioFileClip(pitched_file)
+        # Read samples before the temporary directory is removed
+        pitched.to_soundarray(buffersize=len(y_shifted) + 1)
+        return pitched
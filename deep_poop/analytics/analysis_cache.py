@@ -0,0 +1,232 @@
+from typing import List
+import os
+import pickle
+
+import numpy as np
+
+from deep_poop.clips.frame_info import FrameInfo
+
+MAX_FACES = 16
+
+JOURNAL_RECORD = np.dtype(
+    [
+        ("index", np.int64),
+        ("face_count", np.uint8),
+        ("faces", np.int32, (MAX_FACES, 4)),
+    ]
+)
+
+
+class AnalysisStats:
+    """Counts frames decoded for analysis and frames whose analysis was served from cache."""
+
+    def __init__(self):
+        self.decoded = 0
+        self.cached = 0
+
+    def stats(self) -> dict:
+        total = self.decoded + self.cached
+        return {
+            "decoded": self.decoded,
+            "cached": self.cached,
+            "cached_rate": self.cached / total if total > 0 else 0.0,
+        }
+
+
+ANALYSIS_STATS = AnalysisStats()
+
+
+class AnalysisCache:
+    """Columnar on-disk cache of per frame analysis results of a video.
+
+    Each column is a NumPy array file in the cache directory which is memory mapped on
+    load. Written frames are appended to a journal file and kept in memory, where reads
+    see them over the mapped columns. The journal is replayed on load and only written
+    to the column files when compacting, once it holds enough records.
+
+    Columns:
+        analyzed (bool): Whether frame has been analyzed
+        face_counts (uint8): Amount of faces in frame
+        faces (int32): Face boxes (top, right, bottom, left) of frame, padded to MAX_FACES
+
+    Args:
+        directory (str): Directory of cache files
+        frame_count (int): Amount of frames in video
+        mode (str, optional): Memory map mode. "w+" creates a new empty cache (Defaults to "r+")
+        compact_after (int, optional): Amount of journal records after which to compact (Defaults to 4096)
+    """
+
+    COLUMNS = {
+        "analyzed": (np.bool_, ()),
+        "face_counts": (np.uint8, ()),
+        "faces": (np.int32, (MAX_FACES, 4)),
+    }
+
+    def __init__(
+        self,
+        directory: str,
+        frame_count: int,
+        mode: str = "r+",
+        compact_after: int = 4096,
+    ):
+        self.directory = directory
+        self.compact_after = compact_after
+        if mode == "w+" and not os.path.exists(directory):
+            os.makedirs(directory)
+        columns = {}
+        for name, (dtype, shape) in self.COLUMNS.items():
+            columns[name] = np.lib.format.open_memmap(
+                self._column_file(name),
+                mode=mode,
+                dtype=dtype,
+                shape=(frame_count,) + shape,
+            )
+        self.analyzed = columns["analyzed"]
+        self.face_counts = columns["face_counts"]
+        self.faces = columns["faces"]
+        self.journal_file = os.path.join(directory, "journal.bin")
+        if mode == "w+":
+            self._truncate_journal()
+        else:
+            self._replay_journal()
+
+    @classmethod
+    def open(
+        cls, directory: str, frame_count: int, legacy_file: str = None
+    ) -> "AnalysisCache":
+        """Opens a cache, creating it if it does not exist or does not match the video.
+
+        Args:
+            directory (str): Directory of cache files
+            frame_count (int): Amount of frames in video
+            legacy_file (str, optional): Pickled VideoCache to migrate if no cache exists yet
+
+        Returns:
+            AnalysisCache: Opened cache
+        """
+        if cls.exists(directory):
+            cache = cls(directory, frame_count)
+            if len(cache) == frame_count:
+                return cache
+            print(
+                f"WARNING: Cache {directory} contained invalid amount of frames. Recreating cache..."
+            )
+            del cache
+        cache = cls(directory, frame_count, mode="w+")
+        if legacy_file is not None and os.path.exists(legacy_file):
+            print(f"INFO: Migrating analysis cache {legacy_file} to {directory}")
+            cache.migrate(legacy_file)
+        return cache
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return all(
+            os.path.exists(os.path.join(directory, f"{name}.npy"))
+            for name in cls.COLUMNS
+        )
+
+    def __len__(self) -> int:
+        return len(self.analyzed)
+
+    def _column_file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def migrate(self, legacy_file: str):
+        """Copies analysis results of a pickled VideoCache into this cache.
+
+        Args:
+            legacy_file (str): Path to pickled VideoCache
+        """
+        with open(legacy_file, "rb") as f:
+            legacy_cache = pickle.load(f)
+        frames = legacy_cache.frames[: len(self)]
+        self.write(0, [None if f is None else f.metadata() for f in frames])
+
+    def read(self, from_frame: int, to_frame: int) -> List[FrameInfo]:
+        """Reads analysis results of a frame range.
+
+        Args:
+            from_frame (int): First frame of range
+            to_frame (int): End of range (exclusive)
+
+        Returns:
+            List[FrameInfo]: Metadata of each frame in range or None if not analyzed
+        """
+        analyzed = self.analyzed[from_frame:to_frame]
+        face_counts = self.face_counts[from_frame:to_frame]
+        faces = self.faces[from_frame:to_frame]
+        frames = [None] * len(analyzed)
+        for i in np.flatnonzero(analyzed):
+            frames[i] = self._frame_info(face_counts[i], faces[i])
+        indices = self._journal["index"]
+        in_range = (indices >= from_frame) & (indices < from_frame + len(frames))
+        # Records are in journal order, so later writes of a frame replace earlier ones
+        for record in self._journal[in_range]:
+            frames[record["index"] - from_frame] = self._frame_info(
+                record["face_count"], record["faces"]
+            )
+        return frames
+
+    def write(self, from_frame: int, frames: List[FrameInfo]):
+        """Writes analysis results of a frame range, skipping frames which are None.
+
+        Args:
+            from_frame (int): Index of first frame
+            frames (List[FrameInfo]): Analyzed frames
+        """
+        frames = frames[: max(len(self) - from_frame, 0)]
+        indices = [from_frame + i for i, f in enumerate(frames) if f is not None]
+        self.write_frames(indices, [f for f in frames if f is not None])
+
+    def write_frames(self, indices: List[int], frames: List[FrameInfo]):
+        """Appends analysis results of frames to the journal.
+
+        Args:
+            indices (List[int]): Index of each frame in video
+            frames (List[FrameInfo]): Analyzed frames
+        """
+        if len(frames) == 0:
+            return
+        records = np.zeros(len(frames), dtype=JOURNAL_RECORD)
+        records["index"] = indices
+        for record, frame in zip(records, frames):
+            face_locations = frame.face_locations[:MAX_FACES]
+            record["face_count"] = len(face_locations)
+            if len(face_locations) > 0:
+                record["faces"][: len(face_locations)] = face_locations
+        with open(self.journal_file, "ab") as f:
+            records.tofile(f)
+        self._journal = np.concatenate([self._journal, records])
+        self.journal_records += len(records)
+        if self.journal_records >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Writes all journaled results to the column files and empties the journal."""
+        records = self._journal
+        self.face_counts[records["index"]] = records["face_count"]
+        self.faces[records["index"]] = records["faces"]
+        self.analyzed[records["index"]] = True
+        for column in (self.analyzed, self.face_counts, self.faces):
+            column.flush()
+        self._truncate_journal()
+
+    @staticmethod
+    def _frame_info(face_count: int, faces: np.ndarray) -> FrameInfo:
+        return FrameInfo([tuple(box) for box in faces[:face_count].tolist()])
+
+    def _replay_journal(self):
+        self._journal = np.zeros(0, dtype=JOURNAL_RECORD)
+        self.journal_records = 0
+        if not os.path.exists(self.journal_file):
+            return
+        # Ignore a partially written last record
+        count = os.path.getsize(self.journal_file) // JOURNAL_RECORD.itemsize
+        records = np.fromfile(self.journal_file, dtype=JOURNAL_RECORD, count=count)
+        self._journal = records[records["index"] < len(self)]
+        self.compact()
+
+    def _truncate_journal(self):
+        open(self.journal_file, "wb").close()
+        self._journal = np.zeros(0, dtype=JOURNAL_RECORD)
+        self.journal_records = 0
@@ -0,0 +1,67 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+def analysis_downscale(width: int, analysis_width: int = None) -> int:
+    """Picks the integer downscale factor bringing a source closest to an analysis width
+    without going below it.
+
+    Args:
+        width (int): Width of source frames
+        analysis_width (int, optional): Desired width of analyzed frames. If None analyze frames at source resolution (Defaults to None)
+
+    Returns:
+        int: Downscale factor, 1 to keep source resolution
+    """
+    if analysis_width is None:
+        return 1
+    if analysis_width <= 0:
+        raise ValueError("Analysis width must be positive")
+    return max(1, int(width) // int(analysis_width))
+
+
+def downscale_image(image: np.ndarray, factor: int) -> np.ndarray:
+    """Shrinks an image by a downscale factor, averaging the pixels of each area.
+
+    Args:
+        image (np.ndarray): Image
+        factor (int): Downscale factor
+
+    Returns:
+        np.ndarray: Shrunk image, or the same image if factor is 1
+    """
+    if factor <= 1:
+        return image
+    height, width = image.shape[:2]
+    size = (max(1, width // factor), max(1, height // factor))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def upscale_faces(
+    faces: List[tuple], image_size: Tuple[int, int], analyzed_size: Tuple[int, int]
+) -> List[tuple]:
+    """Rescales face boxes found in a downscaled image to coordinates of the source.
+
+    Args:
+        faces (List[tuple]): Face boxes (top, right, bottom, left) in analyzed image
+        image_size (Tuple[int, int]): Width and height of source image
+        analyzed_size (Tuple[int, int]): Width and height of analyzed image
+
+    Returns:
+        List[tuple]: Face boxes (top, right, bottom, left) in source image
+    """
+    if tuple(image_size) == tuple(analyzed_size):
+        return faces
+    scale_x = image_size[0] / analyzed_size[0]
+    scale_y = image_size[1] / analyzed_size[1]
+    return [
+        (
+            int(round(top * scale_y)),
+            int(round(right * scale_x)),
+            int(round(bottom * scale_y)),
+            int(round(left * scale_x)),
+        )
+        for top, right, bottom, left in faces
+    ]
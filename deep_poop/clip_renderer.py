@@ -0,0 +1,148 @@
+import multiprocessing
+from typing import List
+
+from moviepy.editor import VideoClip, VideoFileClip
+
+from deep_poop.effects.warp import WARP_MAP_CACHE
+from deep_poop.pipe_writer import PipeWriter, stream_clip
+from deep_poop.render_cache import RenderCache
+from deep_poop.render_plan import RenderPlan
+
+# Source video of a worker process, opened once per process
+_source_clip: VideoClip = None
+
+
+class PlannedClip:
+    """Clip of the output video planned in the main process.
+
+    Args:
+        plan (RenderPlan): Detached plan of effects on a scene
+        seed (int): Seed of random choices made planning the clip
+        path (str): File to write rendered clip to
+        max_frames (int): Maximum amount of frames to write
+    """
+
+    def __init__(self, plan: RenderPlan, seed: int, path: str, max_frames: int):
+        self.plan = plan
+        self.seed = seed
+        self.path = path
+        self.max_frames = max_frames
+        self.cache: RenderCache = None
+        self.cache_key: str = None
+        self.cached: str = None
+
+    def use_cache(self, cache: RenderCache) -> "PlannedClip":
+        """Looks up the clip in a render cache, which it is stored in when rendered.
+
+        Args:
+            cache (RenderCache): Render cache. If None render without cache
+
+        Returns:
+            PlannedClip: This clip
+        """
+        self.cache = cache
+        if cache is not None:
+            self.cache_key = cache.key(self.plan, self.seed)
+            self.cached = cache.get(self.cache_key)
+        return self
+
+
+def render_clips(
+    clips: List[PlannedClip], video_file: str, processes: int
+) -> List[int]:
+    """Renders planned clips to their files in parallel worker processes.
+
+    Args:
+        clips (List[PlannedClip]): Planned clips
+        video_file (str): Source video the clips were planned on
+        processes (int): Amount of worker processes
+
+    Returns:
+        List[int]: Amount of frames written of each clip
+    """
+    # Started from a server process like FramePool workers, so that workers do not
+    # inherit open pipes of video readers and writers of this process
+    context = multiprocessing.get_context("forkserver")
+    with context.Pool(
+        processes, initializer=_open_source, initargs=(video_file,)
+    ) as pool:
+        # Clips differ a lot in render time, so hand them out one at a time
+        results = pool.map(_render_clip_counted, clips, chunksize=1)
+    for _, counts in results:
+        WARP_MAP_CACHE.merge(counts)
+    return [frames for frames, _ in results]
+
+
+def _open_source(video_file: str):
+    global _source_clip
+    _source_clip = VideoFileClip(video_file)
+
+
+def _render_clip_counted(clip: PlannedClip) -> tuple:
+    # Effects of a worker look up warp maps in its own shared cache, so its counts are
+    # returned to be merged into the shared cache of the main process
+    before = WARP_MAP_CACHE.counts()
+    frames = render_clip(clip)
+    after = WARP_MAP_CACHE.counts()
+    return frames, tuple(a - b for a, b in zip(after, before))
+
+
+def render_clip(clip: PlannedClip, source_clip: VideoClip = None) -> int:
+    """Renders a planned clip to its file.
+
+    Args:
+        clip (PlannedClip): Planned clip
+        source_clip (VideoClip, optional): Source video. If None use the one of this worker process
+
+    Returns:
+        int: Amount of frames written
+    """
+    source_clip = source_clip or _source_clip
+    plan = None if clip.cached is not None else clip.plan.attached(source_clip)
+    with PipeWriter(clip.path, source_clip.size, source_clip.fps) as writer:
+        return stream_planned(clip, plan, [writer])
+
+
+def stream_planned(
+    clip: PlannedClip,
+    plan: RenderPlan,
+    writers: List[PipeWriter],
+    workers: int = 1,
+    pool=None,
+) -> int:
+    """Renders a planned clip, or reads it from the render cache, and appends it to writers.
+
+    Args:
+        clip (PlannedClip): Planned clip
+        plan (RenderPlan): Plan of clip ready to render. Unused if the clip is cached
+        writers (List[PipeWriter]): Writers with equal size and frame rate to append clip to
+        workers (int, optional): Amount of workers to process frames with if no pool is given
+        pool (FramePool, optional): Long-lived worker pool to process frames with
+
+    Returns:
+        int: Amount of written frames
+    """
+    if clip.cached is not None:
+        video = VideoFileClip(clip.cached)
+        try:
+            return stream_clip(video, writers, max_frames=clip.max_frames)
+        finally:
+            video.close()
+    video = plan.render(workers=workers, pool=pool)
+    if clip.cache is None:
+        return stream_clip(video, writers, max_frames=clip.max_frames)
+    # Clips cut short are not cached, so every cached clip is complete
+    complete = (
+        clip.max_frames is None
+        or int(round(video.duration * writers[0].fps)) <= clip.max_frames
+    )
+    if not complete:
+        return stream_clip(video, writers, max_frames=clip.max_frames)
+    cache_writer = clip.cache.writer(clip.cache_key, writers[0].size, writers[0].fps)
+    try:
+        frames = stream_clip(video, writers + [cache_writer])
+    except Exception:
+        clip.cache.store(clip.cache_key, cache_writer, complete=False)
+        raise
+    clip.cache.store(clip.cache_key, cache_writer)
+    return frames
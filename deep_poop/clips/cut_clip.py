@@ -3,6 +3,8 @@ import numpy as np
 
 from moviepy.audio.AudioClip import AudioArrayClip
 
+from deep_poop.clips.frame_info import FrameInfo
+
 
 class FullFrame(object):
     """Helper class for storing a video frame
@@ -18,6 +20,10 @@ class FullFrame(object):
         self.audio_frames = audio_frames
         self.face_locations = []
 
+    def metadata(self) -> FrameInfo:
+        """Returns the metadata of this frame without video and audio data."""
+        return FrameInfo(self.face_locations)
+
     def __eq__(self, other):
         if not isinstance(other, FullFrame):
             return False
@@ -31,7 +37,7 @@ class FullFrame(object):
 class CutClip(object):
     """Helper class for cutting a video into video
     frames and their respective audio.
-    
+
     Args:
             video_clip (moviepy.editor.VideoFileClip): Video clip to cut from
     """
@@ -0,0 +1,144 @@
+import weakref
+from multiprocessing import shared_memory
+from typing import List
+
+import numpy as np
+
+
+class _SharedArray(np.ndarray):
+    """Array in shared memory which keeps its segment mapped while any view of it exists."""
+
+    def __array_finalize__(self, obj):
+        self._memory = getattr(obj, "_memory", None)
+
+    def __reduce__(self):
+        # Pickle the frame data itself rather than the shared memory segment
+        return np.asarray(self).__reduce__()
+
+
+def _unlink(memory: shared_memory.SharedMemory):
+    memory.unlink()
+
+
+class SharedFrameBuffer:
+    """Contiguous (frames, height, width, channels) array of frames in POSIX shared memory.
+
+    FrameStream decodes each window of a clip into one buffer and the frame pool writes
+    transformed frames into another, so shared memory holds one window at a time.
+
+    Pickling a buffer attaches to the same memory on unpickling, so worker processes can
+    read and write frames by index without copying them. The creating buffer owns the
+    memory and unlinks it on release or garbage collection. Frames handed out keep
+    the memory mapped until they are garbage collected themselves.
+
+    Args:
+        length (int): Amount of frames
+        frame_shape (tuple): Shape of each frame
+        dtype (str, optional): Data type of frames (Defaults to uint8)
+    """
+
+    def __init__(self, length: int, frame_shape: tuple, dtype: str = "uint8"):
+        shape = (length,) + tuple(frame_shape)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._setup(memory, shape, dtype, 0, length)
+        self._finalizer = weakref.finalize(self, _unlink, memory)
+
+    @classmethod
+    def from_frames(cls, frames: List[np.ndarray]) -> "SharedFrameBuffer":
+        """Creates a buffer holding a copy of frames.
+
+        Args:
+            frames (List[np.ndarray]): Frames of equal shape
+
+        Returns:
+            SharedFrameBuffer: Buffer with frames
+        """
+        buffer = cls(len(frames), frames[0].shape, frames[0].dtype.str)
+        for i, frame in enumerate(frames):
+            buffer[i] = frame
+        return buffer
+
+    @classmethod
+    def _attach(
+        cls, name: str, shape: tuple, dtype: str, offset: int, length: int
+    ) -> "SharedFrameBuffer":
+        buffer = cls.__new__(cls)
+        buffer._setup(
+            shared_memory.SharedMemory(name=name), shape, dtype, offset, length
+        )
+        buffer._finalizer = None
+        return buffer
+
+    def _setup(
+        self,
+        memory: shared_memory.SharedMemory,
+        shape: tuple,
+        dtype: str,
+        offset: int,
+        length: int,
+    ):
+        self._memory = memory
+        self._shape = shape
+        self._dtype = dtype
+        self._offset = offset
+        array = np.ndarray(shape, dtype, buffer=memory.buf).view(_SharedArray)
+        array._memory = memory
+        self.array = array[offset : offset + length]
+
+    def __reduce__(self):
+        return (
+            SharedFrameBuffer._attach,
+            (self.name, self._shape, self._dtype, self._offset, len(self)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, index) -> np.ndarray:
+        return self.array[index]
+
+    def __setitem__(self, index, frame: np.ndarray):
+        self.array[index] = frame
+
+    def __iter__(self):
+        return iter(self.array)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def frame_shape(self) -> tuple:
+        return self.array.shape[1:]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.array.dtype
+
+    def view(self, start: int, end: int) -> "SharedFrameBuffer":
+        """Returns a buffer over a range of frames of this buffer sharing its memory.
+
+        Args:
+            start (int): First frame of range
+            end (int): End of range (exclusive)
+
+        Returns:
+            SharedFrameBuffer: Buffer over range of frames
+        """
+        start = min(max(start, 0), len(self))
+        end = min(max(end, start), len(self))
+        buffer = SharedFrameBuffer.__new__(SharedFrameBuffer)
+        buffer._setup(
+            self._memory, self._shape, self._dtype, self._offset + start, end - start
+        )
+        # Views share the memory of their owner and never unlink it themselves
+        buffer._finalizer = None
+        buffer._owner = self
+        return buffer
+
+    def release(self):
+        """Unlinks the shared memory if owned by this buffer.
+        Frames still referenced elsewhere stay valid until they are garbage collected."""
+        if self._finalizer is not None:
+            self._finalizer()
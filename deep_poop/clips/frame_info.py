@@ -0,0 +1,27 @@
+from typing import List, Tuple
+
+
+class FrameInfo:
+    """Analysis metadata of a single video frame.
+
+    Holds no pixel or audio data, those are read from the scene clip when needed.
+
+    Args:
+        face_locations (List[Tuple], optional): Face boxes (top, right, bottom, left) in frame
+    """
+
+    __slots__ = ("face_locations",)
+
+    def __init__(self, face_locations: List[Tuple] = None):
+        self.face_locations = [] if face_locations is None else face_locations
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameInfo):
+            return False
+        return self.face_locations == other.face_locations
+
+    def __repr__(self):
+        return f"FrameInfo(face_locations={self.face_locations})"
+
+    def faces_amount(self) -> int:
+        return len(self.face_locations)
@@ -0,0 +1,124 @@
+from typing import Callable, Iterator, Tuple
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+from deep_poop.clips.frame_buffer import SharedFrameBuffer
+from deep_poop.config import FRAME_WINDOW
+
+
+def frame_windows(
+    video_clip: VideoClip, window: int = FRAME_WINDOW
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Decodes a clip lazily in windows of frames.
+
+    Only the frames of the current window are held in memory.
+
+    Args:
+        video_clip (VideoClip): Clip to decode
+        window (int, optional): Maximum amount of frames per window
+
+    Yields:
+        Tuple[int, np.ndarray]: Index of first frame in window and its frames
+    """
+    start = 0
+    frames = []
+    for frame in video_clip.iter_frames():
+        frames.append(frame)
+        if len(frames) == window:
+            yield start, frames
+            start += len(frames)
+            frames = []
+    if len(frames) > 0:
+        yield start, frames
+
+
+class FrameStream:
+    """Lazily transforms the frames of a clip in windows of bounded size.
+
+    Frames are decoded from the source clip and transformed one window at a time, so
+    memory use depends on the window size instead of the clip length. Sequential access,
+    as done by clip writers, decodes and transforms every frame once.
+
+    Args:
+        video_clip (VideoClip): Clip to read source frames from
+        transform (Callable): Transforms a buffer of source frames into an output buffer given the index of the first frame
+        frame_count (int): Amount of frames in stream
+        window (int, optional): Amount of frames to decode and transform at once
+        source_frames (np.ndarray, optional): Index of source frame to read for each frame. If None read frames in order
+    """
+
+    def __init__(
+        self,
+        video_clip: VideoClip,
+        transform: Callable[[SharedFrameBuffer, SharedFrameBuffer, int], None],
+        frame_count: int,
+        window: int = FRAME_WINDOW,
+        source_frames: np.ndarray = None,
+    ):
+        if window < 1:
+            raise ValueError("Frame window needs to hold at least one frame")
+        self.clip = video_clip
+        self.transform = transform
+        self.frame_count = frame_count
+        self.window = window
+        self.source_frames = source_frames
+        self._frames: SharedFrameBuffer = None
+        self._output: SharedFrameBuffer = None
+        self._start = 0
+        self._end = 0
+
+    def make_frame(self, t: float) -> np.ndarray:
+        """Returns the transformed frame at a time, for use as a VideoClip make_frame."""
+        return self.frame(int(t * self.clip.fps + 1e-6))
+
+    def frame(self, index: int) -> np.ndarray:
+        """Returns a transformed frame, transforming its window if necessary.
+
+        Args:
+            index (int): Index of frame in stream
+
+        Returns:
+            np.ndarray: Transformed frame
+        """
+        index = min(max(index, 0), self.frame_count - 1)
+        if not self._start <= index < self._end:
+            self._transform_window(index)
+        # Copy as the window buffer is overwritten by the next window
+        return np.array(self._output[index - self._start])
+
+    def _transform_window(self, start: int):
+        end = min(start + self.window, self.frame_count)
+        if self.source_frames is None:
+            sources = np.arange(start, end)
+        else:
+            sources = np.asarray(self.source_frames[start:end])
+        # Decode each source frame of the window once and in order, as readers restart
+        # decoding on every backwards seek
+        unique_sources, positions = np.unique(sources, return_inverse=True)
+        first_frame = self._source_frame(unique_sources[0])
+        if self._frames is None:
+            self._frames = SharedFrameBuffer(
+                self.window, first_frame.shape, first_frame.dtype.str
+            )
+            self._output = SharedFrameBuffer(
+                self.window, first_frame.shape, first_frame.dtype.str
+            )
+        frames = self._frames.view(0, end - start)
+        output = self._output.view(0, end - start)
+        if self.source_frames is None:
+            decoded = frames
+        else:
+            # Output is only written by the transform, so it holds decoded frames until then
+            decoded = output
+        decoded[0] = first_frame
+        for i in range(1, len(unique_sources)):
+            decoded[i] = self._source_frame(unique_sources[i])
+        if decoded is output:
+            frames.array[:] = output.array[positions]
+        self.transform(frames, output, start)
+        self._start = start
+        self._end = end
+
+    def _source_frame(self, index: int) -> np.ndarray:
+        return self.clip.get_frame(index / self.clip.fps)
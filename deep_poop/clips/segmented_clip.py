@@ -0,0 +1,139 @@
+import copy
+from typing import List
+
+import numpy as np
+from moviepy.audio.AudioClip import AudioClip
+from moviepy.editor import VideoClip
+
+
+class ClipSegment:
+    """Range of frames of a clip.
+
+    Args:
+        clip (VideoClip): Clip to read frames from
+        start (int): First frame of range in clip
+        end (int): End of range in clip (exclusive)
+    """
+
+    def __init__(self, clip: VideoClip, start: int, end: int):
+        self.clip = clip
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+
+class SegmentedClip:
+    """Edited clip kept as a flat list of frame ranges of other clips.
+
+    Splicing a clip into a range replaces the covered ranges instead of nesting
+    concatenated clips, and every frame is looked up in constant time. The segments
+    are only read when the clip returned by to_clip is rendered.
+
+    Args:
+        clip (VideoClip): Clip to start editing from
+    """
+
+    def __init__(self, clip: VideoClip):
+        self.fps = clip.fps
+        self.segments: List[ClipSegment] = [ClipSegment(clip, 0, frame_count(clip))]
+        self._index()
+
+    def __len__(self) -> int:
+        return len(self._segment_of_frame)
+
+    def splice(self, start: int, end: int, clip: VideoClip):
+        """Replaces a range of frames with the frames of a clip.
+
+        Args:
+            start (int): First frame to replace
+            end (int): End of range to replace (exclusive)
+            clip (VideoClip): Clip to insert in place of range
+        """
+        segments = []
+        position = 0
+        inserted = False
+        for segment in self.segments:
+            segment_end = position + len(segment)
+            if position < start:
+                before = min(segment_end, start) - position
+                segments.append(
+                    ClipSegment(segment.clip, segment.start, segment.start + before)
+                )
+            if segment_end > start and not inserted:
+                segments.append(ClipSegment(clip, 0, frame_count(clip)))
+                inserted = True
+            if segment_end > end:
+                after = max(end, position) - position
+                segments.append(
+                    ClipSegment(segment.clip, segment.start + after, segment.end)
+                )
+            position = segment_end
+        if not inserted:
+            segments.append(ClipSegment(clip, 0, frame_count(clip)))
+        self.segments = [s for s in segments if len(s) > 0]
+        self._index()
+
+    def _index(self):
+        self._segment_of_frame = np.concatenate(
+            [np.full(len(s), i) for i, s in enumerate(self.segments)]
+        )
+        self._source_frame = np.concatenate(
+            [np.arange(s.start, s.end) for s in self.segments]
+        )
+
+    def get_frame(self, index: int) -> np.ndarray:
+        """Gets a frame of the edited clip.
+
+        Args:
+            index (int): Index of frame
+
+        Returns:
+            np.ndarray: Image of frame
+        """
+        index = min(max(index, 0), len(self) - 1)
+        segment = self.segments[self._segment_of_frame[index]]
+        return segment.clip.get_frame(self._source_frame[index] / segment.clip.fps)
+
+    def _make_audio_frame(self, t):
+        scalar = np.ndim(t) == 0
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        frames = np.clip((t * self.fps + 1e-6).astype(int), 0, len(self) - 1)
+        segment_indices = self._segment_of_frame[frames]
+        # Time within the frame is kept when moving it to its source clip
+        source_t = t + (self._source_frame[frames] - frames) / self.fps
+        sound = None
+        for i in np.unique(segment_indices):
+            in_segment = segment_indices == i
+            segment_sound = self.segments[i].clip.audio.get_frame(source_t[in_segment])
+            if sound is None:
+                sound = np.zeros((len(t),) + np.shape(segment_sound)[1:])
+            sound[in_segment] = segment_sound
+        return sound[0] if scalar else sound
+
+    def to_clip(self) -> VideoClip:
+        """Resolves the edited clip into a single lazily rendered clip.
+
+        Later splices do not change clips which were already resolved.
+
+        Returns:
+            VideoClip: Edited clip
+        """
+        # Splicing replaces the segment list and index, so a shallow copy is a snapshot
+        edited = copy.copy(self)
+        duration = len(edited) / edited.fps
+        video = VideoClip(
+            lambda t: edited.get_frame(int(t * edited.fps + 1e-6)), duration=duration
+        )
+        video.fps = edited.fps
+        audio_clips = [s.clip.audio for s in edited.segments]
+        if all(audio is not None for audio in audio_clips):
+            video.audio = AudioClip(edited._make_audio_frame, duration=duration)
+            video.audio.fps = audio_clips[0].fps
+            video.audio.nchannels = audio_clips[0].nchannels
+        return video
+
+
+def frame_count(clip: VideoClip) -> int:
+    return int(round(clip.duration * clip.fps))
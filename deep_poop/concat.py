@@ -0,0 +1,106 @@
+import os
+import re
+import subprocess
+import tempfile
+from typing import List, Tuple
+
+from moviepy.config import get_setting
+
+# Stream fields which may differ between files that can be joined without re-encoding
+_VARIABLE_FIELDS = re.compile(r", \d+ kb/s|\s*\(default\)")
+
+# Encoding of the last file when it needs to be cut, equal to PipeWriter's defaults
+TRIM_ENCODING = ["-c:v", "libx264", "-preset", "medium", "-pix_fmt", "yuv420p"]
+TRIM_ENCODING += ["-c:a", "aac"]
+
+
+def probe(path: str) -> Tuple[List[str], float]:
+    """Gets the codec parameters of all streams and the duration of a video file.
+
+    Args:
+        path (str): Video file
+
+    Returns:
+        Tuple[List[str], float]: Description of each stream as printed by ffmpeg without bitrate, and duration in seconds
+    """
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    streams = []
+    duration = 0
+    for line in result.stderr.decode(errors="replace").splitlines():
+        match = re.match(r"\s*Stream #\d+:\d+\S*: (.*)", line)
+        if match is not None:
+            streams.append(_VARIABLE_FIELDS.sub("", match.group(1)))
+        match = re.match(r"\s*Duration: (\d+):(\d+):([\d.]+)", line)
+        if match is not None:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return streams, duration
+
+
+def _ffmpeg(*args: str):
+    command = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", *args]
+    subprocess.run(command, check=True, stderr=subprocess.PIPE)
+
+
+def concat_clips(paths: List[str], out_file: str, duration: float = None) -> bool:
+    """Joins video files without re-encoding them using ffmpeg's concat demuxer.
+
+    Files can only be joined if all of their streams have equal codec parameters.
+    When cutting to a duration, files after the cut are left out and only the head of
+    the file containing the cut is re-encoded, as a stream copy can only be cut at a
+    keyframe.
+
+    Args:
+        paths (List[str]): Video files in order
+        out_file (str): Joined video file
+        duration (float, optional): Maximum duration of output in seconds
+
+    Returns:
+        bool: False if the files have different codec parameters and were not joined
+    """
+    probes = [probe(p) for p in paths]
+    if len(probes) == 0 or len(probes[0][0]) == 0:
+        return False
+    parameters = probes[0][0]
+    if any(streams != parameters for streams, _ in probes[1:]):
+        return False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        parts = []
+        start = 0
+        for path, (_, clip_duration) in zip(paths, probes):
+            if duration is not None and start + clip_duration > duration + 1e-3:
+                if duration - start > 1e-3:
+                    head = os.path.join(tmpdir, "head" + os.path.splitext(path)[1])
+                    _ffmpeg(
+                        "-i", path, "-t", str(duration - start), *TRIM_ENCODING, head
+                    )
+                    if probe(head)[0] != parameters:
+                        return False
+                    parts.append(head)
+                break
+            parts.append(path)
+            start += clip_duration
+        file_list = os.path.join(tmpdir, "clips.txt")
+        with open(file_list, "w") as f:
+            for path in parts:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        # Keep the timestamps of the parts, otherwise the AAC priming delay of their
+        # edit lists shifts the video one frame behind the audio
+        _ffmpeg(
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            file_list,
+            "-c",
+            "copy",
+            "-copyts",
+            out_file,
+        )
+    return True
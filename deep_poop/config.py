@@ -4,6 +4,8 @@
 
 SELECTION_SCORE_WEIGHT = 1.0
 NEIGHBOR_SCORE_WEIGHT = 1.0
+# Amount of frames decoded and transformed at once when streaming a clip
+FRAME_WINDOW = 32
 
 
 def using_gpu():
@@ -0,0 +1,151 @@
+import copy
+import json
+from typing import List, Tuple
+
+from moviepy.editor import VideoClip
+
+from deep_poop.effects.effect_graph import EffectGraph
+from deep_poop.render_plan import RenderPlan
+from deep_poop.scene import Scene
+
+EDL_VERSION = 1
+
+
+def plan_entry(plan: RenderPlan, seed: int, max_frames: int) -> dict:
+    """Describes a planned clip as an edit decision list entry.
+
+    Args:
+        plan (RenderPlan): Plan of effects on a scene of the source video
+        seed (int): Seed of random choices made planning the clip
+        max_frames (int): Maximum amount of frames of clip in output
+
+    Returns:
+        dict: JSON serializable entry
+    """
+    return {
+        "start_frame": plan.scene.start_frame_index,
+        "end_frame": plan.scene.end_frame_index,
+        "max_frames": max_frames,
+        "seed": seed,
+        "effects": [
+            {
+                "name": segment.effect.name,
+                "start_frame": segment.start_frame,
+                "end_frame": segment.end_frame,
+                "strength": segment.strength,
+                "seed": segment.seed,
+                "points": segment.points,
+            }
+            for segment in plan.segments
+        ],
+    }
+
+
+class EditDecisionList:
+    """Serializable plan of a video: ranges of the source video used for each clip and
+    the effects applied on them, with all random choices needed to render them again.
+
+    Args:
+        video_file (str): Source video
+        fps (float): Frames per second of source video
+        size (Tuple[int, int]): Width and height of source video
+        entries (List[dict], optional): Planned clips in order, as made by plan_entry
+    """
+
+    def __init__(
+        self,
+        video_file: str,
+        fps: float,
+        size: Tuple[int, int],
+        entries: List[dict] = None,
+    ):
+        self.video_file = video_file
+        self.fps = fps
+        self.size = tuple(size)
+        self.entries = [] if entries is None else entries
+
+    def add(self, plan: RenderPlan, seed: int, max_frames: int):
+        self.entries.append(plan_entry(plan, seed, max_frames))
+
+    def frame_count(self) -> int:
+        return sum(e["max_frames"] for e in self.entries)
+
+    def save(self, file: str):
+        with open(file, "w") as f:
+            json.dump(
+                {
+                    "version": EDL_VERSION,
+                    "video_file": self.video_file,
+                    "fps": self.fps,
+                    "size": list(self.size),
+                    "entries": self.entries,
+                },
+                f,
+                indent=1,
+            )
+
+    @classmethod
+    def load(cls, file: str) -> "EditDecisionList":
+        with open(file, "r") as f:
+            data = json.load(f)
+        if data.get("version") != EDL_VERSION:
+            raise ValueError(
+                f"Unsupported edit decision list version {data.get('version')}"
+            )
+        return cls(data["video_file"], data["fps"], data["size"], data["entries"])
+
+
+class EdlRenderer:
+    """Renders entries of an edit decision list.
+
+    Args:
+        root_scene (Scene): Scene of the whole source video, with analysis cache
+        effect_graph (EffectGraph): Graph holding the effects named in entries
+    """
+
+    def __init__(self, root_scene: Scene, effect_graph: EffectGraph):
+        self.root_scene = root_scene
+        self.effect_graph = effect_graph
+
+    def plan(self, entry: dict) -> RenderPlan:
+        """Rebuilds the plan of an entry.
+
+        Args:
+            entry (dict): Edit decision list entry
+
+        Returns:
+            RenderPlan: Plan of effects on the scene of entry
+        """
+        fps = self.root_scene.clip.fps
+        scene = self.root_scene.subscene(
+            entry["start_frame"] / fps, entry["end_frame"] / fps
+        )
+        scene.analyze_frames()
+        plan = RenderPlan(scene)
+        for effect_entry in entry["effects"]:
+            # Copy deeply so that chosen interpolation points do not leak into the graph
+            effect = copy.deepcopy(self.effect_graph.get_effect(effect_entry["name"]))
+            interpolator = getattr(effect, "interpolator", None)
+            if interpolator is not None and effect_entry["points"] is not None:
+                interpolator.fixed_points = effect_entry["points"]
+            plan.add(
+                effect,
+                start=effect_entry["start_frame"] / fps,
+                end=effect_entry["end_frame"] / fps,
+                strength=effect_entry["strength"],
+                seed=effect_entry["seed"],
+            )
+        return plan
+
+    def render(self, entry: dict, workers: int = 1, pool=None) -> VideoClip:
+        """Renders an entry.
+
+        Args:
+            entry (dict): Edit decision list entry
+            workers (int, optional): Amount of workers to process frames with if no pool is given
+            pool (FramePool, optional): Long-lived worker pool to process frames with
+
+        Returns:
+            VideoClip: Rendered clip
+        """
+        return self.plan(entry).render(workers=workers, pool=pool)
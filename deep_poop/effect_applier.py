@@ -1,6 +1,5 @@
 import copy
 import math
-import random
 from typing import List
 
 import numpy as np
@@ -10,8 +9,9 @@ from numpy.lib.function_base import select
 from deep_poop.config import NEIGHBOR_SCORE_WEIGHT, SELECTION_SCORE_WEIGHT
 from deep_poop.effects.effect import Effect, EffectType
 from deep_poop.effects.effect_graph import EffectGraph, EffectNode
+from deep_poop.frame_pool import FramePool
+from deep_poop.render_plan import RenderPlan
 from deep_poop.scene import Scene
-from deep_poop.utils import combine_video_clips
 
 # TODO: Move to conf
 A = -1 / 70
@@ -27,6 +27,7 @@ class EffectApplier:
         min_effect_length: float = 1.0,
         max_simultaneous_effects=3,
         workers=1,
+        seed: int = None,
     ):
         self.intensity = easy_start
         self.max_intensity = max_intensity
@@ -39,9 +40,16 @@ class EffectApplier:
         self.last_effect_length = 0
         self.max_simultaneous_effects = max_simultaneous_effects
         self.workers = workers
+        self.pool = FramePool(workers) if workers > 1 else None
+        self.rng = np.random.default_rng(seed)
+
+    def close(self):
+        """Stops worker processes used for applying effects."""
+        if self.pool is not None:
+            self.pool.close()
 
     def _set_next_effect_trigger_threshold(self):
-        self._next_effect_intensity_threshold = random.random() * self.intensity
+        self._next_effect_intensity_threshold = self.rng.random() * self.intensity
 
     def _time_until_next_effect(self):
         current_point = self._intensity_to_time(self.intensity)
@@ -89,9 +97,34 @@ class EffectApplier:
         return self.intensity - self._time_to_intensity(x2)
 
     def feed_scene(self, scene: Scene) -> VideoClip:
+        return self.render(self.plan_scene(scene))
+
+    def render(self, plan: RenderPlan) -> VideoClip:
+        """Renders a plan with the workers of this applier.
+
+        Args:
+            plan (RenderPlan): Planned effects on a scene
+
+        Returns:
+            VideoClip: Scene clip with applied effects
+        """
+        return plan.render(workers=self.workers, pool=self.pool)
+
+    def plan_scene(self, scene: Scene, rng: np.random.Generator = None) -> RenderPlan:
+        """Selects effects for a scene and when to apply them.
+
+        Args:
+            scene (Scene): Scene to plan effects for
+            rng (np.random.Generator, optional): Random generator of choices made from now on. If None keep using the current one
+
+        Returns:
+            RenderPlan: Timeline of effects on scene
+        """
+        if rng is not None:
+            self.rng = rng
+        plan = RenderPlan(scene)
         _time_until_next_effect = max(self._time_until_next_effect(), 0)
         current_point_in_scene = 0
-        edited_scene = scene.subscene(0, scene.clip.duration)
         times_edited = 0
         while (
             _time_until_next_effect + current_point_in_scene
@@ -102,21 +135,7 @@ class EffectApplier:
             print(
                 f"DEBUG: Applying effects at point {current_point_in_scene}s in scene"
             )
-            if _time_until_next_effect > 0:
-                scene_before = edited_scene.subscene(
-                    start=0,
-                    end=current_point_in_scene,
-                )
-                effect_scene = edited_scene.subscene(
-                    start=current_point_in_scene,
-                    end=scene.length(),
-                )
-                self._process_scene_effects(effect_scene)
-                edited_scene.clip = combine_video_clips(
-                    [scene_before.clip, effect_scene.clip]
-                )
-            else:
-                self._process_scene_effects(edited_scene)
+            self._process_scene_effects(plan, current_point_in_scene)
             print(f"INFO: Current intensity {self.intensity}/{self.max_intensity}")
             current_point_in_scene += self.last_effect_length
             _time_until_next_effect = self._time_until_next_effect()
@@ -126,28 +145,28 @@ class EffectApplier:
         intensity_loss = self._intensity_loss(scene.length() - current_point_in_scene)
         print(f"INFO: Intensity reduced by {intensity_loss}")
         self.intensity -= intensity_loss
-        return edited_scene.clip
+        return plan
 
-    def _process_scene_effects(self, scene: Scene):
+    def _process_scene_effects(self, plan: RenderPlan, start: float):
+        scene = plan.scene.subscene(start, plan.scene.length())
         self._select_effects(scene)
         if self._effects_to_apply == []:
             print("INFO: No effects could be applied to scene")
             return
         effect_lengths = [
-            max(effect.effect_length(scene.length()), 1 / scene.clip.fps)
+            max(effect.effect_length(scene.length(), self.rng), 1 / scene.clip.fps)
             for effect in self._effects_to_apply
         ]
         longest_effect_duration = max(effect_lengths)
-        effect_scene = scene.subscene(0, longest_effect_duration)
-        scene_after = scene.subscene(longest_effect_duration, scene.length())
         while len(self._effects_to_apply) > 0:
             next_effect = self._effects_to_apply.pop()
             duration = effect_lengths.pop()
-            self._apply_effect(effect_scene, next_effect, duration)
+            self._plan_effect(
+                plan, next_effect, start, duration, longest_effect_duration
+            )
             intensity_cost = duration * next_effect.intensity
             self._add_intensity(intensity_cost)
             # print(f"DEBUG: Added {intensity_cost} intensity")
-        scene.clip = combine_video_clips([effect_scene.clip, scene_after.clip])
         self.last_effect_length = longest_effect_duration
 
     def _select_effects(self, scene: Scene):
@@ -163,36 +182,40 @@ class EffectApplier:
                 return
             self._effects_to_apply.append(next_effect)
 
-    def _apply_effect(self, scene: Scene, effect: Effect, duration: float) -> VideoClip:
+    def _plan_effect(
+        self,
+        plan: RenderPlan,
+        effect: Effect,
+        start: float,
+        duration: float,
+        effects_duration: float,
+    ):
+        """Adds an effect at a random point within the time range of simultaneous effects.
+
+        Args:
+            plan (RenderPlan): Plan to add effect to
+            effect (Effect): Effect to add
+            start (float): Start of simultaneous effects in seconds
+            duration (float): Duration of effect
+            effects_duration (float): Duration of simultaneous effects
+        """
         print(f"INFO: Applying {effect.name} with length {duration}s")
-        scene_length = scene.length()
-        if duration >= scene_length:
-            transformed_clip = effect.apply(
-                scene=scene,
-                strength=self._choose_effect_strength(),
-                workers=self.workers,
-            )
+        effects_duration = min(effects_duration, plan.scene.length() - start)
+        if duration >= effects_duration:
+            effect_begin = 0
+            duration = effects_duration
         else:
-            effect_begin = random.uniform(0, scene_length - duration)
-            scene_before = scene.subscene(0, effect_begin)
-            scene_after = scene.subscene(effect_begin + duration, scene_length)
-            effect_scene = scene.subscene(
-                start=effect_begin, end=effect_begin + duration
-            )
-            transformed_clip = effect.apply(
-                scene=effect_scene,
-                strength=self._choose_effect_strength(),
-                workers=self.workers,
-            )
-            scene.clip = combine_video_clips(
-                [scene_before.clip, transformed_clip, scene_after.clip]
-            )
-        if scene.clip is None:
-            raise ValueError
-        return transformed_clip
+            effect_begin = self.rng.uniform(0, effects_duration - duration)
+        plan.add(
+            effect,
+            start=start + effect_begin,
+            end=start + effect_begin + duration,
+            strength=self._choose_effect_strength(),
+            seed=int(self.rng.integers(2 ** 32)),
+        )
 
     def _choose_effect_strength(self):
-        return random.random()
+        return self.rng.random()
 
     def _has_audio_effect(self, effects: List[Effect]):
         for e in effects:
@@ -256,6 +279,6 @@ class EffectApplier:
                 f"Elements amount {len(elements)} and weights amount {len(weights)} does not match"
             )
         weights /= sum(weights)
-        sample = np.random.multinomial(1, weights, size=1)
+        sample = self.rng.multinomial(1, weights, size=1)
         chosen_effect_index = np.where(sample[0] == 1)[0].item()
         return elements[chosen_effect_index]
@@ -1,11 +1,9 @@
-from moviepy.editor import VideoClip
+import numpy as np
 
 import deep_poop.effects.effect as effect
-import deep_poop.effects.utils as utils
-from deep_poop.scene import Scene
 
 
-class Echo(effect.Effect):
+class Echo(effect.AudioEffect):
     """Puts an echo in the audio track with given delay and strength.
 
     Args:
@@ -15,17 +13,32 @@ class Echo(effect.Effect):
     """
 
     def __init__(self, delay: float, strength: float = 0.7, *args, **kwargs):
-        kwargs["effect_type"] = effect.EffectType.AUDIO
         super(Echo, self).__init__(*args, **kwargs)
         self.delay = delay
         self.strength = strength
 
-    def effect_function(self, scene: Scene, workers: int):
-        video = scene.clip
-        audio = video.audio
-        audio_frames = utils.audio_to_frames(audio)
-        d = int(audio.fps * self.delay)
-        for i in range(len(audio_frames) - d):
-            audio_frames[i] += audio_frames[i - d] * self.strength
-        video.audio = utils.frames_to_audio(audio_frames, video.audio.fps)
-        return video
+    def apply_audio(self, samples: np.ndarray, fps: int) -> np.ndarray:
+        return echo(samples, int(fps * self.delay), self.strength)
+
+
+def echo(samples: np.ndarray, delay: int, strength: float) -> np.ndarray:
+    """Adds a feedback echo to audio samples, y[i] = x[i] + strength * y[i - delay].
+
+    Samples are processed in blocks of delay samples, as each block only depends on
+    the previous one.
+
+    Args:
+        samples (np.ndarray): Audio samples (samples, channels)
+        delay (int): Delay of echo in samples
+        strength (float): Strength of echo relative to original sound
+
+    Returns:
+        np.ndarray: Audio samples with echo
+    """
+    echoed = np.array(samples, dtype=np.float64)
+    if delay < 1:
+        return echoed * (1 + strength)
+    for start in range(delay, len(echoed), delay):
+        end = min(start + delay, len(echoed))
+        echoed[start:end] += echoed[start - delay : end - delay] * strength
+    return echoed
@@ -1,43 +1,61 @@
-import os
-import tempfile
-
 import librosa
-from moviepy.audio.io.AudioFileClip import AudioFileClip
-import soundfile as sf
+import numpy as np
 
 import deep_poop.effects.effect as effect
 from deep_poop.scene import Scene
 
+# Lower quality resampler which is considerably faster than the librosa default
+FAST_RES_TYPE = "soxr_qq"
+
 
-class Pitch(effect.Effect):
+class Pitch(effect.AudioEffect):
     """Shifts an audio clip by a given amount of semitone steps.
 
     Args:
         min_steps (int): Amount of steps to shift
         max_steps (int): Amount of steps to shift
+        fast (bool, optional): Use faster, lower quality resampling. Suited for short clips (Defaults to False)
 
     """
 
-    def __init__(self, min_steps: int, max_steps: int, *args, **kwargs):
-        kwargs["effect_type"] = effect.EffectType.AUDIO
+    def __init__(
+        self, min_steps: int, max_steps: int, fast: bool = False, *args, **kwargs
+    ):
         super(Pitch, self).__init__(*args, **kwargs)
         self.min_steps = min_steps
         self.max_steps = max_steps
+        self.fast = fast
 
     def initialize_effect(self, scene: Scene, strength: float):
         self.steps = self.min_steps + int((self.max_steps - self.min_steps))
         self.strength = strength
 
-    def effect_function(self, scene: Scene, workers: int):
-        video = scene.clip
-        audio = video.audio
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp_file = os.path.join(tmpdir, "tmp.wav")
-            pitched_file = os.path.join(tmpdir, "pitched.wav")
-            audio.write_audiofile(tmp_file, logger=None)
-            y, sr = librosa.core.load(tmp_file, audio.fps)
-            y_shifted = librosa.effects.pitch_shift(y, sr, n_steps=self.steps)
-            # librosa.output.write_wav(pitched_file, y_shifted, sr)
-            sf.write(pitched_file, y_shifted, sr, "PCM_24")
-            video.audio = AudioFileClip(pitched_file)
-            return video
+    def apply_audio(self, samples: np.ndarray, fps: int) -> np.ndarray:
+        return pitch_shift(
+            samples, fps, self.steps, res_type=FAST_RES_TYPE if self.fast else None
+        )
+
+
+def pitch_shift(
+    samples: np.ndarray, fps: int, steps: float, res_type: str = None
+) -> np.ndarray:
+    """Shifts the pitch of each channel of audio samples.
+
+    Args:
+        samples (np.ndarray): Audio samples (samples, channels) or (samples,)
+        fps (int): Sample rate of audio
+        steps (float): Amount of semitone steps to shift
+        res_type (str, optional): librosa resampling type. If None use librosa default (Defaults to None)
+
+    Returns:
+        np.ndarray: Pitch shifted samples of same shape
+    """
+    kwargs = {} if res_type is None else {"res_type": res_type}
+    channels = samples.reshape(len(samples), -1).T
+    shifted = [
+        librosa.effects.pitch_shift(
+            np.ascontiguousarray(channel), sr=fps, n_steps=steps, **kwargs
+        )
+        for channel in channels
+    ]
+    return np.stack(shifted, axis=-1).reshape(samples.shape)
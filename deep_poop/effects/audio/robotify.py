@@ -1,13 +1,10 @@
-import math
-
-from moviepy.editor import VideoClip
+import numpy as np
 
 import deep_poop.effects.effect as effect
-import deep_poop.effects.utils as utils
 from deep_poop.scene import Scene
 
 
-class Robotify(effect.Effect):
+class Robotify(effect.AudioEffect):
     """Modifies audio track by multiplying it with a sine wave.
 
     Args:
@@ -17,7 +14,6 @@ class Robotify(effect.Effect):
     """
 
     def __init__(self, min_freq: float, max_freq: float, *args, **kwargs):
-        kwargs["effect_type"] = effect.EffectType.AUDIO
         super(Robotify, self).__init__(*args, **kwargs)
         self.min_freq = min_freq
         self.max_freq = max_freq
@@ -25,17 +21,11 @@ class Robotify(effect.Effect):
     def initialize_effect(self, scene: Scene, strength: float):
         self.frequency = (self.max_freq - self.min_freq) * strength + self.min_freq
 
-    def effect_function(self, scene: Scene, workers: int):
-        video = scene.clip
-        audio = video.audio
-        audio_frames = utils.audio_to_frames(audio)
-        for t in range(len(audio_frames)):
-            audio_frames[t] *= math.sin(t / self.frequency)
-        video.audio = utils.frames_to_audio(audio_frames, video.audio.fps)
-        return video
+    def apply_audio(self, samples: np.ndarray, fps: int) -> np.ndarray:
+        return robotify(samples, self.frequency)
 
 
-class OscillatingRobotify(effect.Effect):
+class OscillatingRobotify(effect.AudioEffect):
     """Modifies audio track by multiplying it with a sine wave which changes frequency over time.
 
     Args:
@@ -55,7 +45,6 @@ class OscillatingRobotify(effect.Effect):
         *args,
         **kwargs
     ):
-        kwargs["effect_type"] = effect.EffectType.AUDIO
         super(OscillatingRobotify, self).__init__(*args, **kwargs)
         self.min_freq = min_freq
         self.max_freq = max_freq
@@ -67,14 +56,50 @@ class OscillatingRobotify(effect.Effect):
             self.max_oscillation - self.min_oscillation
         ) * strength + self.min_oscillation
 
-    def effect_function(self, scene: Scene, workers: int):
-        video = scene.clip
-        audio = video.audio
-        audio_frames = utils.audio_to_frames(audio)
-        for t in range(len(audio_frames)):
-            self.frequency = self.min_freq + (self.max_freq - self.min_freq) * math.sin(
-                t / (self.oscillation * scene.clip.audio.fps)
-            )
-            audio_frames[t] *= math.sin(t / self.frequency)
-        video.audio = utils.frames_to_audio(audio_frames, video.audio.fps)
-        return video
+    def apply_audio(self, samples: np.ndarray, fps: int) -> np.ndarray:
+        return oscillating_robotify(
+            samples, fps, self.min_freq, self.max_freq, self.oscillation
+        )
+
+
+def robotify(samples: np.ndarray, frequency: float) -> np.ndarray:
+    """Multiplies audio samples with a sine wave, sin(i / frequency) for sample i.
+
+    Args:
+        samples (np.ndarray): Audio samples (samples, channels) or (samples,)
+        frequency (float): Frequency of sine wave
+
+    Returns:
+        np.ndarray: Modulated audio samples
+    """
+    t = np.arange(len(samples))
+    return _modulate(samples, np.sin(t / frequency))
+
+
+def oscillating_robotify(
+    samples: np.ndarray,
+    fps: int,
+    min_freq: float,
+    max_freq: float,
+    oscillation: float,
+) -> np.ndarray:
+    """Multiplies audio samples with a sine wave which changes frequency over time.
+
+    Args:
+        samples (np.ndarray): Audio samples (samples, channels) or (samples,)
+        fps (int): Sample rate of audio
+        min_freq (float): Minimum frequency of sine wave
+        max_freq (float): Maximum frequency of sine wave
+        oscillation (float): Frequency of sine wave change
+
+    Returns:
+        np.ndarray: Modulated audio samples
+    """
+    t = np.arange(len(samples))
+    frequency = min_freq + (max_freq - min_freq) * np.sin(t / (oscillation * fps))
+    return _modulate(samples, np.sin(t / frequency))
+
+
+def _modulate(samples: np.ndarray, carrier: np.ndarray) -> np.ndarray:
+    # Broadcast carrier over all channels
+    return samples * carrier.reshape((-1,) + (1,) * (samples.ndim - 1))
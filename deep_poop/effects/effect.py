@@ -1,16 +1,18 @@
-import math
-import operator
-import functools
-import multiprocessing
 import numpy as np
 from enum import Enum
-import random
+import copy
 import abc
+import weakref
 
 import cv2
-from moviepy.editor import VideoClip, ImageSequenceClip
+from moviepy.editor import VideoClip
 
+from deep_poop.clips.cut_clip import CutClip
+from deep_poop.clips.frame_stream import FrameStream
+from deep_poop.config import FRAME_WINDOW
+from deep_poop.frame_pool import FramePool, apply_frames
 from deep_poop.scene import Scene
+import deep_poop.effects.utils as utils
 
 
 class EffectStrengthCurve(Enum):
@@ -50,29 +52,72 @@ class Effect:
         self.length_distribution = length_distribution
         self.standalone = standalone
         self.name = self.__class__.__name__ if name is None else name
+        self.reseed()
+
+    def reseed(self, seed: int = None):
+        """Restarts the random choices made by effect from a seed.
+
+        Args:
+            seed (int, optional): Seed. If None choices are not reproducible
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def frame_rng(self, index: int) -> np.random.Generator:
+        """Gets a random generator of choices made for a single frame. Choices only depend
+        on the seed and index, not on which process applies the effect on which frames.
+
+        Args:
+            index (int): Index of frame in scene
+
+        Returns:
+            np.random.Generator: Random generator of frame
+        """
+        if self.seed is None:
+            return self.rng
+        return np.random.default_rng([self.seed, index])
 
     def initialize_effect(self, scene: Scene, strength: float):
         """Any initialization that needs to take place when effect is used."""
         pass
 
-    def effect_length(self, max_len: float):
+    def effect_length(self, max_len: float, rng: np.random.Generator = None):
+        rng = self.rng if rng is None else rng
         max_len = min(self.max_len, max_len)
         min_len = self.min_len
+        # Scene may be shorter than the minimum length, so bounds are not ordered
         if self.length_distribution == EffectLengthDistribution.RANDOM:
-            length = random.uniform(min_len, max_len)
+            length = min_len + (max_len - min_len) * rng.random()
         elif self.length_distribution == EffectLengthDistribution.NORMAL:
             middle = (max_len + min_len) / 2
-            sigma = (max_len - middle) / 10
-            length = random.gauss((max_len + min_len) / 2, sigma)
+            sigma = abs(max_len - middle) / 10
+            length = rng.normal((max_len + min_len) / 2, sigma)
         else:
             # TODO: Log
             # print("Warning: Defaulting to random effect length")
-            length = random.uniform(min_len, max_len)
+            length = min_len + (max_len - min_len) * rng.random()
         if length <= 0:
             raise ValueError
         return length
 
-    def apply(self, scene: Scene, workers: int = 1, strength: int = 1):
+    def apply(
+        self,
+        scene: Scene,
+        workers: int = 1,
+        strength: int = 1,
+        pool: FramePool = None,
+    ):
+        """Initializes and applies effect on a scene.
+
+        Args:
+            scene (Scene): Scene to apply effect on
+            workers (int, optional): Amount of workers to process frames with if no pool is given
+            strength (int, optional): Strength of effect (0-1)
+            pool (FramePool, optional): Long-lived worker pool to process frames with
+
+        Returns:
+            VideoClip: Scene video clip with applied effect
+        """
         self.initialize_effect(scene, strength)
         changed_clip = self.effect_function(scene, workers)
         return changed_clip
@@ -90,11 +135,12 @@ class Effect:
         return 0.5
 
     @abc.abstractmethod
-    def effect_function(self, scene: Scene) -> VideoClip:
+    def effect_function(self, scene: Scene, workers: int) -> VideoClip:
         """Functionality when effect is applied. To be implemented by each effect.
 
         Args:
             scene (Scene): Scene to apply effect on
+            workers (int): Amount of workers the effect may process frames with
 
         Returns:
             VideoClip: Scene video clip with applied function
@@ -103,64 +149,49 @@ class Effect:
 
 
 class ImageEffect(Effect):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, window: int = FRAME_WINDOW, **kwargs):
         super(ImageEffect, self).__init__(*args, **kwargs)
+        self.window = window
 
-    def effect_function(self, scene: Scene, workers: int) -> VideoClip:
+    def apply(
+        self,
+        scene: Scene,
+        workers: int = 1,
+        strength: int = 1,
+        pool: FramePool = None,
+    ):
+        self.initialize_effect(scene, strength)
+        return self.effect_function(scene, workers, pool)
+
+    def effect_function(
+        self, scene: Scene, workers: int, pool: FramePool = None
+    ) -> VideoClip:
         """Applies image effect to each frame of scene video clip.
 
+        The returned clip is evaluated lazily: frames are decoded and transformed in
+        windows when the clip is read, e.g. while being written.
+
         Args:
             scene (Scene): Scene to apply effect on
+            workers (int): Amount of workers to process frames with if no pool is given
+            pool (FramePool, optional): Long-lived worker pool to process frames with
 
         Returns:
             VideoClip: Transformed scene video clip
         """
-        output_frames = []
-        if workers > 1:
-            output_frames = self._parallel_apply(scene, workers)
-        else:
-            for i, frame in enumerate(scene.frames):
-                f = self.apply_frame(frame.video_frame, scene, i)
-                output_frames.append(f)
-        output_video = ImageSequenceClip(output_frames, scene.clip.fps)
+        # Frames are transformed after this call returns, so keep the state of this
+        # application and only the scene metadata needed to transform them
+        output_video = transform_clip(
+            scene.clip,
+            copy.copy(self),
+            scene.detached(),
+            workers=workers,
+            pool=pool,
+            window=self.window,
+        )
         output_video.audio = scene.clip.audio.copy()
         return output_video
 
-    def _parallel_apply(self, scene: Scene, workers: int):
-        manager = multiprocessing.Manager()
-        result_list = manager.list()
-        for i in range(workers):
-            result_list.append([])
-        jobs = []
-
-        def _apply_frame_parallel(worker_index, frames, frames_start_index):
-            processed_frames = []
-            i = frames_start_index
-            for frame in frames:
-                f = self.apply_frame(frame.video_frame, scene, i)
-                processed_frames.append(f)
-                i += 1
-            result_list[worker_index] = processed_frames
-
-        frames_per_worker = math.ceil(scene.frame_length() / workers)
-        for i in range(workers):
-            worker_start = i * frames_per_worker
-            frames = scene.frames[worker_start : worker_start + frames_per_worker]
-            p = multiprocessing.Process(
-                target=_apply_frame_parallel,
-                args=(
-                    i,
-                    frames,
-                    worker_start,
-                ),
-            )
-            jobs.append(p)
-            p.start()
-
-        for proc in jobs:
-            proc.join()
-        return functools.reduce(operator.iconcat, result_list, [])
-
     @abc.abstractmethod
     def apply_frame(self, frame: np.ndarray, scene: Scene, index: int) -> np.ndarray:
         """Applies effect function on a single image frame.
@@ -173,3 +204,104 @@ class ImageEffect(Effect):
             np.ndarray: Transformed image frame
         """
         pass
+
+
+class AudioEffect(Effect):
+    """Effect which only changes the audio track of a scene."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["effect_type"] = EffectType.AUDIO
+        super(AudioEffect, self).__init__(*args, **kwargs)
+
+    def effect_function(self, scene: Scene, workers: int) -> VideoClip:
+        video = scene.clip
+        audio = video.audio
+        audio_frames = self.apply_audio(utils.audio_to_frames(audio), audio.fps)
+        video.audio = utils.frames_to_audio(audio_frames, audio.fps)
+        return video
+
+    @abc.abstractmethod
+    def apply_audio(self, samples: np.ndarray, fps: int) -> np.ndarray:
+        """Applies effect function on audio samples.
+
+        Args:
+            samples (np.ndarray): Audio samples (samples, channels)
+            fps (int): Sample rate of audio
+
+        Returns:
+            np.ndarray: Transformed audio samples of same length
+        """
+        raise NotImplementedError
+
+
+class VideoEffect(Effect):
+    """Effect which changes the order of frames, together with their audio."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["effect_type"] = EffectType.VIDEO
+        super(VideoEffect, self).__init__(*args, **kwargs)
+
+    def effect_function(self, scene: Scene, workers: int) -> VideoClip:
+        cut_clip = CutClip(scene.clip)
+        order = self.frame_order(len(cut_clip.frames))
+        cut_clip.frames = [cut_clip.frames[i] for i in order]
+        return cut_clip.to_video()
+
+    @abc.abstractmethod
+    def frame_order(self, frame_count: int) -> np.ndarray:
+        """Gets the source frame of each frame of the transformed scene.
+
+        Args:
+            frame_count (int): Amount of frames in scene
+
+        Returns:
+            np.ndarray: Index of source frame for each frame, of length frame_count
+        """
+        raise NotImplementedError
+
+
+def transform_clip(
+    video_clip: VideoClip,
+    frame_effect,
+    scene: Scene,
+    workers: int = 1,
+    pool: FramePool = None,
+    window: int = FRAME_WINDOW,
+    source_frames: np.ndarray = None,
+) -> VideoClip:
+    """Creates a lazily evaluated clip applying an image effect on each frame of a clip.
+
+    Args:
+        video_clip (VideoClip): Clip to read source frames from
+        frame_effect (ImageEffect): Initialized effect, or any object with apply_frame, to apply
+        scene (Scene): Detached scene passed to apply_frame
+        workers (int, optional): Amount of workers to process frames with if no pool is given
+        pool (FramePool, optional): Long-lived worker pool to process frames with
+        window (int, optional): Amount of frames to decode and transform at once
+        source_frames (np.ndarray, optional): Index of source frame to read for each frame
+
+    Returns:
+        VideoClip: Transformed clip without audio
+    """
+    owns_pool = pool is None and workers > 1
+    if owns_pool:
+        pool = FramePool(workers)
+
+    def transform(frames, output, first_index):
+        if pool is not None:
+            pool.apply(frame_effect, scene, frames, output, first_index)
+        else:
+            apply_frames(frame_effect, scene, frames, output, first_index=first_index)
+
+    stream = FrameStream(
+        video_clip,
+        transform,
+        scene.frame_length(),
+        window,
+        source_frames=source_frames,
+    )
+    output_video = VideoClip(stream.make_frame, duration=video_clip.duration)
+    output_video.fps = video_clip.fps
+    if owns_pool:
+        weakref.finalize(output_video, pool.close)
+    return output_video
@@ -47,6 +47,9 @@ class EffectGraph:
     def get_node(self, effect: Effect) -> EffectNode:
         return self._nodes[effect.name]
 
+    def get_effect(self, name: str) -> Effect:
+        return self._nodes[name].effect
+
     def add_node(self, effect: Effect) -> EffectNode:
         key = effect.name
         if key in self._nodes:
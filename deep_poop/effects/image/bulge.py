@@ -1,5 +1,5 @@
 from deep_poop.analytics.face_detect import face_to_center
-from deep_poop.clips.cut_clip import FullFrame
+from deep_poop.clips.frame_info import FrameInfo
 import numpy as np
 import math
 
@@ -11,6 +11,7 @@ from deep_poop.value_generator import (
     ValueGenerator,
 )
 from deep_poop.effects.interpolator import StrengthInterpolator
+from deep_poop.effects.warp import WARP_MAP_CACHE, WarpMap, WarpMapCache
 import deep_poop.effects.effect as effect
 
 
@@ -32,6 +33,7 @@ class Bulge(effect.ImageEffect):
         radius_generator: ValueGenerator = ConstantValueGenerator(0.1),
         center_on_face: bool = False,
         invert: bool = False,
+        warp_cache: WarpMapCache = WARP_MAP_CACHE,
         *args,
         **kwargs,
     ):
@@ -44,6 +46,7 @@ class Bulge(effect.ImageEffect):
         self.center_on_face = center_on_face
         self.transition_time_generator = transition_time_generator
         self.interpolator = interpolator
+        self.warp_cache = warp_cache
 
     def selection_score(self, scene: Scene) -> float:
         if self.center_on_face:
@@ -51,16 +54,18 @@ class Bulge(effect.ImageEffect):
         return 0.5
 
     def initialize_effect(self, scene: Scene, strength: float):
-        interpolation_multipliers = self.interpolator.interpolate_all_frames(scene)
+        interpolation_multipliers = self.interpolator.interpolate_all_frames(
+            scene, self.rng
+        )
         self._strengths = [m * strength for m in interpolation_multipliers]
 
-        self._radius = self.radius_generator.generate()
-        self._transition_time = self.transition_time_generator.generate()
+        self._radius = self.radius_generator.generate(self.rng)
+        self._transition_time = self.transition_time_generator.generate(self.rng)
 
     def apply_frame(self, frame: np.ndarray, scene: Scene, index: int) -> np.ndarray:
         strength = self._strengths[index]
         current_time = index / scene.frame_length() * scene.length()
-        current_scene_frame: FullFrame = scene.frames[index]
+        current_scene_frame: FrameInfo = scene.frames[index]
 
         if self._transition_time > 0:
             transition_multiplier = min(1, current_time / self._transition_time)
@@ -82,35 +87,11 @@ class Bulge(effect.ImageEffect):
         else:
             center = (width / 2, height / 2)
 
-        center_height = center[1]
-        center_width = center[0]
         radius = self._radius * (height if height > width else width)
-        dst = frame.copy()
-
-        for y in range(len(frame)):
-            v = y - center_height
-            if abs(v) > radius:
-                continue
-            x_start = max(
-                0, math.floor(-math.sqrt(radius ** 2 - v ** 2) + center_width)
-            )
-            x_end = min(
-                width, math.ceil(math.sqrt(radius ** 2 - v ** 2) + center_width)
-            )
-            for x in range(x_start, x_end):
-                u = x - center_width
-                r = math.sqrt(u ** 2 + v ** 2)
-                r = 1 - r / radius
-                if r > 0:
-                    r2 = 1 - current_bulge * r * r
-                    xp = u * r2
-                    yp = v * r2
-
-                    src_y = max(0, min(int(yp + center_height), height - 1))
-                    src_x = max(0, min(int(xp + center_width), width - 1))
-
-                    dst[y][x] = frame[src_y][src_x]
-        return dst
+        warp_map = self.warp_cache.get(
+            bulge_map, frame.shape, center, radius, current_bulge
+        )
+        return frame if warp_map is None else warp_map.apply(frame)
 
 
 def bulge(image: np.ndarray, strength: float, center: tuple = None) -> np.ndarray:
@@ -126,32 +107,68 @@ def bulge(image: np.ndarray, strength: float, center: tuple = None) -> np.ndarra
     if center is None:
         center = (height // 2, width // 2)
 
-    center_height = center[1]
-    center_width = center[0]
-    max_radius = min(center_width, center_height)
-    dst = image.copy()
-
-    for y in range(len(image)):
-        v = y - center_height
-        if abs(v) > max_radius:
-            continue
-        x_start = max(
-            0, math.floor(-math.sqrt(max_radius ** 2 - v ** 2) + center_width)
-        )
-        x_end = min(
-            width, math.ceil(math.sqrt(max_radius ** 2 - v ** 2) + center_width)
-        )
-        for x in range(x_start, x_end):
-            u = x - center_width
-            r = math.sqrt(u ** 2 + v ** 2)
-            r = 1 - r / max_radius
-            if r > 0:
-                r2 = 1 - strength * r * r
-                xp = u * r2
-                yp = v * r2
-
-                src_y = max(0, min(int(yp + center_height), height - 1))
-                src_x = max(0, min(int(xp + center_width), width - 1))
-
-                dst[y][x] = image[src_y][src_x]
-    return dst
+    max_radius = min(center[0], center[1])
+    return bulge_frame(image, center, max_radius, strength)
+
+
+def bulge_map(shape: tuple, center: tuple, radius: float, strength: float) -> WarpMap:
+    """Builds nearest neighbour source coordinate maps for bulging a circular region.
+
+    Only the bounding box of the circle is mapped, pixels outside of it are left untouched.
+
+    Args:
+        shape (tuple): Shape of image to bulge
+        center (tuple): Center of bulge (x,y)
+        radius (float): Radius of bulge in pixels
+        strength (float): Strength of inflation (can be negative)
+
+    Returns:
+        WarpMap: Map of the bounding box of the circle, or None if no pixel is affected
+    """
+    height, width = shape[:2]
+    center_width, center_height = center
+    y_start = max(0, math.ceil(center_height - radius))
+    y_end = min(height, math.floor(center_height + radius) + 1)
+    x_start = max(0, math.floor(center_width - radius))
+    x_end = min(width, math.ceil(center_width + radius))
+    if y_start >= y_end or x_start >= x_end:
+        return None
+
+    ys = np.arange(y_start, y_end, dtype=np.float64)[:, np.newaxis]
+    xs = np.arange(x_start, x_end, dtype=np.float64)[np.newaxis, :]
+    v = ys - center_height
+    u = xs - center_width
+    # Same per row bounds as the circle scanlines, keeps edge pixels identical
+    half_chord = np.sqrt(radius ** 2 - v ** 2)
+    row_start = np.floor(center_width - half_chord)
+    row_end = np.ceil(center_width + half_chord)
+
+    r = 1 - np.sqrt(u ** 2 + v ** 2) / radius
+    inside = (xs >= row_start) & (xs < row_end) & (r > 0)
+    r2 = 1 - strength * r * r
+    src_x = np.clip(np.trunc(u * r2 + center_width), 0, width - 1)
+    src_y = np.clip(np.trunc(v * r2 + center_height), 0, height - 1)
+
+    map_x = np.where(inside, src_x, xs).astype(np.float32)
+    map_y = np.where(inside, src_y, ys).astype(np.float32)
+    return WarpMap((x_start, y_start), map_x, map_y)
+
+
+def bulge_frame(
+    image: np.ndarray, center: tuple, radius: float, strength: float
+) -> np.ndarray:
+    """Bulges a circular region of an image.
+
+    Args:
+        image (numpy.ndarray): Image to modify
+        center (tuple): Center of bulge (x,y)
+        radius (float): Radius of bulge in pixels
+        strength (float): Strength of inflation (can be negative)
+
+    Returns:
+        numpy.ndarray: Bulged copy of image
+    """
+    warp_map = bulge_map(image.shape, center, radius, strength)
+    if warp_map is None:
+        return image.copy()
+    return warp_map.apply(image)
@@ -1,5 +1,4 @@
 import numpy as np
-import random
 
 from moviepy.editor import VideoClip
 import cv2
@@ -32,7 +31,10 @@ class Shake(effect.ImageEffect):
         ) * strength + self.min_strength
 
     def apply_frame(self, frame: FullFrame, scene: Scene, index: int) -> np.ndarray:
-        by_x = random.uniform(-self.shake_strength, self.shake_strength)
-        by_y = random.uniform(-self.shake_strength, self.shake_strength)
+        rng = self.frame_rng(index)
+        # Shake strength may be negative, numpy needs ordered bounds
+        limit = abs(self.shake_strength)
+        by_x = rng.uniform(-limit, limit)
+        by_y = rng.uniform(-limit, limit)
         T = np.float32([[1, 0, by_x], [0, 1, by_y]])
         return cv2.warpAffine(frame, T, (frame.shape[1], frame.shape[0]))
@@ -1,10 +1,11 @@
-from skimage.transform import swirl
+import cv2
 import numpy as np
 
 import deep_poop.effects.effect as effect
 from deep_poop.analytics.face_detect import face_to_center
-from deep_poop.clips.cut_clip import FullFrame
+from deep_poop.clips.frame_info import FrameInfo
 from deep_poop.effects.interpolator import StrengthInterpolator
+from deep_poop.effects.warp import WARP_MAP_CACHE, WarpMap, WarpMapCache
 from deep_poop.scene import Scene
 from deep_poop.value_generator import ZERO, ConstantValueGenerator, ValueGenerator
 
@@ -26,6 +27,7 @@ class Swirl(effect.ImageEffect):
         transition_time_generator: ValueGenerator = ZERO,
         radius_generator: ValueGenerator = ConstantValueGenerator(0.1),
         center_on_face: bool = False,
+        warp_cache: WarpMapCache = WARP_MAP_CACHE,
         *args,
         **kwargs
     ):
@@ -37,6 +39,7 @@ class Swirl(effect.ImageEffect):
         self.center_on_face = center_on_face
         self.transition_time_generator = transition_time_generator
         self.interpolator = interpolator
+        self.warp_cache = warp_cache
 
     def selection_score(self, scene: Scene) -> float:
         if self.center_on_face:
@@ -44,16 +47,18 @@ class Swirl(effect.ImageEffect):
         return 0.5
 
     def initialize_effect(self, scene: Scene, strength: float):
-        interpolation_multipliers = self.interpolator.interpolate_all_frames(scene)
+        interpolation_multipliers = self.interpolator.interpolate_all_frames(
+            scene, self.rng
+        )
         self._strengths = [m * strength for m in interpolation_multipliers]
 
-        self._radius = self.radius_generator.generate()
-        self._transition_time = self.transition_time_generator.generate()
+        self._radius = self.radius_generator.generate(self.rng)
+        self._transition_time = self.transition_time_generator.generate(self.rng)
 
     def apply_frame(self, frame: np.ndarray, scene: Scene, index: int) -> np.ndarray:
         strength = self._strengths[index]
         current_time = index / scene.frame_length() * scene.length()
-        current_scene_frame: FullFrame = scene.frames[index]
+        current_scene_frame: FrameInfo = scene.frames[index]
 
         if self._transition_time > 0:
             swirl_transition = min(1, current_time / self._transition_time)
@@ -77,12 +82,41 @@ class Swirl(effect.ImageEffect):
 
         radius = self._radius * (height if height > width else width)
 
-        return (
-            swirl(
-                frame,
-                center,
-                strength=current_swirl_amount,
-                radius=radius,
-            )
-            * 255
+        warp_map = self.warp_cache.get(
+            swirl_map, frame.shape, center, radius, current_swirl_amount
         )
+        return warp_map.apply(frame)
+
+
+def swirl_map(shape: tuple, center: tuple, radius: float, strength: float) -> WarpMap:
+    """Builds bilinear source coordinate maps of a swirl.
+
+    Uses the same mapping as skimage.transform.swirl with reflected borders,
+    but warps images directly in their own dtype.
+
+    Args:
+        shape (tuple): Shape of image to swirl
+        center (tuple): Center of swirl (x,y)
+        radius (float): Extent of swirl in pixels
+        strength (float): Strength of swirl
+
+    Returns:
+        WarpMap: Map of the whole image
+    """
+    height, width = shape[:2]
+    x0, y0 = center
+    dy = np.arange(height, dtype=np.float64)[:, np.newaxis] - y0
+    dx = np.arange(width, dtype=np.float64)[np.newaxis, :] - x0
+    rho = np.sqrt(dx ** 2 + dy ** 2)
+    # Decays to approximately 1/1000th at radius
+    decay = radius / 5 * np.log(2)
+    theta = strength * np.exp(-rho / decay) + np.arctan2(dy, dx)
+    map_x = (x0 + rho * np.cos(theta)).astype(np.float32)
+    map_y = (y0 + rho * np.sin(theta)).astype(np.float32)
+    return WarpMap(
+        (0, 0),
+        map_x,
+        map_y,
+        interpolation=cv2.INTER_LINEAR,
+        border_mode=cv2.BORDER_REFLECT_101,
+    )
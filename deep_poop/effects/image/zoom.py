@@ -1,5 +1,5 @@
 from deep_poop.analytics.face_detect import face_to_center
-from deep_poop.clips.cut_clip import FullFrame
+from deep_poop.clips.frame_info import FrameInfo
 import numpy as np
 
 from moviepy.editor import VideoClip
@@ -42,7 +42,9 @@ class Zoom(effect.ImageEffect):
         self.interpolator = interpolator
 
     def initialize_effect(self, scene: Scene, strength: float):
-        self.interpolation_multipliers = self.interpolator.interpolate_all_frames(scene)
+        self.interpolation_multipliers = self.interpolator.interpolate_all_frames(
+            scene, self.rng
+        )
 
         self.factor_x = (
             (self.max_factor - self.min_factor) * strength + self.min_factor
@@ -71,7 +73,7 @@ class Zoom(effect.ImageEffect):
             interpolation=cv2.INTER_LINEAR,
         )
 
-        center = self.get_center(scene.frames[index])
+        center = self.get_center(scene.frames[index], frame.shape)
         center = (
             center[1] * current_factor_y,
             center[0] * current_factor_x,
@@ -100,8 +102,8 @@ class Zoom(effect.ImageEffect):
 
         return cropped
 
-    def get_center(self, current_frame: FullFrame):
-        (height, width) = current_frame.video_frame.shape[:2]
+    def get_center(self, current_frame: FrameInfo, frame_shape: tuple):
+        (height, width) = frame_shape[:2]
         if self.center_on_face:
             if len(current_frame.face_locations) > 0:
                 face = current_frame.face_locations[0]
@@ -1,7 +1,7 @@
 import enum
-import random
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from deep_poop.scene import Scene
 from scipy import interpolate
 
@@ -30,7 +30,10 @@ class StrengthInterpolator:
         min_y: float = 0.05,
         max_y: float = 1,
         interpolation_type: InterpolationType = InterpolationType.LINEAR,
+        fixed_points: List[Tuple[float, float]] = None,
     ):
+        self.fixed_points = fixed_points
+        self.points: List[Tuple[float, float]] = None
         self.min_point_amount = min_points_amount
         self.max_point_amount = max_points_amount
         self.max_points_per_second = max_points_per_second
@@ -38,7 +41,7 @@ class StrengthInterpolator:
         self.max_y = max_y
         self.interpolation_type = interpolation_type
 
-    def generate(self, scene: Scene = None):
+    def generate(self, scene: Scene = None, rng: np.random.Generator = None):
         if self.interpolation_type == InterpolationType.NONE:
             return
         x = []
@@ -57,10 +60,11 @@ class StrengthInterpolator:
             else min(self.max_point_amount, scene.length() * self.max_points_per_second)
         )
         max_points = int(max(max_points, min_points))
-        points_amount = random.randint(min_points, max_points)
+        rng = np.random.default_rng() if rng is None else rng
+        points_amount = rng.integers(min_points, max_points + 1)
 
         # Could support other than random distribution of points
-        generate_y = lambda: random.random() * (self.max_y - self.min_y) + self.min_y
+        generate_y = lambda: rng.random() * (self.max_y - self.min_y) + self.min_y
 
         # Add end and beginning of graph
         x.append(0)
@@ -69,14 +73,23 @@ class StrengthInterpolator:
         y.append(generate_y())
 
         for i in range(points_amount - 2):
-            x.append(random.random())
+            x.append(rng.random())
             y.append(generate_y())
+        # Points are drawn even if fixed so that later draws of the effect stay the same
+        if self.fixed_points is not None:
+            self._set_points(self.fixed_points)
+        else:
+            self._set_points(list(zip(x, y)))
+
+    def _set_points(self, points: List[Tuple[float, float]]):
+        self.points = [tuple(p) for p in points]
+        x, y = zip(*self.points)
         self._interpolatef = interpolate.interp1d(
             x, y, kind=self.interpolation_type.value
         )
 
-    def interpolate_all_frames(self, scene: Scene):
-        self.generate(scene)
+    def interpolate_all_frames(self, scene: Scene, rng: np.random.Generator = None):
+        self.generate(scene, rng)
         frames = scene.frames
         return self.interpolate_frames(list(range(len(frames))), len(frames))
 
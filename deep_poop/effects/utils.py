@@ -3,8 +3,15 @@ from deep_poop.scene import Scene
 from moviepy.audio.AudioClip import AudioArrayClip, AudioClip
 
 
-def audio_to_frames(audio: AudioClip):
-    return audio.to_soundarray()
+def audio_to_frames(audio: AudioClip, chunk_size: int = 50000, fps: int = None):
+    # Stacks a list of chunks as AudioClip.to_soundarray passes a generator to
+    # np.vstack which newer NumPy versions reject
+    chunks = list(
+        audio.iter_chunks(
+            fps=fps or audio.fps, quantize=False, nbytes=2, chunksize=chunk_size
+        )
+    )
+    return np.concatenate(chunks)
 
 
 def frames_to_audio(frames: np.ndarray, fps: float):
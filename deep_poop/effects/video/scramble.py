@@ -1,13 +1,10 @@
-import random
+import numpy as np
 
-from moviepy.editor import VideoClip
-
-from deep_poop.clips.cut_clip import CutClip
 from deep_poop.scene import Scene
 import deep_poop.effects.effect as effect
 
 
-class Scramble(effect.Effect):
+class Scramble(effect.VideoEffect):
     """Scrambles the order of frames in a clip.
 
     Args:
@@ -25,7 +22,6 @@ class Scramble(effect.Effect):
         *args,
         **kwargs
     ):
-        kwargs["effect_type"] = effect.EffectType.VIDEO
         super(Scramble, self).__init__(*args, **kwargs)
         self.unique_scramble = unique_scramble
         self.min_scramble_frame_length = min_scramble_frame_length
@@ -37,31 +33,22 @@ class Scramble(effect.Effect):
             + self.min_scramble_frame_length
         )
 
-    def effect_function(self, scene: Scene, workers: int):
-        cut_clip = CutClip(scene.clip)
-
+    def frame_order(self, frame_count: int) -> np.ndarray:
+        frames = list(range(frame_count))
         scrambled_frames = []
-        clip_frames_length = len(cut_clip.frames)
         while (
-            len(cut_clip.frames) >= self.scramble_frame_length
-            and len(scrambled_frames) < clip_frames_length
+            len(frames) >= self.scramble_frame_length
+            and len(scrambled_frames) < frame_count
         ):
-            max_start_index = len(cut_clip.frames) - self.scramble_frame_length
+            max_start_index = len(frames) - self.scramble_frame_length
             frame_index = (
-                0 if max_start_index == 0 else random.randint(0, max_start_index)
+                0 if max_start_index == 0 else self.rng.integers(max_start_index + 1)
             )
-            for f in cut_clip.frames[
+            scrambled_frames += frames[
                 frame_index : frame_index + self.scramble_frame_length
-            ]:
-                scrambled_frames.append(f)
+            ]
             if self.unique_scramble:
-                del cut_clip.frames[
-                    frame_index : frame_index + self.scramble_frame_length
-                ]
+                del frames[frame_index : frame_index + self.scramble_frame_length]
         if self.unique_scramble:
-            for f in cut_clip.frames:
-                scrambled_frames.append(f)
-        if len(scrambled_frames) > clip_frames_length:
-            scrambled_frames = scrambled_frames[:clip_frames_length]
-        cut_clip.frames = scrambled_frames
-        return cut_clip.to_video()
+            scrambled_frames += frames
+        return np.array(scrambled_frames[:frame_count], dtype=int)
@@ -0,0 +1,187 @@
+import collections
+
+import cv2
+import numpy as np
+
+
+class WarpMap:
+    """Source coordinate maps for a region of an image.
+
+    Args:
+        origin (tuple): Top left corner (x, y) of mapped region in image
+        map_x (np.ndarray): Source x coordinate of each pixel in region
+        map_y (np.ndarray): Source y coordinate of each pixel in region
+        interpolation (int, optional): OpenCV interpolation flag (Defaults to nearest neighbour)
+        border_mode (int, optional): OpenCV border mode for sources outside of image
+    """
+
+    def __init__(
+        self,
+        origin: tuple,
+        map_x: np.ndarray,
+        map_y: np.ndarray,
+        interpolation: int = cv2.INTER_NEAREST,
+        border_mode: int = cv2.BORDER_REPLICATE,
+    ):
+        self.origin = origin
+        self.shape = map_x.shape
+        self.interpolation = interpolation
+        self.border_mode = border_mode
+        # Fixed point maps are both smaller and faster to remap with than float maps
+        self._map1, self._map2 = cv2.convertMaps(
+            map_x,
+            map_y,
+            cv2.CV_16SC2,
+            nninterpolation=interpolation == cv2.INTER_NEAREST,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self._map1.nbytes + (0 if self._map2 is None else self._map2.nbytes)
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """Warps an image with this map.
+
+        Args:
+            image (np.ndarray): Image to warp
+
+        Returns:
+            np.ndarray: Warped copy of image
+        """
+        warped = cv2.remap(
+            image,
+            self._map1,
+            self._map2,
+            self.interpolation,
+            borderMode=self.border_mode,
+        )
+        if self.origin == (0, 0) and self.shape == image.shape[:2]:
+            return warped
+        x, y = self.origin
+        height, width = self.shape
+        dst = image.copy()
+        dst[y : y + height, x : x + width] = warped
+        return dst
+
+
+class WarpMapCache:
+    """Least recently used cache of warp maps shared between displacement effects.
+
+    Maps are keyed on their builder, image shape, center, radius and strength. Center and
+    strength are quantized before building so that frames with nearly equal parameters
+    share one map.
+
+    Args:
+        max_bytes (int, optional): Memory cap of all cached maps (Defaults to 256 MiB)
+        strength_step (float, optional): Quantization step of strength. 0 disables quantization (Defaults to 0.25)
+        center_step (float, optional): Quantization step of center in pixels. 0 disables quantization (Defaults to 4)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2 ** 20,
+        strength_step: float = 0.25,
+        center_step: float = 4,
+    ):
+        self.max_bytes = max_bytes
+        self.strength_step = strength_step
+        self.center_step = center_step
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._maps = collections.OrderedDict()
+
+    def __reduce__(self):
+        # Worker processes keep using their own shared cache instead of a pickled copy
+        if self is WARP_MAP_CACHE:
+            return "WARP_MAP_CACHE"
+        return (WarpMapCache, (self.max_bytes, self.strength_step, self.center_step))
+
+    @staticmethod
+    def quantize(value: float, step: float) -> float:
+        if step <= 0:
+            return value
+        return round(value / step) * step
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get(self, build, shape: tuple, center: tuple, radius: float, strength: float):
+        """Gets a cached map or builds it with quantized parameters.
+
+        Args:
+            build (Callable): Builds a map from (shape, center, radius, strength)
+            shape (tuple): Shape of image to warp
+            center (tuple): Center of warp (x, y)
+            radius (float): Radius of warp in pixels
+            strength (float): Strength of warp
+
+        Returns:
+            Map returned by build
+        """
+        center = (
+            self.quantize(center[0], self.center_step),
+            self.quantize(center[1], self.center_step),
+        )
+        strength = self.quantize(strength, self.strength_step)
+        key = (build, tuple(shape[:2]), center, radius, strength)
+        if key in self._maps:
+            self.hits += 1
+            self._maps.move_to_end(key)
+            return self._maps[key]
+        self.misses += 1
+        warp_map = build(shape, center, radius, strength)
+        self._maps[key] = warp_map
+        self.nbytes += self._size_of(warp_map)
+        self._evict()
+        return warp_map
+
+    def counts(self) -> tuple:
+        """Gets the counts of lookups and evictions.
+
+        Returns:
+            tuple: Hits, misses and evictions
+        """
+        return (self.hits, self.misses, self.evictions)
+
+    def merge(self, counts: tuple):
+        """Adds counts of lookups and evictions made by the cache of a worker process.
+
+        Args:
+            counts (tuple): Hits, misses and evictions made since the worker got its task
+        """
+        hits, misses, evictions = counts
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def clear(self):
+        self._maps.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+            "maps": len(self._maps),
+            "bytes": self.nbytes,
+        }
+
+    def _evict(self):
+        # Always keep the most recent map even if it alone exceeds the cap
+        while self.nbytes > self.max_bytes and len(self._maps) > 1:
+            _, warp_map = self._maps.popitem(last=False)
+            self.nbytes -= self._size_of(warp_map)
+            self.evictions += 1
+
+    @staticmethod
+    def _size_of(warp_map) -> int:
+        return 0 if warp_map is None else warp_map.nbytes
+
+
+WARP_MAP_CACHE = WarpMapCache()
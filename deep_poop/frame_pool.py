@@ -0,0 +1,117 @@
+import math
+import multiprocessing
+
+from deep_poop.clips.frame_buffer import SharedFrameBuffer
+
+
+def apply_frames(
+    effect,
+    scene,
+    frames: SharedFrameBuffer,
+    output: SharedFrameBuffer,
+    start: int = 0,
+    end: int = None,
+    first_index: int = 0,
+):
+    """Applies an image effect to a range of frames, writing results in place by index.
+
+    Args:
+        effect (ImageEffect): Initialized effect to apply
+        scene (Scene): Scene the frames belong to
+        frames (SharedFrameBuffer): Input window of frames of scene
+        output (SharedFrameBuffer): Buffer to write transformed frames to
+        start (int, optional): First frame to apply effect on (Defaults to 0)
+        end (int, optional): End of range (exclusive). If None apply until last frame (Defaults to None)
+        first_index (int, optional): Index in scene of the first frame in buffer (Defaults to 0)
+    """
+    end = len(frames) if end is None else end
+    for i in range(start, end):
+        output[i] = effect.apply_frame(frames[i], scene, first_index + i)
+
+
+def _apply_frames_counted(effect, *args) -> tuple:
+    # Workers look up warp maps in their own cache, so its counts are returned to be
+    # merged into the cache of the effect in the main process
+    cache = getattr(effect, "warp_cache", None)
+    before = None if cache is None else cache.counts()
+    apply_frames(effect, *args)
+    if cache is None:
+        return None
+    return tuple(after - count for after, count in zip(cache.counts(), before))
+
+
+class FramePool:
+    """Long-lived pool of worker processes applying image effects to frames.
+
+    Worker processes are started on first use and reused for every effect application
+    until the pool is closed. Workers read and write frames in shared frame buffers,
+    only the effect and scene metadata are pickled for each application.
+
+    Args:
+        workers (int): Amount of worker processes
+    """
+
+    def __init__(self, workers: int):
+        if workers < 1:
+            raise ValueError("Frame pool needs at least one worker")
+        self.workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def apply(
+        self,
+        effect,
+        scene,
+        frames: SharedFrameBuffer,
+        output: SharedFrameBuffer,
+        first_index: int = 0,
+    ):
+        """Applies an image effect to each frame of a buffer in parallel.
+
+        Args:
+            effect (ImageEffect): Initialized effect to apply
+            scene (Scene): Detached scene the frames belong to
+            frames (SharedFrameBuffer): Input window of frames of scene
+            output (SharedFrameBuffer): Buffer workers write transformed frames to by index
+            first_index (int, optional): Index in scene of the first frame in buffer (Defaults to 0)
+        """
+        if len(frames) == 0:
+            return
+        frames_per_worker = math.ceil(len(frames) / self.workers)
+        tasks = [
+            (
+                effect,
+                scene,
+                frames,
+                output,
+                start,
+                min(start + frames_per_worker, len(frames)),
+                first_index,
+            )
+            for start in range(0, len(frames), frames_per_worker)
+        ]
+        counts = self._get_pool().starmap(_apply_frames_counted, tasks)
+        cache = getattr(effect, "warp_cache", None)
+        if cache is not None:
+            for worker_counts in counts:
+                cache.merge(worker_counts)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Workers are started from a server process instead of forking this one, as
+            # forked workers would hold open pipes of video readers and writers, which
+            # then never see the end of their stream
+            context = multiprocessing.get_context("forkserver")
+            self._pool = context.Pool(self.workers)
+        return self._pool
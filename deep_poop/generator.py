@@ -1,14 +1,23 @@
 from deep_poop.build_effect_graph import EFFECT_GRAPH
-import random
+from typing import List, Tuple
 import tempfile
 import shutil
 import os
 
+import numpy as np
 from fire import Fire
 from moviepy.editor import VideoFileClip, concatenate_videoclips, VideoClip
 
+from deep_poop.analytics.analysis_cache import ANALYSIS_STATS
+from deep_poop.clip_renderer import PlannedClip, render_clips, stream_planned
+from deep_poop.concat import concat_clips
+from deep_poop.edl import EditDecisionList, EdlRenderer
 from deep_poop.scene_cutter import SceneCutter
 from deep_poop.effect_applier import EffectApplier
+from deep_poop.effects.warp import WARP_MAP_CACHE
+from deep_poop.pipe_writer import PipeWriter
+from deep_poop.render_cache import RenderCache
+from deep_poop.render_plan import RenderPlan
 from deep_poop.utils import combine_audio_clips, combine_video_clips
 from deep_poop.scene import Scene
 
@@ -28,7 +37,13 @@ class Generator:
         abruptness (float, optional): Probability to transition to new scene after sub-scene end (Defaults to 0.2)
         reuse (bool, optional): Toggles whether to re-use same scenes (Defaults to True)
         downscale (float, optional): Downscale factor when performing scene detection. If None detect value automatically (Defaults to None)
-        workers (int, optional): Amount of workers to process each effect (if effect allows it). A higher number could lead to faster generation (Defaults to 1)
+        workers (int, optional): Amount of worker processes kept alive for processing effects (if effect allows it). A higher number could lead to faster generation (Defaults to 1)
+        keep_clips (bool, optional): Write each generated clip to its own file and join them losslessly at the end. Clips are saved to 'backup_clips' if generation fails (Defaults to False)
+        processes (int, optional): Amount of processes rendering clips in parallel. If larger than 1 the whole video is planned first and clips are kept (Defaults to 1)
+        render_cache_mb (int, optional): Disk cap in MiB of rendered clips cached in work_dir for reuse by later runs. 0 disables the cache (Defaults to 0)
+        detection_processes (int, optional): Amount of processes detecting scenes in time ranges of the video in parallel (Defaults to 1)
+        seed (int, optional): Seed of all random choices. Equal seeds and parameters give equal videos for any amount of workers. If None pick a seed at random (Defaults to None)
+        analysis_width (int, optional): Width frames are downscaled towards for scene and face detection. An explicit downscale takes precedence for scene detection. If None use automatic scene detection downscale and detect faces at source resolution (Defaults to None)
     """
 
     def __init__(
@@ -47,6 +62,12 @@ class Generator:
         max_intensity=20,
         easy_start=0,
         workers=1,
+        keep_clips: bool = False,
+        processes: int = 1,
+        render_cache_mb: int = 0,
+        detection_processes: int = 1,
+        seed: int = None,
+        analysis_width: int = None,
     ):
         self.video_file = video_file
         self.out_file = out_file
@@ -56,64 +77,286 @@ class Generator:
             scene_min_len=scene_min_len,
             subscene_min_len=subscene_min_len,
             downscale=downscale,
+            processes=detection_processes,
+            analysis_width=analysis_width,
             work_dir=os.path.join(work_dir, os.path.basename(video_file)),
         )
         self.length = length
+        seeds = np.random.SeedSequence(seed)
+        self.seed = seeds.entropy
+        # Independent streams for effect planning, scene picks and seeds of clips
+        applier_seeds, scene_seeds, self._clip_seeds = seeds.spawn(3)
+        self._rng = np.random.default_rng(scene_seeds)
         self._effect_applier = EffectApplier(
             max_intensity=max_intensity,
             easy_start=easy_start,
             effect_graph=EFFECT_GRAPH,
             workers=workers,
+            seed=int(applier_seeds.generate_state(1)[0]),
         )
         self.reuse = reuse
         self.abruptness = abruptness
         self.work_dir = work_dir
+        self.keep_clips = keep_clips
+        self.processes = processes
+        self.render_cache_mb = render_cache_mb
+        self._render_cache: RenderCache = None
 
-    def ytp_clip_from_scene(self, scene: Scene, abruptness: int):
+    def _next_seed(self) -> int:
+        return int(self._clip_seeds.spawn(1)[0].generate_state(1)[0])
+
+    def plan_clip_from_scene(
+        self, scene: Scene, abruptness: int, seed: int
+    ) -> RenderPlan:
         scene.analyze_frames()
+        rng = np.random.default_rng(seed)
 
-        subscene = scene.subscene(
-            0, scene.length() * (1 - (abruptness * random.random()))
-        )
+        subscene = scene.subscene(0, scene.length() * (1 - (abruptness * rng.random())))
         if subscene.clip is None or subscene.clip.audio is None:
             print(f"Subscene has corrupted clip data. Skipping...")
-            return 0
+            return None
         print(f"DEBUG: Handling subscene with length {subscene.length()}")
         # Fix as scenecutter does not seem to respect minimum length
         if len(subscene.frames) < self._scene_cutter.subscene_min_len:
             print(
                 f"WARNING: Skipped subscene as length {len(subscene.frames)} is shorter than minimum"
             )
-            return 0
-        new_clip = self._effect_applier.feed_scene(subscene)
+            return None
+        return self._effect_applier.plan_scene(subscene, rng)
+
+    def ytp_clip_from_scene(self, scene: Scene, abruptness: int):
+        plan = self.plan_clip_from_scene(scene, abruptness, self._next_seed())
+        if plan is None:
+            return None
+        new_clip = self._effect_applier.render(plan)
         print(
             f"DEBUG: Finished applying effects on clip with duration {new_clip.duration}"
         )
         return new_clip
 
-    def _create_and_save_clip(self, scene: Scene, path: str, abruptness: int):
-        new_clip = self.ytp_clip_from_scene(scene, abruptness)
-        if new_clip == None:
+    def _create_and_save_clip(
+        self, scene: Scene, abruptness: int, writer: PipeWriter, max_frames: int
+    ) -> int:
+        seed = self._next_seed()
+        plan = self.plan_clip_from_scene(scene, abruptness, seed)
+        if plan is None:
             return 0
-        new_clip.write_videofile(path)
-        print(f"INFO: Wrote clip of duration {new_clip.duration}s to {path}")
-        return new_clip.duration
+        clip = PlannedClip(
+            plan, seed=seed, path=writer.path, max_frames=max_frames
+        ).use_cache(self._render_cache)
+        frames = stream_planned(
+            clip,
+            plan,
+            [writer],
+            workers=self._effect_applier.workers,
+            pool=self._effect_applier.pool,
+        )
+        print(f"INFO: Wrote clip of duration {frames / writer.fps}s to {writer.path}")
+        return frames
 
-    def combine(self, dir: str) -> VideoClip:
-        """Combines all clips in given directory to one in alphabetical order.
+    def _next_scene(
+        self, scenes: List[Scene], duration_left: float
+    ) -> Tuple[Scene, float, bool]:
+        """Picks the scene of the next clip.
 
         Args:
-            dir (str): Path to directory containing subclips
+            scenes (List[Scene]): Scenes to pick from. The picked one is removed if 'reuse' is False
+            duration_left (float): Duration of video left to fill
 
         Returns:
-            VideoClip: Constructed video clip
+            Tuple[Scene, float, bool]: Scene, its abruptness and whether it fills the video
+        """
+        next_i = int(self._rng.integers(len(scenes))) if len(scenes) > 1 else 0
+        current_scene = scenes[next_i] if self.reuse else scenes.pop(next_i)
+        print(f"INFO: Duration left {duration_left}")
+        if current_scene.length() > duration_left:
+            return current_scene.subscene(0, duration_left), 0, True
+        return current_scene, self.abruptness, False
+
+    def combine(self, dir: str, out_file: str, duration: float = None):
+        """Combines all clips in given directory to one in alphabetical order.
+
+        Clips with equal codec parameters are joined without re-encoding. Otherwise
+        they are decoded and encoded again.
+
+        Args:
+            dir (str): Path to directory containing subclips
+            out_file (str): File name of combined video
+            duration (float, optional): Maximum duration of combined video in seconds
         """
         clip_files = os.listdir(dir)
         clip_files.sort()
+        clip_paths = [os.path.join(dir, c) for c in clip_files]
+        if concat_clips(clip_paths, out_file, duration):
+            return
+        print("INFO: Clips have different codec parameters. Re-encoding them...")
         clips = []
-        for c in clip_files:
-            clips.append(VideoFileClip(os.path.join(dir, c)))
-        return combine_video_clips(clips)
+        for path in clip_paths:
+            clips.append(VideoFileClip(path))
+        output_video = combine_video_clips(clips)
+        if duration is not None and duration < output_video.duration:
+            output_video = output_video.subclip(0, duration)
+        output_video.write_videofile(out_file)
+
+    def _write_clips(
+        self,
+        scenes: List[Scene],
+        main_video: VideoClip,
+        max_frames: int,
+        writer: PipeWriter,
+        clip_dir: str,
+    ):
+        """Creates clips one after another and writes them to the output or their own files.
+
+        Args:
+            scenes (List[Scene]): Scenes to create clips from
+            main_video (VideoClip): Source video
+            max_frames (int): Amount of frames of output video
+            writer (PipeWriter): Writer of output video. If None write each clip to its own file in clip_dir
+            clip_dir (str): Directory of clip files
+        """
+        total_frames = 0
+        current_clip_index = 1
+        while len(scenes) > 0 and total_frames < max_frames:
+            duration_left = (max_frames - total_frames) / main_video.fps
+            current_scene, abruptness, last_clip = self._next_scene(
+                scenes, duration_left
+            )
+            clip_writer = writer or PipeWriter(
+                os.path.join(clip_dir, f"{current_clip_index:06d}.mp4"),
+                main_video.size,
+                main_video.fps,
+            )
+            try:
+                clip_frames = self._create_and_save_clip(
+                    current_scene, abruptness, clip_writer, max_frames - total_frames
+                )
+            finally:
+                if clip_writer is not writer:
+                    clip_writer.close()
+            if clip_frames > 0:
+                total_frames += clip_frames
+                current_clip_index += 1
+            elif last_clip:
+                # Every scene would be cut to the same too short duration left
+                print(f"WARNING: Stopped with {duration_left}s left to fill")
+                break
+
+    def _plan_clips(
+        self,
+        scenes: List[Scene],
+        main_video: VideoClip,
+        max_frames: int,
+        clip_dir: str,
+    ) -> List[PlannedClip]:
+        """Plans all clips of the video, which can then be rendered independently.
+
+        Scene picks, effects and the intensity trajectory are chosen like when creating
+        clips one after another, but the length of each clip is taken from its plan.
+
+        Args:
+            scenes (List[Scene]): Scenes to create clips from
+            main_video (VideoClip): Source video
+            max_frames (int): Amount of frames of output video
+            clip_dir (str): Directory to render clip files to
+
+        Returns:
+            List[PlannedClip]: Planned clips in order
+        """
+        clips = []
+        total_frames = 0
+        while len(scenes) > 0 and total_frames < max_frames:
+            duration_left = (max_frames - total_frames) / main_video.fps
+            current_scene, abruptness, last_clip = self._next_scene(
+                scenes, duration_left
+            )
+            seed = self._next_seed()
+            plan = self.plan_clip_from_scene(current_scene, abruptness, seed)
+            if plan is None:
+                if last_clip:
+                    print(f"WARNING: Stopped with {duration_left}s left to fill")
+                    break
+                continue
+            # Count frames like stream_clip does, so clips are cut like when written
+            # one after another
+            clip_frames = int(round(plan.scene.length() * main_video.fps))
+            frames = min(clip_frames, max_frames - total_frames)
+            clips.append(
+                PlannedClip(
+                    plan.detached(),
+                    seed=seed,
+                    path=os.path.join(clip_dir, f"{len(clips) + 1:06d}.mp4"),
+                    max_frames=frames,
+                ).use_cache(self._render_cache)
+            )
+            total_frames += frames
+        return clips
+
+    def plan(self, edl_file: str):
+        """Plans the whole video without rendering it and saves the plan as a JSON edit
+        decision list, which can be edited and rendered later with 'render'.
+
+        Args:
+            edl_file (str): File to save edit decision list to
+        """
+        main_video = VideoFileClip(self.video_file)
+        scenes = self._scene_cutter.get_scenes(
+            video_clip=main_video, video_file=self.video_file
+        )
+        if not self.reuse:
+            self.length = min(self.length, main_video.duration)
+        max_frames = int(round(self.length * main_video.fps))
+        print(f"INFO: Seed {self.seed}")
+        edl = EditDecisionList(self.video_file, main_video.fps, main_video.size)
+        for clip in self._plan_clips(scenes, main_video, max_frames, clip_dir=""):
+            edl.add(clip.plan, clip.seed, clip.max_frames)
+        edl.save(edl_file)
+        print(f"INFO: Saved plan of {len(edl.entries)} clips to {edl_file}")
+
+    def render(self, edl_file: str):
+        """Renders a video planned by 'plan' to the output file.
+
+        Args:
+            edl_file (str): Edit decision list to render
+        """
+        edl = EditDecisionList.load(edl_file)
+        main_video = VideoFileClip(edl.video_file)
+        renderer = EdlRenderer(
+            self._scene_cutter.root_scene(main_video), self._effect_applier.effect_graph
+        )
+        self._render_cache = self._open_render_cache(edl.video_file)
+        try:
+            with PipeWriter(self.out_file, main_video.size, main_video.fps) as writer:
+                for entry in edl.entries:
+                    plan = renderer.plan(entry)
+                    clip = PlannedClip(
+                        plan, entry["seed"], writer.path, entry["max_frames"]
+                    ).use_cache(self._render_cache)
+                    stream_planned(
+                        clip,
+                        plan,
+                        [writer],
+                        workers=self._effect_applier.workers,
+                        pool=self._effect_applier.pool,
+                    )
+            self._close_render_cache()
+        finally:
+            self._effect_applier.close()
+
+    def _open_render_cache(self, video_file: str) -> RenderCache:
+        if self.render_cache_mb <= 0:
+            return None
+        return RenderCache(
+            os.path.join(self.work_dir, "render_cache"),
+            video_file,
+            max_bytes=self.render_cache_mb * 2 ** 20,
+        )
+
+    def _close_render_cache(self):
+        if self._render_cache is None:
+            return
+        self._render_cache.evict()
+        print(f"INFO: Render cache {self._render_cache.stats()}")
 
     def generate(self):
         main_video = VideoFileClip(self.video_file)
@@ -122,41 +365,47 @@ class Generator:
         )
         if not self.reuse:
             self.length = min(self.length, main_video.duration)
-        total_duration = 0
-        current_clip_index = 1
+        max_frames = int(round(self.length * main_video.fps))
+        self._render_cache = self._open_render_cache(self.video_file)
+        print(f"INFO: Seed {self.seed}")
+        parallel = self.processes > 1
+        # Kept and parallel rendered clips are written to their own files and joined
+        # at the end, otherwise all clips are streamed into the output
+        writer = (
+            None
+            if self.keep_clips or parallel
+            else PipeWriter(self.out_file, main_video.size, main_video.fps)
+        )
         with tempfile.TemporaryDirectory() as tmpdir:
             try:
-                while len(scenes) > 0 and total_duration < self.length:
-                    next_i = (
-                        random.randint(0, len(scenes) - 1) if len(scenes) > 1 else 0
+                if parallel:
+                    clips = self._plan_clips(scenes, main_video, max_frames, tmpdir)
+                    print(
+                        f"INFO: Rendering {len(clips)} clips in {self.processes} processes"
                     )
-                    current_scene = scenes[next_i] if self.reuse else scenes.pop(next_i)
-                    duration_left = self.length - total_duration
-                    print(f"INFO: Duration left {duration_left}")
-                    if current_scene.length() > duration_left:
-                        current_scene = current_scene.subscene(0, duration_left)
-                        clip_duration = self._create_and_save_clip(
-                            current_scene,
-                            os.path.join(tmpdir, f"{current_clip_index}.mp4"),
-                            0,
-                        )
-                    else:
-                        clip_duration = self._create_and_save_clip(
-                            current_scene,
-                            os.path.join(tmpdir, f"{current_clip_index}.mp4"),
-                            self.abruptness,
-                        )
-                    if clip_duration > 0:
-                        total_duration += clip_duration
-                        current_clip_index += 1
-                output_video = self.combine(tmpdir)
-                output_video = output_video.subclip(0, self.length)
-                output_video.write_videofile(self.out_file)
+                    render_clips(clips, self.video_file, self.processes)
+                else:
+                    self._write_clips(scenes, main_video, max_frames, writer, tmpdir)
+                if writer is None:
+                    self.combine(tmpdir, self.out_file, self.length)
+                else:
+                    writer.close()
+                print(f"INFO: Warp map cache {WARP_MAP_CACHE.stats()}")
+                print(f"INFO: Analyzed frames {ANALYSIS_STATS.stats()}")
+                self._close_render_cache()
             except Exception as e:
-                backup_folder = "backup_clips"
-                shutil.rmtree(backup_folder, ignore_errors=True)
-                print(
-                    f"ERROR: Caught exception {e}. Saving clips produced so far to {backup_folder}..."
-                )
-                shutil.copytree(tmpdir, backup_folder)
+                if writer is not None:
+                    writer.close()
+                    print(
+                        f"ERROR: Caught exception {e}. Video produced so far was written to {self.out_file}"
+                    )
+                else:
+                    backup_folder = "backup_clips"
+                    shutil.rmtree(backup_folder, ignore_errors=True)
+                    print(
+                        f"ERROR: Caught exception {e}. Saving clips produced so far to {backup_folder}..."
+                    )
+                    shutil.copytree(tmpdir, backup_folder)
                 raise e
+            finally:
+                self._effect_applier.close()
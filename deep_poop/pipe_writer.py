@@ -0,0 +1,204 @@
+import os
+import queue
+import subprocess
+import threading
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+from moviepy.config import get_setting
+from moviepy.editor import VideoClip
+
+from deep_poop.effects.utils import audio_to_frames
+
+AUDIO_FPS = 44100
+AUDIO_CHANNELS = 2
+
+
+class PipeWriter:
+    """Encodes raw frames and audio streamed to a single ffmpeg process.
+
+    Frames are written to ffmpeg's standard input and audio to a second pipe, so any
+    amount of clips can be appended to one output file without intermediate files.
+    ffmpeg is started on the first write, so a writer without frames writes no file.
+
+    Args:
+        path (str): Output video file
+        size (Tuple[int, int]): Width and height of output
+        fps (float): Frames per second of output
+        audio_fps (int, optional): Sample rate of output audio
+        codec (str, optional): ffmpeg video codec
+        audio_codec (str, optional): ffmpeg audio codec
+        preset (str, optional): Encoder preset trading speed for compression
+        pix_fmt (str, optional): Pixel format of encoded video
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: Tuple[int, int],
+        fps: float,
+        audio_fps: int = AUDIO_FPS,
+        codec: str = "libx264",
+        audio_codec: str = "aac",
+        preset: str = "medium",
+        pix_fmt: str = "yuv420p",
+    ):
+        self.path = path
+        self.size = tuple(size)
+        self.fps = fps
+        self.audio_fps = audio_fps
+        self.codec = codec
+        self.audio_codec = audio_codec
+        self.preset = preset
+        self.pix_fmt = pix_fmt
+        self.frames_written = 0
+        self.samples_written = 0
+        self._process: subprocess.Popen = None
+        self._closed = False
+
+    def _start(self):
+        if self._closed:
+            raise ValueError(f"Writer of {self.path} is closed")
+        audio_read, audio_write = os.pipe()
+        # Raw inputs are not probed, as probing waits for seconds of data on one pipe
+        # while the other one fills up
+        no_probe = ["-probesize", "32", "-analyzeduration", "0"]
+        # fmt: off
+        command = [
+            get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+            *no_probe, "-f", "rawvideo", "-vcodec", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{self.size[0]}x{self.size[1]}", "-r", str(self.fps), "-i", "-",
+            *no_probe, "-f", "s16le", "-ar", str(self.audio_fps),
+            "-ac", str(AUDIO_CHANNELS),
+            "-i", f"pipe:{audio_read}",
+            "-map", "0:v", "-map", "1:a",
+            "-vcodec", self.codec, "-preset", self.preset, "-pix_fmt", self.pix_fmt,
+            "-acodec", self.audio_codec,
+            self.path,
+        ]
+        # fmt: on
+        self._process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(audio_read,),
+        )
+        os.close(audio_read)
+        self._audio_pipe = os.fdopen(audio_write, "wb")
+        # ffmpeg reads both inputs interleaved, so audio is written from its own
+        # thread to not block on one pipe while ffmpeg waits for the other
+        self._audio_queue = queue.Queue()
+        self._audio_thread = threading.Thread(target=self._write_audio_chunks)
+        self._audio_thread.start()
+
+    def _write_audio_chunks(self):
+        while True:
+            chunk = self._audio_queue.get()
+            if chunk is None:
+                break
+            try:
+                self._audio_pipe.write(chunk)
+            except BrokenPipeError:
+                break
+        self._audio_pipe.close()
+
+    def write_frame(self, frame: np.ndarray):
+        """Writes a frame, resizing it to the output size if necessary.
+
+        Args:
+            frame (np.ndarray): RGB image
+        """
+        if self._process is None:
+            self._start()
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        self._process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        self.frames_written += 1
+
+    def write_audio(self, samples: np.ndarray):
+        """Writes audio samples.
+
+        Args:
+            samples (np.ndarray): Samples in range -1 to 1 of shape (samples, channels)
+        """
+        if self._process is None:
+            self._start()
+        if samples.ndim == 1 or samples.shape[1] == 1:
+            samples = np.repeat(samples.reshape(-1, 1), AUDIO_CHANNELS, axis=1)
+        samples = (np.clip(samples[:, :AUDIO_CHANNELS], -1, 1) * 32767).astype("<i2")
+        self._audio_queue.put(samples.tobytes())
+        self.samples_written += len(samples)
+
+    def sync_audio(self, samples: np.ndarray, frames: int) -> np.ndarray:
+        """Pads or cuts samples to end with the frames about to be written.
+
+        Args:
+            samples (np.ndarray): Samples to be written after the last written samples
+            frames (int): Amount of frames to be written after the last written frame
+
+        Returns:
+            np.ndarray: Samples ending at the time of the last of these frames
+        """
+        target = int(round((self.frames_written + frames) * self.audio_fps / self.fps))
+        length = max(target - self.samples_written, 0)
+        if len(samples) < length:
+            padding = np.zeros((length - len(samples),) + samples.shape[1:])
+            samples = np.concatenate([samples, padding])
+        return samples[:length]
+
+    def close(self):
+        """Finishes encoding and waits for ffmpeg to write the output file."""
+        self._closed = True
+        if self._process is None:
+            return
+        self._audio_queue.put(None)
+        self._process.stdin.close()
+        self._audio_thread.join()
+        error = self._process.stderr.read()
+        returncode = self._process.wait()
+        self._process = None
+        if returncode != 0:
+            raise IOError(
+                f"ffmpeg failed writing {self.path}: {error.decode(errors='replace')}"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def stream_clip(
+    video_clip: VideoClip, writers: List[PipeWriter], max_frames: int = None
+) -> int:
+    """Renders a clip once and appends its frames and audio to writers.
+
+    Args:
+        video_clip (VideoClip): Clip to render
+        writers (List[PipeWriter]): Writers with equal frame rate to append clip to
+        max_frames (int, optional): Maximum amount of frames to write
+
+    Returns:
+        int: Amount of written frames
+    """
+    fps = writers[0].fps
+    frames = int(round(video_clip.duration * fps))
+    if max_frames is not None:
+        frames = min(frames, max_frames)
+    if frames <= 0:
+        return 0
+    if video_clip.audio is not None:
+        audio = video_clip.audio.subclip(0, min(frames / fps, video_clip.duration))
+        samples = audio_to_frames(audio, fps=writers[0].audio_fps)
+    else:
+        samples = np.zeros((0, AUDIO_CHANNELS))
+    # Audio is queued ahead of the frames so ffmpeg never waits for it
+    for writer in writers:
+        writer.write_audio(writer.sync_audio(samples, frames))
+    for i in range(frames):
+        frame = video_clip.get_frame(i / fps)
+        for writer in writers:
+            writer.write_frame(frame)
+    return frames
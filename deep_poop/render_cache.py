@@ -0,0 +1,205 @@
+import enum
+import hashlib
+import inspect
+import json
+import os
+import types
+from typing import Tuple
+
+import numpy as np
+
+from deep_poop.edl import plan_entry
+from deep_poop.pipe_writer import PipeWriter
+from deep_poop.render_plan import RenderPlan
+
+# Lossless encoding of cached clips, so that reusing a clip does not lose quality
+CACHE_EXTENSION = ".mkv"
+CACHE_ENCODING = dict(codec="ffv1", audio_codec="pcm_s16le", pix_fmt="bgr0")
+# Parameters holding choices of a single clip, which keys take from the plan instead
+PLANNED_PARAMETERS = {"fixed_points"}
+
+
+def file_identity(path: str) -> list:
+    """Identifies a file by its path, size and modification time, which changes with
+    its content without reading it.
+
+    Args:
+        path (str): File to identify
+
+    Returns:
+        list: Absolute path, size in bytes and modification time in nanoseconds
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def constructor_parameters(cls: type) -> set:
+    """Gets names of parameters of the constructors of a class and its base classes."""
+    names = set()
+    for base in inspect.getmro(cls):
+        if "__init__" in vars(base):
+            try:
+                names.update(inspect.signature(base.__init__).parameters)
+            except (TypeError, ValueError):
+                pass
+    return names
+
+
+def describe(value, depth: int = 2):
+    """Describes configuration of an object with JSON serializable values.
+
+    Attributes named like a constructor parameter are described recursively up to a
+    depth. Other attributes, such as counters, random generators or values computed
+    while applying an effect, are state of a run rather than configuration and left
+    out. Arrays and objects beyond that depth are only described by their type.
+
+    Args:
+        value: Object to describe
+        depth (int, optional): Depth of nested objects to describe attributes of
+
+    Returns:
+        JSON serializable description
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return [describe(v, depth) for v in value]
+    if isinstance(value, dict):
+        return {str(k): describe(v, depth) for k, v in value.items()}
+    if isinstance(value, (types.FunctionType, types.MethodType, type)):
+        return value.__qualname__
+    if isinstance(value, np.ndarray) or not hasattr(value, "__dict__") or depth <= 0:
+        return type(value).__name__
+    description = {"type": type(value).__name__}
+    parameters = constructor_parameters(type(value)) - PLANNED_PARAMETERS
+    for name, attribute in vars(value).items():
+        if name in parameters:
+            description[name] = describe(attribute, depth - 1)
+    return description
+
+
+class RenderCache:
+    """Size bounded on-disk cache of rendered clips, keyed on their content.
+
+    A clip is keyed on the path, size and modification time of the source video, its frame range and the name,
+    configuration, range, strength and seed of each planned effect, so any run planning
+    the same clip reuses it. Least recently used clips are evicted by 'evict'.
+
+    Args:
+        directory (str): Directory of cached clips
+        source_file (str): Source video the clips are rendered from
+        max_bytes (int, optional): Disk cap of all cached clips (Defaults to 2 GiB)
+    """
+
+    def __init__(self, directory: str, source_file: str, max_bytes: int = 2 * 2 ** 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.source = file_identity(source_file)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def key(self, plan: RenderPlan, seed: int) -> str:
+        """Gets the key of a planned clip.
+
+        Args:
+            plan (RenderPlan): Plan of clip
+            seed (int): Seed of random choices made while rendering clip
+
+        Returns:
+            str: Key of clip
+        """
+        entry = plan_entry(plan, seed, max_frames=None)
+        del entry["max_frames"]
+        for effect, segment in zip(entry["effects"], plan.segments):
+            effect["params"] = describe(segment.effect)
+        content = json.dumps([self.source, entry], sort_keys=True)
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def get(self, key: str) -> str:
+        """Looks up a cached clip and marks it as recently used.
+
+        Args:
+            key (str): Key of clip
+
+        Returns:
+            str: File of cached clip, None if it is not cached
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += os.path.getsize(path)
+        os.utime(path)
+        return path
+
+    def writer(self, key: str, size: Tuple[int, int], fps: float) -> PipeWriter:
+        """Opens a writer of a clip to cache, which is stored by 'store'.
+
+        Args:
+            key (str): Key of clip
+            size (Tuple[int, int]): Width and height of clip
+            fps (float): Frames per second of clip
+
+        Returns:
+            PipeWriter: Writer of clip
+        """
+        path = os.path.join(
+            self.directory, f"{key}.{os.getpid()}.part{CACHE_EXTENSION}"
+        )
+        return PipeWriter(path, size, fps, **CACHE_ENCODING)
+
+    def store(self, key: str, writer: PipeWriter, complete: bool = True):
+        """Closes a writer opened by 'writer' and stores its clip if it is complete.
+
+        Args:
+            key (str): Key of clip
+            writer (PipeWriter): Writer of clip
+            complete (bool, optional): Whether the whole clip was written
+        """
+        try:
+            writer.close()
+        except IOError:
+            complete = False
+        if complete and os.path.exists(writer.path):
+            os.replace(writer.path, self._path(key))
+        elif os.path.exists(writer.path):
+            os.remove(writer.path)
+
+    def evict(self):
+        """Removes least recently used clips until the cache fits its disk cap."""
+        files = [
+            os.path.join(self.directory, f)
+            for f in os.listdir(self.directory)
+            if f.endswith(CACHE_EXTENSION) and ".part" not in f
+        ]
+        files.sort(key=os.path.getmtime, reverse=True)
+        nbytes = 0
+        # Always keep the most recent clip even if it alone exceeds the cap
+        for i, path in enumerate(files):
+            nbytes += os.path.getsize(path)
+            if i > 0 and nbytes > self.max_bytes:
+                os.remove(path)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
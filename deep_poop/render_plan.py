@@ -0,0 +1,283 @@
+import copy
+from typing import List, Tuple
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+import deep_poop.effects.utils as utils
+from deep_poop.clips.segmented_clip import SegmentedClip
+from deep_poop.config import FRAME_WINDOW
+from deep_poop.effects.effect import (
+    AudioEffect,
+    Effect,
+    ImageEffect,
+    VideoEffect,
+    transform_clip,
+)
+from deep_poop.frame_pool import FramePool
+from deep_poop.scene import Scene
+
+
+class EffectSegment:
+    """An effect applied on a range of frames of a scene.
+
+    Args:
+        effect (Effect): Effect to apply, initialized for this segment if it can be composited
+        scene (Scene): Subscene the effect is applied on
+        start_frame (int): First frame of segment in planned scene
+        strength (float): Strength of effect (0-1)
+        seed (int, optional): Seed of random choices made by effect. If None use global random state
+        points (List[Tuple[float, float]], optional): Points of strength interpolation chosen for effect
+    """
+
+    def __init__(
+        self,
+        effect: Effect,
+        scene: Scene,
+        start_frame: int,
+        strength: float,
+        seed: int = None,
+        points: List[Tuple[float, float]] = None,
+    ):
+        self.effect = effect
+        self.scene = scene
+        self.start_frame = start_frame
+        # Rounding of the subscene range may leave one frame less metadata than frames
+        self.end_frame = start_frame + min(scene.frame_length(), len(scene.frames))
+        self.strength = strength
+        self.seed = seed
+        self.points = points
+
+
+class SegmentCompositor:
+    """Applies the image effects of all segments covering a frame, one after another.
+
+    Args:
+        segments (List[EffectSegment]): Segments of image effects with detached scenes
+    """
+
+    def __init__(self, segments: List[EffectSegment]):
+        self.segments = segments
+
+    def apply_frame(self, frame: np.ndarray, scene: Scene, index: int) -> np.ndarray:
+        for segment in self.segments:
+            if segment.start_frame <= index < segment.end_frame:
+                frame = segment.effect.apply_frame(
+                    frame, segment.scene, index - segment.start_frame
+                )
+        return frame
+
+
+class RenderPlan:
+    """Timeline of effects on a scene which is rendered in a single pass.
+
+    Video effects reorder source frames first. Image effects of all segments covering
+    an output frame are then applied in the order they were added, while decoding
+    each frame once. Audio effects are applied in order on the audio samples, which
+    are read once. Effects of any other kind are applied on the composited clip and
+    spliced into a flat segment list instead of nesting concatenated clips.
+
+    Args:
+        scene (Scene): Scene to apply effects on
+        window (int, optional): Amount of frames to decode and transform at once
+    """
+
+    def __init__(self, scene: Scene, window: int = FRAME_WINDOW):
+        self.scene = scene
+        self.window = window
+        self.segments: List[EffectSegment] = []
+
+    def add(
+        self,
+        effect: Effect,
+        start: float,
+        end: float,
+        strength: float,
+        seed: int = None,
+    ) -> EffectSegment:
+        """Adds an effect applied on a time range of the scene.
+
+        Args:
+            effect (Effect): Effect to apply
+            start (float): Start of effect in seconds
+            end (float): End of effect in seconds
+            strength (float): Strength of effect (0-1)
+            seed (int, optional): Seed of random choices made by effect. If None use global random state
+
+        Returns:
+            EffectSegment: Planned segment
+        """
+        scene = self.scene.subscene(start, end)
+        points = None
+        if self._can_composite(effect):
+            effect.reseed(seed)
+            effect.initialize_effect(scene, strength)
+            interpolator = getattr(effect, "interpolator", None)
+            if interpolator is not None:
+                points = interpolator.points
+            # Keep the state of this application as the effect may be reused later
+            effect = copy.copy(effect)
+        segment = EffectSegment(
+            effect,
+            scene,
+            scene.start_frame_index - self.scene.start_frame_index,
+            strength,
+            seed,
+            points,
+        )
+        self.segments.append(segment)
+        return segment
+
+    def detached(self) -> "RenderPlan":
+        """Returns a picklable copy of this plan for rendering in another process.
+
+        Returns:
+            RenderPlan: Plan with detached scenes
+        """
+        return self._with_scenes(lambda scene: scene.detached())
+
+    def attached(self, source_clip: VideoClip) -> "RenderPlan":
+        """Returns a copy of a detached plan which reads frames from the source video.
+
+        Args:
+            source_clip (VideoClip): Clip of the whole video the scene was cut from
+
+        Returns:
+            RenderPlan: Plan ready to render
+        """
+        return self._with_scenes(lambda scene: scene.attached(source_clip))
+
+    def _with_scenes(self, convert) -> "RenderPlan":
+        plan = RenderPlan(convert(self.scene), self.window)
+        for segment in self.segments:
+            segment = copy.copy(segment)
+            segment.scene = convert(segment.scene)
+            plan.segments.append(segment)
+        return plan
+
+    @staticmethod
+    def _can_composite(effect: Effect) -> bool:
+        return isinstance(effect, (ImageEffect, AudioEffect, VideoEffect))
+
+    def render(self, workers: int = 1, pool: FramePool = None) -> VideoClip:
+        """Renders all planned effects on the scene clip.
+
+        Args:
+            workers (int, optional): Amount of workers to process frames with if no pool is given
+            pool (FramePool, optional): Long-lived worker pool to process frames with
+
+        Returns:
+            VideoClip: Scene clip with applied effects
+        """
+        if len(self.segments) == 0:
+            return self.scene.clip
+        source_frames = self._source_frames()
+        video = self._render_video(source_frames, workers, pool)
+        video.audio = self._render_audio(source_frames)
+        opaque_segments = [
+            s for s in self.segments if not self._can_composite(s.effect)
+        ]
+        if len(opaque_segments) == 0:
+            return video
+        edited = SegmentedClip(video)
+        for segment in opaque_segments:
+            segment.effect.reseed(segment.seed)
+            self._apply_on_clip(edited, segment, workers, pool)
+        return edited.to_clip()
+
+    def _source_frames(self) -> np.ndarray:
+        source_frames = np.arange(self.scene.frame_length())
+        for segment in self.segments:
+            if not isinstance(segment.effect, VideoEffect):
+                continue
+            start, end = segment.start_frame, min(segment.end_frame, len(source_frames))
+            segment.effect.reseed(segment.seed)
+            order = segment.effect.frame_order(end - start)
+            # Keep remaining frames in place if the effect returned fewer frames
+            order = np.concatenate([order, np.arange(len(order), end - start)])
+            source_frames[start:end] = source_frames[start:end][order[: end - start]]
+        return source_frames
+
+    def _render_video(
+        self, source_frames: np.ndarray, workers: int, pool: FramePool
+    ) -> VideoClip:
+        image_segments = []
+        for segment in self.segments:
+            if isinstance(segment.effect, ImageEffect):
+                image_segment = copy.copy(segment)
+                image_segment.scene = segment.scene.detached()
+                image_segments.append(image_segment)
+        in_order = np.array_equal(source_frames, np.arange(len(source_frames)))
+        if len(image_segments) == 0 and in_order:
+            return self.scene.clip.copy()
+        return transform_clip(
+            self.scene.clip,
+            SegmentCompositor(image_segments),
+            self.scene.detached(),
+            workers=workers,
+            pool=pool,
+            window=self.window,
+            source_frames=None if in_order else source_frames,
+        )
+
+    def _render_audio(self, source_frames: np.ndarray):
+        audio = self.scene.clip.audio
+        audio_segments = [s for s in self.segments if isinstance(s.effect, AudioEffect)]
+        in_order = np.array_equal(source_frames, np.arange(len(source_frames)))
+        if len(audio_segments) == 0 and in_order:
+            return audio.copy()
+        samples = utils.audio_to_frames(audio)
+        samples_per_frame = audio.fps / self.scene.clip.fps
+        if not in_order:
+            samples = move_samples(samples, source_frames, samples_per_frame)
+        for segment in audio_segments:
+            start = int(round(segment.start_frame * samples_per_frame))
+            end = int(round(segment.end_frame * samples_per_frame))
+            segment.effect.reseed(segment.seed)
+            samples[start:end] = segment.effect.apply_audio(
+                samples[start:end], audio.fps
+            )
+        return utils.frames_to_audio(samples, audio.fps)
+
+    def _apply_on_clip(
+        self,
+        edited: SegmentedClip,
+        segment: EffectSegment,
+        workers: int,
+        pool: FramePool,
+    ):
+        """Splices an effect which cannot be composited into a range of an edited clip."""
+        video = edited.to_clip()
+        scene = Scene(video_clip=video, start_frame_index=self.scene.start_frame_index)
+        scene.frames = self.scene.frames
+        transformed_clip = segment.effect.apply(
+            scene=scene.subscene(
+                segment.start_frame / video.fps, segment.end_frame / video.fps
+            ),
+            strength=segment.strength,
+            workers=workers,
+            pool=pool,
+        )
+        edited.splice(segment.start_frame, segment.end_frame, transformed_clip)
+
+
+def move_samples(
+    samples: np.ndarray, source_frames: np.ndarray, samples_per_frame: float
+) -> np.ndarray:
+    """Moves the audio samples of each frame along with a reordering of frames.
+
+    Args:
+        samples (np.ndarray): Audio samples of scene
+        source_frames (np.ndarray): Index of source frame for each frame
+        samples_per_frame (float): Amount of audio samples per video frame
+
+    Returns:
+        np.ndarray: Reordered audio samples
+    """
+    sample_indices = np.arange(len(samples))
+    frames = np.minimum(
+        (sample_indices / samples_per_frame).astype(int), len(source_frames) - 1
+    )
+    offsets = sample_indices - frames * samples_per_frame
+    sources = (source_frames[frames] * samples_per_frame + offsets).astype(int)
+    return samples[np.clip(sources, 0, len(samples) - 1)]
@@ -1,13 +1,22 @@
-from typing import List
+from typing import List, Tuple
 import math
 import os
 import pickle
 
+import numpy as np
 from moviepy.editor import VideoFileClip, VideoClip
 from face_feature_recognizer.face_feature_recognizer import FaceFeatureRecognizer
 
-from deep_poop.clips.cut_clip import FullFrame, CutClip
-from deep_poop.config import using_gpu, skip_faces
+from deep_poop.analytics.analysis_cache import ANALYSIS_STATS, AnalysisCache
+from deep_poop.analytics.resolution import (
+    analysis_downscale,
+    downscale_image,
+    upscale_faces,
+)
+from deep_poop.clips.cut_clip import FullFrame
+from deep_poop.clips.frame_info import FrameInfo
+from deep_poop.clips.frame_stream import frame_windows
+from deep_poop.config import FRAME_WINDOW, using_gpu, skip_faces
 from deep_poop.analytics.face_detect import (
     face_locations,
     batch_face_locations,
@@ -15,7 +24,8 @@ from deep_poop.analytics.face_detect import (
 
 
 class VideoCache:
-    """Helper class for storing cached information of a video
+    """Helper class for storing cached information of a video.
+    Superseded by AnalysisCache, only kept to load and migrate old caches.
 
     Args:
         video_clip (VideoClip): Video clip of scene
@@ -45,23 +55,39 @@ class VideoCache:
         return self.frames[from_frame:to_frame]
 
 
+class ClipInfo:
+    """Picklable stand-in for a video clip which only holds its timing.
+
+    Args:
+        fps (float): Frames per second of clip
+        duration (float): Duration of clip in seconds
+    """
+
+    def __init__(self, fps: float, duration: float):
+        self.fps = fps
+        self.duration = duration
+
+
 class Scene:
     """Metadata about a scene in a video.
 
     Args:
         video_clip (VideoClip): Video clip of scene
-        start_frame_index (int): Global index of where the first frame of this scene is in original video
+        start_frame_index (int, optional): Global index of where the first frame of this scene is in original video. Defaults to 0.
         subscenes (List[Scene], optional): List of subscenes in scene. Defaults to empty list.
+        analysis_width (int, optional): Width frames are downscaled towards for face detection. Face boxes are in source coordinates. If None detect faces at source resolution. Defaults to None.
     """
 
     def __init__(
         self,
         video_clip: VideoClip,
-        start_frame_index: int,
+        start_frame_index: int = 0,
         subscenes: "List[Scene]" = [],
-        cache: VideoCache = None,
+        cache: AnalysisCache = None,
+        analysis_width: int = None,
     ):
         self.subscenes = subscenes
+        self.analysis_width = analysis_width
         self.clip = video_clip
         self.cache = cache
         self.start_frame_index = start_frame_index
@@ -74,55 +100,171 @@ class Scene:
     def end_frame_index(self):
         return self.start_frame_index + self.frame_length()
 
-    def enable_cache(self, cache_file: str):
-        cache = VideoCache.from_file(cache_file)
-        if cache is None:
-            cache = VideoCache(cache_file, self.frames)
-        else:
-            cached_frames = cache.read(self.start_frame_index, self.end_frame_index)
-            if len(cached_frames) == self.frame_length():
-                self.frames = cached_frames
-            else:
-                print(
-                    f"WARNING: Cached file {cache_file} contained invalid amount of frames. Skipping cache..."
-                )
-        self.cache = cache
+    @property
+    def frames(self) -> List[FrameInfo]:
+        """Metadata of each frame in scene, None for frames not analyzed yet."""
+        return self._frames
 
-    def analyze_frames(self, keep_face_for_frames: int = 3) -> List[FullFrame]:
-        """Analyzes each frame of scene clip for metadata"""
-        video_frames: List[FullFrame] = CutClip(self.clip).frames
-        frames_to_analyze = []
-        for i, frame in enumerate(self.frames):
-            if frame is None:
-                frames_to_analyze.append((i, video_frames[i]))
-
-        if not skip_faces():
-            image_frames = []
-            for i in range(len(frames_to_analyze)):
-                if i % keep_face_for_frames == 0:
-                    image_frames.append(frames_to_analyze[i][1].video_frame)
-            if using_gpu():
-                frames_face_locations = batch_face_locations(
-                    image_frames, batch_size=16
-                )
-            else:
-                frames_face_locations = [
-                    face_locations(f.video_frame) for f in image_frames
+    @frames.setter
+    def frames(self, frames: List[FrameInfo]):
+        self._frames = frames
+        self._faces_amount = max(
+            (f.faces_amount() for f in frames if f is not None), default=0
+        )
+
+    def _set_frames(self, start: int, frames: List[FrameInfo]):
+        """Stores metadata of a range of frames and updates the scene aggregates."""
+        self._frames[start : start + len(frames)] = frames
+        self._faces_amount = max(
+            [self._faces_amount] + [f.faces_amount() for f in frames if f is not None]
+        )
+
+    def enable_cache(self, cache_dir: str, legacy_cache_file: str = None):
+        """Loads cached analysis results of scene and stores new results in cache.
+
+        Args:
+            cache_dir (str): Directory of analysis cache
+            legacy_cache_file (str, optional): Pickled VideoCache to migrate if cache does not exist yet
+        """
+        self.cache = AnalysisCache.open(
+            cache_dir, self.end_frame_index, legacy_cache_file
+        )
+        self.frames = self.cache.read(self.start_frame_index, self.end_frame_index)
+
+    def analyze_frames(
+        self, keep_face_for_frames: int = 3, window: int = FRAME_WINDOW
+    ) -> List[FrameInfo]:
+        """Analyzes each frame of scene clip for metadata.
+
+        Frames analyzed before, by this scene or any scene sharing its cache, are served
+        from cache. Only ranges of missing frames are decoded, seeking directly to them,
+        and analyzed in windows. Results of each window are appended to the cache if
+        enabled.
+
+        Args:
+            keep_face_for_frames (int, optional): Detect faces every n analyzed frames and keep them for the frames in between
+            window (int, optional): Maximum amount of decoded frames held in memory
+        """
+        self._read_cached_frames()
+        missing = self.missing_frame_ranges()
+        decoded = sum(end - start for start, end in missing)
+        ANALYSIS_STATS.cached += len(self.frames) - decoded
+        ANALYSIS_STATS.decoded += decoded
+        for range_start, range_end in missing:
+            analyzed = 0
+            last_faces = []
+            for start, video_frames in frame_windows(
+                self._range_clip(range_start, range_end), window
+            ):
+                to_analyze = [
+                    (range_start + start + i, video_frame)
+                    for i, video_frame in enumerate(video_frames)
+                    if range_start + start + i < range_end
                 ]
-            for i in range(len(frames_to_analyze)):
-                if i % keep_face_for_frames != 0:
-                    frames_face_locations.insert(i, frames_face_locations[i - 1])
-            for frame, faces in zip(frames_to_analyze, frames_face_locations):
-                index = frame[0]
-                video_frames[index].face_locations = faces
-                self.frames[index] = video_frames[index]
-        self.cache.write(self.start_frame_index, self.frames)
+                last_faces = self._analyze_window(
+                    to_analyze, analyzed, keep_face_for_frames, last_faces
+                )
+                analyzed += len(to_analyze)
+
+    def missing_frame_ranges(self) -> List[Tuple[int, int]]:
+        """Gets ranges of frames which have not been analyzed.
+
+        Returns:
+            List[Tuple[int, int]]: Start and end (exclusive) of each range
+        """
+        missing = np.array([f is None for f in self.frames], dtype=np.int8)
+        edges = np.flatnonzero(np.diff(missing, prepend=0, append=0))
+        return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2])]
+
+    def _read_cached_frames(self):
+        """Fills frames analyzed through other scenes sharing the cache."""
+        if self.cache is None:
+            return
+        for start, end in self.missing_frame_ranges():
+            self._set_frames(
+                start,
+                self.cache.read(
+                    self.start_frame_index + start, self.start_frame_index + end
+                ),
+            )
+
+    def _range_clip(self, start: int, end: int) -> VideoClip:
+        if start == 0 and end >= self.frame_length():
+            return self.clip
+        clip = self.clip.subclip(start / self.clip.fps, end / self.clip.fps)
+        # Hack to disable close as clip would close io reader on deletion
+        clip.close = lambda *args: None
+        return clip
+
+    def _analyze_window(
+        self,
+        to_analyze: list,
+        analyzed: int,
+        keep_face_for_frames: int,
+        last_faces: list,
+    ) -> list:
+        """Stores metadata of a window of decoded frames.
+
+        Args:
+            to_analyze (list): Index and image of each frame to analyze
+            analyzed (int): Amount of frames analyzed before this window
+            keep_face_for_frames (int): Detect faces every n analyzed frames
+            last_faces (list): Face locations of last analyzed frame before this window
+
+        Returns:
+            list: Face locations of last analyzed frame
+        """
+        if len(to_analyze) == 0:
+            return last_faces
+        image_height, image_width = to_analyze[0][1].shape[:2]
+        factor = analysis_downscale(image_width, self.analysis_width)
+        detect = [
+            downscale_image(image, factor)
+            for i, (_, image) in enumerate(to_analyze, analyzed)
+            if i % keep_face_for_frames == 0
+        ]
+        if skip_faces():
+            detected = [[] for _ in detect]
+        elif using_gpu():
+            detected = batch_face_locations(detect, batch_size=16)
+        else:
+            detected = [face_locations(image) for image in detect]
+        detected = iter(
+            upscale_faces(
+                faces,
+                (image_width, image_height),
+                (image.shape[1], image.shape[0]),
+            )
+            for faces, image in zip(detected, detect)
+        )
+        frames = []
+        for i in range(analyzed, analyzed + len(to_analyze)):
+            if i % keep_face_for_frames == 0:
+                last_faces = next(detected)
+            frames.append(FrameInfo(last_faces))
+        # Windows always cover a contiguous range of frames
+        self._set_frames(to_analyze[0][0], frames)
+        if self.cache is not None:
+            self.cache.write(self.start_frame_index + to_analyze[0][0], frames)
+        return last_faces
 
     def has_faces(self) -> bool:
         return self.faces_amount() > 0
 
     def faces_amount(self) -> int:
-        return max([len(f.face_locations) for f in self.frames])
+        """Gets the highest amount of faces in any analyzed frame of scene."""
+        return self._faces_amount
+
+    def video_frame(self, index: int) -> np.ndarray:
+        """Reads the image of a frame from the scene clip.
+
+        Args:
+            index (int): Index of frame in scene
+
+        Returns:
+            np.ndarray: Image of frame
+        """
+        return self.clip.get_frame(index / self.clip.fps)
 
     def length(self) -> float:
         """Gets length of scene in seconds
@@ -140,6 +282,43 @@ class Scene:
         """
         return math.ceil(self.clip.duration * self.clip.fps)
 
+    def detached(self) -> "Scene":
+        """Returns a picklable copy of this scene for use in worker processes.
+
+        The copy keeps timing and per frame metadata but no clip, cache or pixel data.
+
+        Returns:
+            Scene: Detached copy of scene
+        """
+        scene = Scene(
+            video_clip=ClipInfo(self.clip.fps, self.clip.duration),
+            start_frame_index=self.start_frame_index,
+            analysis_width=self.analysis_width,
+        )
+        scene.frames = list(self.frames)
+        return scene
+
+    def attached(self, source_clip: VideoClip) -> "Scene":
+        """Returns a copy of a detached scene which reads its frames from the source video.
+
+        Args:
+            source_clip (VideoClip): Clip of the whole video the scene was cut from
+
+        Returns:
+            Scene: Scene with clip
+        """
+        start = self.start_frame_index / source_clip.fps
+        end = min(start + self.clip.duration, source_clip.duration)
+        scene = Scene(
+            video_clip=source_clip.subclip(start, end),
+            start_frame_index=self.start_frame_index,
+            analysis_width=self.analysis_width,
+        )
+        # Hack to disable close as clip would close io reader on deletion
+        scene.clip.close = lambda *args: None
+        scene.frames = list(self.frames)
+        return scene
+
     def subscene(self, start: float, end: float):
         """Returns a subscene of this scene with shorter or equal clip duration.
 
@@ -157,9 +336,10 @@ class Scene:
         subscene = Scene(
             start_frame_index=self.start_frame_index + start_frame,
             video_clip=self.clip.subclip(start, end),
-            cache=self.cache,
+            analysis_width=self.analysis_width,
         )
         # Hack to disable close as clip would close io reader on deletion
         subscene.clip.close = lambda *args: None
+        subscene.cache = self.cache
         subscene.frames = self.frames[start_frame:end_frame]
         return subscene
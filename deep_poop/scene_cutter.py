@@ -1,13 +1,189 @@
 from genericpath import exists
-from typing import List
+from typing import List, Tuple
+import json
+import math
+import multiprocessing
 import os
 
+import numpy as np
 import scenedetect
 from moviepy.editor import VideoClip
 from scenedetect import stats_manager
 
+from deep_poop.analytics.resolution import analysis_downscale
 from deep_poop.scene import Scene
 
+CONTENT_KEY = scenedetect.ContentDetector.FRAME_SCORE_KEY
+
+
+def content_cuts(scores: np.ndarray, threshold: float, min_len: int) -> List[int]:
+    """Picks scene cuts from per frame content scores like PySceneDetect's ContentDetector.
+
+    A frame starts a new scene if its score reaches the threshold and the current scene
+    is at least the minimum length long.
+
+    Args:
+        scores (np.ndarray): Content score of each frame of video, NaN for frames without score
+        threshold (float): Score at which to cut
+        min_len (int): Minimum length of scenes in frames
+
+    Returns:
+        List[int]: Frames starting a new scene
+    """
+    with np.errstate(invalid="ignore"):
+        candidates = np.flatnonzero(scores >= threshold)
+    # Index of the first candidate far enough from each candidate to cut after it, so
+    # only cuts are visited rather than every candidate
+    next_cut = np.maximum(
+        np.searchsorted(candidates, candidates + min_len),
+        np.arange(1, len(candidates) + 1),
+    )
+    cuts = []
+    i = np.searchsorted(candidates, min_len)
+    while i < len(candidates):
+        cuts.append(int(candidates[i]))
+        i = next_cut[i]
+    return cuts
+
+
+def load_content_scores(stats_file: str) -> np.ndarray:
+    """Loads content scores from a stats file saved by SceneCutter without parsing
+    other metrics.
+
+    Args:
+        stats_file (str): Stats file of SceneCutter
+
+    Returns:
+        np.ndarray: Content score of each frame of video, NaN for frames without score
+    """
+    with open(stats_file, "r") as f:
+        # Older versions of PySceneDetect write the framerate before the header
+        for skip_rows, line in enumerate(f, start=1):
+            header = line.strip().split(",")
+            if CONTENT_KEY in header:
+                break
+        else:
+            raise ValueError(f"No {CONTENT_KEY} column in {stats_file}")
+        frames, values = np.loadtxt(
+            f,
+            delimiter=",",
+            usecols=(header.index("Frame Number"), header.index(CONTENT_KEY)),
+            ndmin=2,
+            unpack=True,
+        )
+    scores = np.full(int(frames.max()) + 1 if len(frames) else 0, np.nan)
+    scores[frames.astype(int)] = values
+    return scores
+
+
+def sweep_cuts(
+    scores: np.ndarray, thresholds: List[float], min_lens: List[int]
+) -> List[dict]:
+    """Picks scene cuts for each combination of threshold and minimum scene length.
+
+    Args:
+        scores (np.ndarray): Content score of each frame of video, NaN for frames without score
+        thresholds (List[float]): Thresholds at which to cut
+        min_lens (List[int]): Minimum lengths of scenes in frames
+
+    Returns:
+        List[dict]: Threshold, minimum length and lengths in frames of scenes of each combination
+    """
+    results = []
+    for threshold in thresholds:
+        for min_len in min_lens:
+            bounds = [0] + content_cuts(scores, threshold, min_len) + [len(scores)]
+            results.append(
+                {
+                    "threshold": threshold,
+                    "min_len": min_len,
+                    "lengths": np.diff(bounds),
+                }
+            )
+    return results
+
+
+def nested_cuts(
+    scores: np.ndarray,
+    threshold: float,
+    min_len: int,
+    subscene_threshold: float,
+    subscene_min_len: int,
+) -> List[Tuple[int, int, List[Tuple[int, int]]]]:
+    """Picks scenes and subscenes within each scene from per frame content scores.
+
+    Subscenes are cut like scenes from the scores of their scene alone, so that
+    their minimum length counts from the start of the scene.
+
+    Args:
+        scores (np.ndarray): Content score of each frame of video, NaN for frames without score
+        threshold (float): Score at which to cut scenes
+        min_len (int): Minimum length of scenes in frames
+        subscene_threshold (float): Score at which to cut subscenes
+        subscene_min_len (int): Minimum length of subscenes in frames
+
+    Returns:
+        List[Tuple[int, int, List[Tuple[int, int]]]]: First and end frame of each scene with first and end frames of its subscenes
+    """
+    bounds = [0] + content_cuts(scores, threshold, min_len) + [len(scores)]
+    scenes = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        sub_bounds = (
+            [start]
+            + [
+                start + cut
+                for cut in content_cuts(
+                    scores[start:end], subscene_threshold, subscene_min_len
+                )
+            ]
+            + [end]
+        )
+        scenes.append((start, end, list(zip(sub_bounds[:-1], sub_bounds[1:]))))
+    return scenes
+
+
+def _frame_metrics(args: Tuple[str, float, int, int]) -> Tuple[dict, int]:
+    """Computes content detector metrics of a range of frames.
+
+    Args:
+        args (Tuple[str, float, int, int]): Video file, downscale factor, first frame and end of range (exclusive). If end is None compute until end of video
+
+    Returns:
+        Tuple[dict, int]: Metrics of each frame in range, and end of decoded frames
+    """
+    video_file, downscale, start, end = args
+    video_manager = scenedetect.VideoManager([video_file])
+    try:
+        stats_manager = scenedetect.StatsManager()
+        scene_manager = scenedetect.SceneManager(stats_manager)
+        # Only metrics are used, cuts are picked once scores of all frames are known
+        detector = scenedetect.ContentDetector(threshold=math.inf)
+        scene_manager.add_detector(detector)
+        video_manager.set_downscale_factor(downscale)
+        base_timecode = video_manager.get_base_timecode()
+        # Scores compare a frame with the one before, so decode one frame more
+        first = max(start - 1, 0)
+        if end is None:
+            video_manager.set_duration(start_time=base_timecode + first)
+        else:
+            video_manager.set_duration(
+                start_time=base_timecode + first, end_time=base_timecode + end
+            )
+        video_manager.start()
+        decoded = scene_manager.detect_scenes(
+            frame_source=video_manager, show_progress=False
+        )
+        keys = detector.get_metrics()
+        end = first + decoded if end is None else end
+        metrics = {
+            frame: stats_manager.get_metrics(frame, keys)
+            for frame in range(start, end)
+            if stats_manager.metrics_exist(frame, keys)
+        }
+        return metrics, first + decoded
+    finally:
+        video_manager.release()
+
 
 class SceneCutter:
     """Helper class for cutting scenes and sub-scenes
@@ -18,6 +194,8 @@ class SceneCutter:
         scene_min (int): Minimum length of scene in frames
         subscene_min (int): Minimum length of subscene in frames
         downscale (float, optional): Downscale factor when performing scene detection. If None detect value automatically (Defaults to None)
+        processes (int, optional): Amount of processes detecting scenes in time ranges of the video in parallel (Defaults to 1)
+        analysis_width (int, optional): Width frames are downscaled towards for scene and face detection. An explicit downscale takes precedence for scene detection. If None use automatic scene detection downscale and detect faces at source resolution (Defaults to None)
     """
 
     def __init__(
@@ -28,12 +206,16 @@ class SceneCutter:
         subscene_min_len: int,
         work_dir: str,
         downscale: float = None,
+        processes: int = 1,
+        analysis_width: int = None,
     ):
         self.scene_threshold = scene_threshold
         self.subscene_threshold = subscene_threshold
         self.scene_min_len = scene_min_len
         self.subscene_min_len = subscene_min_len
         self.downscale = downscale
+        self.analysis_width = analysis_width
+        self.processes = processes
         self.work_dir = work_dir
         if not os.path.exists(work_dir):
             os.makedirs(work_dir)
@@ -73,30 +255,37 @@ class SceneCutter:
     def get_scenes(self, video_clip: VideoClip, video_file: str) -> List[Scene]:
         scenes = []
         print("INFO: Splitting video into scenes")
-        scene_times = self.split_scenes(
-            video_file=video_file,
-            threshold=self.scene_threshold,
-            min_len=self.scene_min_len,
-        )
-        root_scene = Scene(video_clip=video_clip, start_frame_index=0)
-        root_scene.enable_cache(os.path.join(self.work_dir, "cache.pickle"))
-        for start, end in scene_times:
+        scene_times = self.split_nested_scenes(video_file)
+        root_scene = self.root_scene(video_clip)
+        for (start, end), subscene_times in scene_times:
             next_scene = root_scene.subscene(start, end)
-            # next_scene = Scene(video_clip=video_clip.subclip(start, end))
-            # subscene_times = self.split_scenes(
-            #     video_file=video_file,
-            #     threshold=self.subscene_threshold,
-            #     min_len=self.subscene_min_len,
-            #     start=start,
-            #     end=end,
-            # )
-            # next_scene.subscenes = [
-            #     Scene(video_clip.subclip(ss_start, ss_end))
-            #     for ss_start, ss_end in subscene_times
-            # ]
+            next_scene.subscenes = [
+                root_scene.subscene(ss_start, ss_end)
+                for ss_start, ss_end in subscene_times
+            ]
             scenes.append(next_scene)
         return scenes
 
+    def root_scene(self, video_clip: VideoClip) -> Scene:
+        """Gets the scene of a whole video, sharing the analysis cache of the video.
+
+        Args:
+            video_clip (VideoClip): Video clip of whole video
+
+        Returns:
+            Scene: Scene covering the whole video
+        """
+        root_scene = Scene(
+            video_clip=video_clip,
+            start_frame_index=0,
+            analysis_width=self.analysis_width,
+        )
+        root_scene.enable_cache(
+            os.path.join(self.work_dir, "analysis"),
+            legacy_cache_file=os.path.join(self.work_dir, "cache.pickle"),
+        )
+        return root_scene
+
     def split_scenes(
         self,
         video_file: str,
@@ -105,7 +294,123 @@ class SceneCutter:
         start: int = None,
         end: int = None,
     ) -> List[Scene]:
-        """Splits a video clip into scenes.
+        """Splits a video clip into scenes. Scene lists are cached in the work directory
+        and reused until the video file or detection parameters change.
+
+        Args:
+            video_file (str): Path to video file
+            threshold: (float): Non-similarity threshold at which to split scenes (0-100)
+            min_len (int): Minimum length of scenes in frames
+            start (int, optional): Frame to start splitting from (Defaults to None)
+            end (int, optional): Frame until to split (Defaults to None)
+
+        Returns:
+            List[Tuple]: List of scene start-end tuples
+        """
+        key = self.scene_list_key(video_file, threshold, min_len, start, end)
+        scene_lists = self.load_scene_lists()
+        if key in scene_lists:
+            return [tuple(s) for s in scene_lists[key]]
+        if self.processes > 1 and start is None and end is None:
+            scenes = self.split_scenes_sharded(video_file, threshold, min_len)
+        else:
+            scenes = self.detect_scenes(video_file, threshold, min_len, start, end)
+        scene_lists[key] = scenes
+        self.save_scene_lists(scene_lists)
+        return scenes
+
+    def split_nested_scenes(
+        self, video_file: str
+    ) -> List[Tuple[Tuple[float, float], List[Tuple[float, float]]]]:
+        """Splits a video clip into scenes and each scene into subscenes. Both are cut
+        from the content scores of one detection pass, so no frame is decoded twice and
+        no frame is decoded at all once the scores are stored in the stats file. Nested
+        scene lists are cached like the ones of 'split_scenes'.
+
+        Args:
+            video_file (str): Path to video file
+
+        Returns:
+            List[Tuple]: Start-end tuple of each scene with start-end tuples of its subscenes
+        """
+        key = self.scene_list_key(
+            video_file,
+            self.scene_threshold,
+            self.scene_min_len,
+            self.subscene_threshold,
+            self.subscene_min_len,
+        )
+        scene_lists = self.load_scene_lists()
+        if key in scene_lists:
+            return [
+                (tuple(scene), [tuple(s) for s in subscenes])
+                for scene, subscenes in scene_lists[key]
+            ]
+        scores, fps = self.content_scores(video_file)
+        scenes = [
+            ((start / fps, end / fps), [(s / fps, e / fps) for s, e in subscenes])
+            for start, end, subscenes in nested_cuts(
+                scores,
+                self.scene_threshold,
+                self.scene_min_len,
+                self.subscene_threshold,
+                self.subscene_min_len,
+            )
+        ]
+        scene_lists[key] = scenes
+        self.save_scene_lists(scene_lists)
+        return scenes
+
+    def scene_list_key(self, video_file: str, *params) -> str:
+        """Gets the key of a scene list in the scene list cache. Any change of the video
+        file or of detection parameters changes the key.
+
+        Args:
+            video_file (str): Path to video file
+            params: Detection parameters of scene list, such as threshold and minimum length
+
+        Returns:
+            str: Key of scene list
+        """
+        stat = os.stat(video_file)
+        return json.dumps(
+            [
+                os.path.abspath(video_file),
+                stat.st_size,
+                stat.st_mtime_ns,
+                self.downscale,
+                self.analysis_width,
+                *params,
+            ]
+        )
+
+    def load_scene_lists(self) -> dict:
+        scene_lists_file = os.path.join(self.work_dir, "scene_lists.json")
+        if not os.path.exists(scene_lists_file):
+            return {}
+        try:
+            with open(scene_lists_file, "r") as f:
+                return json.load(f)
+        except ValueError:
+            print("WARNING: Ignoring unreadable scene list cache")
+            return {}
+
+    def save_scene_lists(self, scene_lists: dict):
+        scene_lists_file = os.path.join(self.work_dir, "scene_lists.json")
+        # Replace atomically so an interrupted run never leaves a truncated cache
+        with open(scene_lists_file + ".part", "w") as f:
+            json.dump(scene_lists, f)
+        os.replace(scene_lists_file + ".part", scene_lists_file)
+
+    def detect_scenes(
+        self,
+        video_file: str,
+        threshold: float,
+        min_len: int,
+        start: int = None,
+        end: int = None,
+    ) -> List[Tuple[float, float]]:
+        """Splits a video clip into scenes in a single pass, without scene list cache.
 
         Args:
             video_file (str): Path to video file
@@ -120,11 +425,13 @@ class SceneCutter:
         scenes = []
         video_manager = scenedetect.VideoManager([video_file])
         try:
-            stats_file = os.path.join(self.work_dir, "scene_stats.csv")
+            stats_file = self.stats_file(video_file)
             stats_manager = self.get_stats_managers(stats_file)
             scene_manager = scenedetect.SceneManager(stats_manager)
             scene_manager.add_detector(scenedetect.ContentDetector(threshold, min_len))
-            video_manager.set_downscale_factor(self.downscale)
+            video_manager.set_downscale_factor(
+                self.detection_downscale(video_manager.get_framesize()[0])
+            )
             base_timecode = video_manager.get_base_timecode()
             if start is not None and end is not None:
                 video_manager.set_duration(
@@ -140,6 +447,132 @@ class SceneCutter:
             video_manager.release()
         return scenes
 
+    def split_scenes_sharded(
+        self, video_file: str, threshold: float, min_len: int
+    ) -> List[Tuple[float, float]]:
+        """Splits a video clip into scenes, computing content scores of equally long time
+        ranges of the video in parallel processes.
+
+        Cuts are picked from the scores of the whole video afterwards, so scenes are equal
+        to the ones of a single pass. Scores are stored in and read from the same stats
+        file as with a single pass.
+
+        Args:
+            video_file (str): Path to video file
+            threshold: (float): Non-similarity threshold at which to split scenes (0-100)
+            min_len (int): Minimum length of scenes in frames
+
+        Returns:
+            List[Tuple]: List of scene start-end tuples
+        """
+        scores, fps = self.content_scores(video_file)
+        bounds = [0] + content_cuts(scores, threshold, min_len) + [len(scores)]
+        return [(start / fps, end / fps) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def content_scores(self, video_file: str) -> Tuple[np.ndarray, float]:
+        """Gets the content score of each frame of a video from the stats file. Only
+        ranges of frames missing from it are decoded, split into equally long time
+        ranges computed by parallel processes, and their scores stored.
+
+        Args:
+            video_file (str): Path to video file
+
+        Returns:
+            Tuple[np.ndarray, float]: Content score of each frame, NaN for frames without score, and frames per second of video
+        """
+        stats_file = self.stats_file(video_file)
+        stats_manager = self.get_stats_managers(stats_file)
+        video_manager = scenedetect.VideoManager([video_file])
+        try:
+            base_timecode = video_manager.get_base_timecode()
+            frame_count = video_manager.get_duration()[0].get_frames()
+            fps = video_manager.get_framerate()
+            downscale = self.detection_downscale(video_manager.get_framesize()[0])
+        finally:
+            video_manager.release()
+        keys = scenedetect.ContentDetector().get_metrics()
+        # The first frame has no score as scores compare a frame with the one before
+        missing = np.array(
+            [False]
+            + [not stats_manager.metrics_exist(f, keys) for f in range(1, frame_count)],
+            dtype=np.int8,
+        )
+        if missing.any():
+            edges = np.flatnonzero(np.diff(missing, prepend=0, append=0))
+            shard_len = math.ceil(missing.sum() / self.processes)
+            shards = [
+                (video_file, downscale, int(start), int(min(start + shard_len, end)))
+                for range_start, end in zip(edges[::2], edges[1::2])
+                for start in range(range_start, end, shard_len)
+            ]
+            # Missing frames at the end are decoded to the end of the video, as the
+            # frame count is only an estimate
+            if edges[-1] == frame_count:
+                shards[-1] = shards[-1][:3] + (None,)
+            if self.processes > 1:
+                # Started from a server process like other worker pools, so that
+                # workers do not inherit open video readers of this process
+                context = multiprocessing.get_context("forkserver")
+                with context.Pool(self.processes) as pool:
+                    results = pool.map(_frame_metrics, shards)
+            else:
+                results = [_frame_metrics(shard) for shard in shards]
+            for metrics, _ in results:
+                for frame, values in metrics.items():
+                    stats_manager.set_metrics(frame, dict(zip(keys, values)))
+            if shards[-1][3] is None:
+                frame_count = results[-1][1]
+            stats_manager.register_metrics(keys)
+            with open(stats_file, "w") as f:
+                stats_manager.save_to_csv(f, base_timecode)
+        scores = np.array(
+            [
+                stats_manager.get_metrics(f, [CONTENT_KEY])[0]
+                if stats_manager.metrics_exist(f, [CONTENT_KEY])
+                else np.nan
+                for f in range(frame_count)
+            ],
+            dtype=float,
+        )
+        return scores, fps
+
+    def detection_downscale(self, width: int) -> int:
+        """Gets the downscale factor of frames for scene detection.
+
+        Args:
+            width (int): Width of video frames
+
+        Returns:
+            int: Downscale factor, None to let PySceneDetect pick it from the width
+        """
+        if self.downscale is not None or self.analysis_width is None:
+            return self.downscale
+        return analysis_downscale(width, self.analysis_width)
+
+    def stats_file(self, video_file: str) -> str:
+        """Gets the stats file of content scores of a video. Stored scores are removed if
+        they were computed from another version of the video or with another downscale.
+
+        Args:
+            video_file (str): Path to video file
+
+        Returns:
+            str: Path to stats file
+        """
+        stats_file = os.path.join(self.work_dir, "scene_stats.csv")
+        key_file = os.path.join(self.work_dir, "scene_stats.key")
+        key = self.scene_list_key(video_file)
+        stored_key = None
+        if os.path.exists(key_file):
+            with open(key_file, "r") as f:
+                stored_key = f.read()
+        if stored_key != key:
+            if os.path.exists(stats_file):
+                os.remove(stats_file)
+            with open(key_file, "w") as f:
+                f.write(key)
+        return stats_file
+
     def get_stats_managers(self, stats_file: str) -> scenedetect.StatsManager:
         stats_manager = scenedetect.StatsManager()
         if os.path.exists(stats_file):
@@ -1,6 +1,7 @@
 import abc
 import math
-import random
+
+import numpy as np
 
 
 class ValueGenerator:
@@ -13,21 +14,27 @@ class ValueGenerator:
         self.round_fn = round_fn
 
     @abc.abstractmethod
-    def generate(self) -> float:
+    def generate(self, rng: np.random.Generator = None) -> float:
         """Generates a float number. To be implemented by child class.
 
+        Args:
+            rng (np.random.Generator, optional): Random generator to draw from. If None use a new unseeded one
+
         Returns:
             float: Generated value
         """
         raise NotImplementedError
 
-    def generate_int(self) -> int:
+    def generate_int(self, rng: np.random.Generator = None) -> int:
         """Generates an int number rounding with round_fn
 
+        Args:
+            rng (np.random.Generator, optional): Random generator to draw from. If None use a new unseeded one
+
         Returns:
             int: Generated int value
         """
-        return self.round_fn(self.generate())
+        return self.round_fn(self.generate(rng))
 
 
 class ConstantValueGenerator(ValueGenerator):
@@ -36,7 +43,7 @@ class ConstantValueGenerator(ValueGenerator):
         super(ConstantValueGenerator, self).__init__(*args, **kwargs)
 
     @abc.abstractmethod
-    def generate(self) -> float:
+    def generate(self, rng: np.random.Generator = None) -> float:
         return self.value
 
 
@@ -47,8 +54,9 @@ class RandomValueGenerator(ValueGenerator):
         super(RandomValueGenerator, self).__init__(*args, **kwargs)
 
     @abc.abstractmethod
-    def generate(self) -> float:
-        return random.random() * (self.max_val - self.min_val) + self.min_val
+    def generate(self, rng: np.random.Generator = None) -> float:
+        rng = np.random.default_rng() if rng is None else rng
+        return rng.random() * (self.max_val - self.min_val) + self.min_val
 
 
 ZERO = ConstantValueGenerator(0)
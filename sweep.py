@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+from fire import Fire
+
+from deep_poop.scene_cutter import load_content_scores, sweep_cuts
+
+
+def sweep(
+    stats_file: str,
+    thresholds: tuple = (20, 30, 40, 50, 60, 70, 80),
+    min_lens: tuple = (15, 30, 60, 90),
+    fps: float = None,
+):
+    """Prints amount and length distribution of scenes cut from the content scores of a
+    stats file for each combination of thresholds and minimum scene lengths.
+
+    Args:
+        stats_file (str): Stats file of SceneCutter, 'scene_stats.csv' in work directory of video
+        thresholds (tuple): Non-similarity thresholds at which to split scenes (0-100)
+        min_lens (tuple): Minimum lengths of scenes in frames
+        fps (float, optional): Frames per second of video to print lengths in seconds. If None print lengths in frames (Defaults to None)
+    """
+    start = time.perf_counter()
+    scores = load_content_scores(stats_file)
+    results = sweep_cuts(scores, np.atleast_1d(thresholds), np.atleast_1d(min_lens))
+    elapsed = time.perf_counter() - start
+    unit = "frames" if fps is None else "s"
+    print(
+        f"{'threshold':>9} {'min_len':>7} {'scenes':>6} "
+        f"{'min':>8} {'p10':>8} {'median':>8} {'p90':>8} {'max':>8}  ({unit})"
+    )
+    for result in results:
+        lengths = result["lengths"] if fps is None else result["lengths"] / fps
+        percentiles = np.percentile(lengths, [0, 10, 50, 90, 100])
+        print(
+            f"{result['threshold']:>9g} {result['min_len']:>7d} {len(lengths):>6d} "
+            + " ".join(f"{p:>8.1f}" for p in percentiles)
+        )
+    print(f"{len(scores)} frames, {len(results)} settings in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    Fire(sweep)
@@ -0,0 +1,76 @@
+import pickle
+
+import numpy as np
+
+from deep_poop.analytics.analysis_cache import AnalysisCache, JOURNAL_RECORD, MAX_FACES
+from deep_poop.clips.cut_clip import FullFrame
+from deep_poop.clips.frame_info import FrameInfo
+from deep_poop.scene import VideoCache
+
+
+def analyzed_frame(faces):
+    return FrameInfo(faces)
+
+
+def test_write_range_and_reopen(tmp_path):
+    directory = str(tmp_path / "analysis")
+    cache = AnalysisCache.open(directory, 10)
+    cache.write(4, [analyzed_frame([(1, 2, 3, 4)]), None, analyzed_frame([])])
+    del cache
+    frames = AnalysisCache.open(directory, 10).read(3, 7)
+    assert frames[0] is None and frames[2] is None
+    assert frames[1].face_locations == [(1, 2, 3, 4)]
+    assert frames[3].face_locations == []
+
+
+def test_faces_are_capped(tmp_path):
+    cache = AnalysisCache.open(str(tmp_path), 1)
+    cache.write(0, [analyzed_frame([(i, i, i, i) for i in range(MAX_FACES + 3)])])
+    assert len(cache.read(0, 1)[0].face_locations) == MAX_FACES
+
+
+def test_frame_count_mismatch_recreates(tmp_path):
+    cache = AnalysisCache.open(str(tmp_path), 5)
+    cache.write(0, [analyzed_frame([])] * 5)
+    del cache
+    cache = AnalysisCache.open(str(tmp_path), 8)
+    assert len(cache) == 8
+    assert cache.read(0, 8) == [None] * 8
+
+
+def test_migrate_pickled_cache(tmp_path):
+    legacy_file = str(tmp_path / "cache.pickle")
+    frames = [None, FullFrame("pixels", "audio"), FullFrame(None, None)]
+    frames[1].face_locations = [(5, 6, 7, 8), (1, 1, 2, 2)]
+    with open(legacy_file, "wb") as f:
+        pickle.dump(VideoCache(legacy_file, frames), f)
+    cache = AnalysisCache.open(str(tmp_path / "analysis"), 3, legacy_file)
+    migrated = cache.read(0, 3)
+    assert migrated[0] is None
+    assert migrated[1] == FrameInfo([(5, 6, 7, 8), (1, 1, 2, 2)])
+    assert migrated[2].face_locations == []
+
+
+def test_writes_are_journaled_and_compacted(tmp_path):
+    directory = str(tmp_path)
+    cache = AnalysisCache(directory, 100, mode="w+", compact_after=10)
+    cache.write_frames([7, 3], [analyzed_frame([(1, 2, 3, 4)]), analyzed_frame([])])
+    assert cache.journal_records == 2
+    assert (tmp_path / "journal.bin").stat().st_size == 2 * JOURNAL_RECORD.itemsize
+    replayed = AnalysisCache.open(directory, 100).read(3, 8)
+    assert replayed[0].face_locations == [] and replayed[1] is None
+    assert replayed[4].face_locations == [(1, 2, 3, 4)]
+    cache.write(20, [analyzed_frame([])] * 8)
+    assert cache.journal_records == 0
+    assert (tmp_path / "journal.bin").stat().st_size == 0
+    assert AnalysisCache.open(directory, 100).analyzed.sum() == 10
+
+
+def test_journaled_writes_leave_columns_until_compaction(tmp_path):
+    cache = AnalysisCache(str(tmp_path), 20, mode="w+", compact_after=4)
+    cache.write_frames([5, 5], [analyzed_frame([]), analyzed_frame([(1, 2, 3, 4)])])
+    assert not np.load(str(tmp_path / "analyzed.npy")).any()
+    assert cache.read(4, 7) == [None, analyzed_frame([(1, 2, 3, 4)]), None]
+    cache.write_frames([6, 7], [analyzed_frame([])] * 2)
+    assert np.flatnonzero(np.load(str(tmp_path / "analyzed.npy"))).tolist() == [5, 6, 7]
+    assert cache.read(5, 6) == [analyzed_frame([(1, 2, 3, 4)])]
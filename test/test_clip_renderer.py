@@ -0,0 +1,44 @@
+import pickle
+
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from deep_poop.clip_renderer import PlannedClip, render_clip, render_clips
+from deep_poop.effects import Bulge, Invert
+from deep_poop.effects.warp import WARP_MAP_CACHE
+from deep_poop.render_plan import RenderPlan
+from test.conftest import test_clip
+
+
+def test_detached_plan_renders_like_plan(scene):
+    plan = RenderPlan(scene.subscene(0.1, 0.2))
+    plan.add(Invert(intensity=1), 0, 0.1, 1)
+    expected = list(plan.render().iter_frames())
+    detached = pickle.loads(pickle.dumps(plan.detached()))
+    rendered = list(detached.attached(VideoFileClip(test_clip)).render().iter_frames())
+    assert len(rendered) == len(expected)
+    for frame, expected_frame in zip(rendered, expected):
+        assert np.array_equal(frame, expected_frame)
+
+
+def test_planned_clip_is_written(scene, tmp_path):
+    plan = RenderPlan(scene)
+    plan.add(Invert(intensity=1), 0, 0.1, 1)
+    path = str(tmp_path / "clip.mp4")
+    clip = PlannedClip(plan.detached(), seed=1, path=path, max_frames=4)
+    assert render_clip(clip, VideoFileClip(test_clip)) == 4
+    assert VideoFileClip(path).duration > 0
+
+
+def test_warp_lookups_of_render_processes_are_counted(scene, tmp_path):
+    plan = RenderPlan(scene)
+    plan.add(Bulge(0, 1, intensity=1), 0, 0.1, 1, seed=2)
+    clips = [
+        PlannedClip(
+            plan.detached(), seed=1, path=str(tmp_path / f"{i}.mp4"), max_frames=4
+        )
+        for i in range(2)
+    ]
+    before = WARP_MAP_CACHE.hits + WARP_MAP_CACHE.misses
+    assert render_clips(clips, test_clip, processes=2) == [4, 4]
+    assert WARP_MAP_CACHE.hits + WARP_MAP_CACHE.misses > before
@@ -0,0 +1,61 @@
+import subprocess
+
+import pytest
+from moviepy.config import get_setting
+
+from deep_poop.concat import concat_clips, probe
+from deep_poop.pipe_writer import PipeWriter, stream_clip
+
+
+def write_clips(clip, tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = str(tmp_path / f"{i}.mp4")
+        with PipeWriter(path, size, clip.fps) as writer:
+            stream_clip(clip, [writer])
+        paths.append(path)
+    return paths
+
+
+def video_timestamps(path):
+    result = subprocess.run(
+        [
+            get_setting("FFMPEG_BINARY"),
+            "-v",
+            "error",
+            "-i",
+            path,
+            "-f",
+            "framemd5",
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return [
+        int(line.split(",")[2])
+        for line in result.stdout.decode().splitlines()
+        if line.startswith("0,")
+    ]
+
+
+def test_clips_are_joined_and_cut(clip, tmp_path):
+    paths = write_clips(clip, tmp_path, [clip.size] * 3)
+    out_file = str(tmp_path / "out.mp4")
+    assert concat_clips(paths, out_file)
+    streams, duration = probe(out_file)
+    assert streams == probe(paths[0])[0]
+    assert duration == pytest.approx(3 * clip.duration, abs=0.05)
+    frame_count = int(clip.duration * clip.fps)
+    assert video_timestamps(out_file) == list(range(3 * frame_count))
+    cut_frames = frame_count + frame_count // 2
+    assert concat_clips(paths, out_file, duration=cut_frames / clip.fps)
+    assert probe(out_file)[1] == pytest.approx(cut_frames / clip.fps, abs=0.05)
+    assert video_timestamps(out_file) == list(range(cut_frames))
+
+
+def test_clips_with_different_parameters_are_not_joined(clip, tmp_path):
+    paths = write_clips(clip, tmp_path, [clip.size, (80, 60)])
+    out_file = tmp_path / "out.mp4"
+    assert not concat_clips(paths, str(out_file))
+    assert not out_file.exists()
@@ -0,0 +1,73 @@
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from deep_poop.edl import EditDecisionList, EdlRenderer
+from deep_poop.effects import Bulge, Invert, Zoom
+from deep_poop.effects.effect_graph import EffectGraph
+from deep_poop.effects.interpolator import StrengthInterpolator
+from deep_poop.render_plan import RenderPlan
+from deep_poop.scene import Scene
+from deep_poop.value_generator import RandomValueGenerator
+from test.conftest import test_clip
+
+
+def effect_graph() -> EffectGraph:
+    graph = EffectGraph()
+    graph.add_node(Invert(intensity=1))
+    graph.add_node(
+        Zoom(
+            min_factor=1.5,
+            max_factor=2,
+            intensity=1,
+            interpolator=StrengthInterpolator(),
+        )
+    )
+    graph.add_node(
+        Bulge(
+            min_bulge=0,
+            max_bulge=1,
+            intensity=1,
+            interpolator=StrengthInterpolator(),
+            radius_generator=RandomValueGenerator(0.1, 0.5),
+            transition_time_generator=RandomValueGenerator(0, 0.2),
+        )
+    )
+    return graph
+
+
+def test_edl_is_saved_and_loaded(scene, tmp_path):
+    graph = effect_graph()
+    plan = RenderPlan(scene)
+    plan.add(graph.get_effect("Zoom"), 0, 0.1, 0.5, seed=3)
+    edl = EditDecisionList(test_clip, scene.clip.fps, scene.clip.size)
+    edl.add(plan, seed=1, max_frames=5)
+    path = str(tmp_path / "plan.json")
+    edl.save(path)
+    loaded = EditDecisionList.load(path)
+    assert loaded.size == edl.size
+    assert loaded.frame_count() == 5
+    effect = loaded.entries[0]["effects"][0]
+    assert effect["name"] == "Zoom"
+    assert effect["seed"] == 3
+    assert [tuple(p) for p in effect["points"]] == plan.segments[0].points
+
+
+def test_edl_renders_like_plan(scene, tmp_path):
+    graph = effect_graph()
+    plan = RenderPlan(scene.subscene(0.1, 0.2))
+    plan.add(graph.get_effect("Zoom"), 0, 0.1, 0.5, seed=3)
+    plan.add(graph.get_effect("Invert"), 0.03, 0.07, 1, seed=4)
+    plan.add(graph.get_effect("Bulge"), 0.02, 0.09, 1, seed=5)
+    expected = list(plan.render().iter_frames())
+    edl = EditDecisionList(test_clip, scene.clip.fps, scene.clip.size)
+    edl.add(plan, seed=1, max_frames=len(expected))
+    path = str(tmp_path / "plan.json")
+    edl.save(path)
+
+    source = VideoFileClip(test_clip)
+    renderer = EdlRenderer(Scene(video_clip=source), effect_graph())
+    entry = EditDecisionList.load(path).entries[0]
+    rendered = list(renderer.render(entry).iter_frames())
+    assert len(rendered) == len(expected)
+    for frame, expected_frame in zip(rendered, expected):
+        assert np.array_equal(frame, expected_frame)
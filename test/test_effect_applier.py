@@ -1,6 +1,7 @@
 from deep_poop.effects.effect_graph import EffectGraph
 from unittest.mock import MagicMock
 
+import numpy as np
 import pytest
 
 from deep_poop.effects.effect import Effect
@@ -11,7 +12,7 @@ from test.utils import scene_frames_identical
 
 @pytest.fixture(scope="session")
 def dummy_effect():
-    def _apply(scene, strength):
+    def _apply(scene, strength, **kwargs):
         return scene.clip
 
     dummy_effect = Effect(intensity=1, min_len=0.01, effect_type=None)
@@ -44,3 +45,13 @@ def test_effect_applier_applied(effect_applier, scene):
     effect_applier.feed_scene(scene)
     effect = effect_applier.effect_graph.effects[0]
     effect.apply.assert_called()
+
+
+def test_equal_seeds_plan_equal_effects(effect_applier, scene):
+    planned = []
+    for _ in range(2):
+        effect_applier.intensity = 0
+        plan = effect_applier.plan_scene(scene, np.random.default_rng(3))
+        planned.append([(s.start_frame, s.strength, s.seed) for s in plan.segments])
+    assert len(planned[0]) > 0
+    assert planned[0] == planned[1]
@@ -1,8 +1,22 @@
 from typing import List
+import numpy as np
 import pytest
+from moviepy.audio.AudioClip import AudioArrayClip
 from deep_poop.scene import Scene
 from deep_poop.clips.cut_clip import CutClip, FullFrame
 from deep_poop.effects.effect import EffectLengthDistribution
+from deep_poop.effects import Pitch, Shake
+from deep_poop.effects.audio.echo import echo
+from deep_poop.effects.audio.pitch import FAST_RES_TYPE, pitch_shift
+from deep_poop.effects.audio.robotify import oscillating_robotify, robotify
+from deep_poop.effects.image.bulge import bulge_frame
+from deep_poop.effects.image.swirl import swirl_map
+from benchmarks.reference import (
+    legacy_bulge,
+    legacy_echo,
+    legacy_oscillating_robotify,
+    legacy_robotify,
+)
 from test.utils import scene_frames_identical
 
 
@@ -113,3 +127,99 @@ def test_zoom_y(scene, zoom):
 def test_zoom_face(scene, zoom):
     zoom.center_on_face = True
     EffectTest(zoom, scene)
+
+
+@pytest.mark.parametrize(
+    "center,radius,strength",
+    [
+        ((80, 60), 40, 1.5),
+        ((31.5, 77.5), 55.3, 8),
+        ((150, 10), 70, -2),
+        ((-20, 200), 30, 4),
+    ],
+)
+def test_bulge_matches_per_pixel(center, radius, strength):
+    image = np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)
+    assert np.array_equal(
+        bulge_frame(image, center, radius, strength),
+        legacy_bulge(image, center, radius, strength),
+    )
+
+
+@pytest.mark.parametrize(
+    "center,radius,strength", [((80, 60), 30, 2), ((50.5, 70.2), 60, 13)]
+)
+def test_swirl_matches_skimage(clip, center, radius, strength):
+    skimage_transform = pytest.importorskip("skimage.transform")
+    frame = clip.get_frame(0.1)
+    expected = skimage_transform.swirl(frame, center, strength=strength, radius=radius)
+    swirled = swirl_map(frame.shape, center, radius, strength).apply(frame)
+    assert swirled.dtype == np.uint8
+    difference = np.abs(swirled.astype(np.float64) - expected * 255)
+    assert difference.mean() < 0.5
+    assert difference.max() <= 8
+
+
+def random_samples(length: int = 3000, channels: int = 2):
+    return np.random.uniform(-1, 1, (length, channels))
+
+
+@pytest.mark.parametrize("delay,strength", [(1, 0.5), (7, 0.7), (250, 1), (2999, 0.3)])
+def test_echo_matches_per_sample(delay, strength):
+    samples = random_samples()
+    # The per sample version wraps the last delay samples around to the start and
+    # leaves them without echo, so only compare with a silent tail
+    samples[-delay:] = 0
+    expected = legacy_echo(samples, delay, strength)
+    assert np.allclose(echo(samples, delay, strength)[:-delay], expected[:-delay])
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_robotify_matches_per_sample(channels):
+    samples = (
+        random_samples(channels=channels)[:, 0] if channels == 1 else random_samples()
+    )
+    assert np.allclose(robotify(samples, 13.5), legacy_robotify(samples, 13.5))
+    assert np.allclose(
+        oscillating_robotify(samples, 44100, 2, 300, 0.01),
+        legacy_oscillating_robotify(samples, 44100, 2, 300, 0.01),
+    )
+
+
+def test_pitch_shift_keeps_channels():
+    samples = random_samples(length=8000)
+    shifted = pitch_shift(samples, 8000, 3, res_type=FAST_RES_TYPE)
+    assert shifted.shape == samples.shape
+    for channel in range(2):
+        assert np.allclose(
+            shifted[:, channel],
+            pitch_shift(samples[:, channel], 8000, 3, res_type=FAST_RES_TYPE),
+        )
+
+
+def test_pitch_in_memory(scene):
+    fps = scene.clip.audio.fps
+    changed_clip = Pitch(min_steps=2, max_steps=4, intensity=1).apply(scene)
+    assert isinstance(changed_clip.audio, AudioArrayClip)
+    assert changed_clip.audio.fps == fps
+    assert changed_clip.audio.nchannels == 2
+
+
+def test_scramble_is_reproducible(scene, scramble):
+    orders = []
+    for _ in range(2):
+        scramble.reseed(5)
+        scramble.initialize_effect(scene, 1)
+        orders.append(scramble.frame_order(20))
+    assert np.array_equal(orders[0], orders[1])
+
+
+def test_shake_frames_do_not_depend_on_order(scene):
+    shake = Shake(min_strength=2, max_strength=8, intensity=1)
+    shake.reseed(5)
+    shake.initialize_effect(scene, 1)
+    image = np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)
+    forward = [shake.apply_frame(image, scene, i) for i in range(4)]
+    backward = [shake.apply_frame(image, scene, i) for i in reversed(range(4))]
+    for frame, other in zip(forward, reversed(backward)):
+        assert np.array_equal(frame, other)
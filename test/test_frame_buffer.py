@@ -0,0 +1,36 @@
+import pickle
+
+import numpy as np
+
+from deep_poop.clips.frame_buffer import SharedFrameBuffer
+
+
+def random_frames(amount: int):
+    return [np.random.randint(0, 255, (8, 6, 3), dtype=np.uint8) for _ in range(amount)]
+
+
+def test_view_shares_frames():
+    frames = random_frames(5)
+    buffer = SharedFrameBuffer.from_frames(frames)
+    view = buffer.view(2, 4)
+    assert len(view) == 2
+    assert np.array_equal(view[0], frames[2])
+    view[1] = 0
+    assert not buffer[3].any()
+
+
+def test_pickled_buffer_writes_in_place():
+    buffer = SharedFrameBuffer.from_frames(random_frames(3))
+    attached = pickle.loads(pickle.dumps(buffer.view(1, 3)))
+    attached[0] = 7
+    assert (buffer[1] == 7).all()
+
+
+def test_frames_outlive_release():
+    frames = random_frames(2)
+    buffer = SharedFrameBuffer.from_frames(frames)
+    frame = buffer[1]
+    buffer.release()
+    del buffer
+    assert np.array_equal(frame, frames[1])
+    assert np.array_equal(pickle.loads(pickle.dumps(frame)), frames[1])
@@ -0,0 +1,54 @@
+import numpy as np
+
+from deep_poop.clips.frame_stream import FrameStream, frame_windows
+
+
+def test_frame_windows_cover_clip(clip):
+    frames = list(clip.iter_frames())
+    windows = list(frame_windows(clip, window=4))
+    assert all(len(w) <= 4 for _, w in windows)
+    assert [start for start, _ in windows] == list(range(0, len(frames), 4))
+    streamed = [frame for _, window in windows for frame in window]
+    assert all(np.array_equal(a, b) for a, b in zip(frames, streamed))
+
+
+def test_stream_transforms_by_index(clip):
+    frames = list(clip.iter_frames())
+    transformed = []
+
+    def transform(window, output, first_index):
+        transformed.append((first_index, len(window)))
+        for i in range(len(window)):
+            output[i] = window[i] // 2 + first_index + i
+
+    stream = FrameStream(clip, transform, len(frames), window=4)
+    for i, frame in enumerate(frames):
+        assert np.array_equal(stream.frame(i), frame // 2 + i)
+    assert transformed == [
+        (i, min(4, len(frames) - i)) for i in range(0, len(frames), 4)
+    ]
+
+
+def test_reordered_sources_are_decoded_in_order(clip):
+    frames = list(clip.iter_frames())
+    source_frames = np.random.default_rng(0).permutation(len(frames))
+    times = []
+
+    def get_frame(t):
+        times.append(t)
+        return clip.get_frame(t)
+
+    source = clip.copy()
+    source.get_frame = get_frame
+
+    def transform(window, output, first_index):
+        output.array[:] = window.array
+
+    window = 8
+    stream = FrameStream(
+        source, transform, len(frames), window=window, source_frames=source_frames
+    )
+    for i in range(len(frames)):
+        assert np.array_equal(stream.frame(i), frames[source_frames[i]])
+    backward_seeks = sum(b < a for a, b in zip(times, times[1:]))
+    assert backward_seeks < len(frames) / window
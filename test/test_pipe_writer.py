@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from deep_poop.pipe_writer import PipeWriter, stream_clip
+
+
+def test_clips_are_streamed_into_one_file(clip, tmp_path):
+    out_file = str(tmp_path / "out.mp4")
+    clip_file = str(tmp_path / "clip.mp4")
+    frames = int(round(clip.duration * clip.fps))
+    with PipeWriter(out_file, clip.size, clip.fps) as writer:
+        with PipeWriter(clip_file, clip.size, clip.fps) as clip_writer:
+            assert stream_clip(clip, [writer, clip_writer]) == frames
+        assert stream_clip(clip, [writer], max_frames=frames - 2) == frames - 2
+        assert writer.frames_written == 2 * frames - 2
+        assert writer.samples_written == int(
+            round(writer.frames_written * writer.audio_fps / clip.fps)
+        )
+    output = VideoFileClip(out_file)
+    assert tuple(output.size) == tuple(clip.size)
+    assert len(list(output.iter_frames())) == 2 * frames - 2
+    assert output.audio is not None
+    assert os.path.exists(clip_file)
+    first = output.get_frame(0).astype(int)
+    assert np.abs(first - clip.get_frame(0)).mean() < 10
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+from moviepy.editor import VideoFileClip
+
+from deep_poop.clip_renderer import PlannedClip, stream_planned
+from deep_poop.effects import Bulge, Invert
+from deep_poop.effects.image.bulge import bulge_map
+from deep_poop.effects.interpolator import StrengthInterpolator
+from deep_poop.effects.warp import WarpMapCache
+from deep_poop.pipe_writer import PipeWriter
+from deep_poop.render_cache import RenderCache
+from deep_poop.render_plan import RenderPlan
+from test.conftest import test_clip
+
+
+def planned(scene, strength: float = 1) -> RenderPlan:
+    plan = RenderPlan(scene)
+    plan.add(Invert(intensity=1), 0, 0.1, strength, seed=2)
+    return plan
+
+
+def test_key_covers_plan(scene, tmp_path):
+    cache = RenderCache(str(tmp_path), test_clip)
+    key = cache.key(planned(scene), seed=1)
+    assert key == cache.key(planned(scene), seed=1)
+    assert key != cache.key(planned(scene), seed=2)
+    assert key != cache.key(planned(scene, strength=0.5), seed=1)
+    assert key != cache.key(planned(scene.subscene(0, 0.1)), seed=1)
+
+
+def test_key_follows_source_file(scene, tmp_path):
+    source = str(tmp_path / "clip.mp4")
+    shutil.copy(test_clip, source)
+    key = RenderCache(str(tmp_path), source).key(planned(scene), seed=1)
+    assert RenderCache(str(tmp_path), source).key(planned(scene), seed=1) == key
+    os.utime(source, ns=(0, 0))
+    assert RenderCache(str(tmp_path), source).key(planned(scene), seed=1) != key
+
+
+def test_key_ignores_run_state(scene, tmp_path):
+    cache = RenderCache(str(tmp_path), test_clip)
+    warp_cache = WarpMapCache()
+    interpolator = StrengthInterpolator()
+    effect = Bulge(0, 1, interpolator, intensity=1, warp_cache=warp_cache)
+    plan = RenderPlan(scene)
+    plan.add(effect, 0, 0.1, 1, seed=2)
+    key = cache.key(plan, seed=1)
+    warp_cache.get(bulge_map, (8, 8, 3), (4, 4), 2, 0.5)
+    interpolator.fixed_points = [(0, 1), (1, 1)]
+    effect.reseed(5)
+    assert warp_cache.misses == 1
+    assert cache.key(plan, seed=1) == key
+
+
+def test_rendered_clip_is_reused(scene, tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), test_clip)
+    written = []
+    for i in range(2):
+        plan = planned(scene)
+        clip = PlannedClip(plan, 1, None, max_frames=None).use_cache(cache)
+        path = str(tmp_path / f"{i}.mp4")
+        with PipeWriter(path, scene.clip.size, scene.clip.fps) as writer:
+            written.append(stream_planned(clip, plan, [writer]))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.bytes_saved > 0
+    assert written[0] == written[1] == scene.frame_length()
+    assert VideoFileClip(str(tmp_path / "1.mp4")).duration > 0
+
+
+def test_least_recently_used_clips_are_evicted(tmp_path):
+    cache = RenderCache(str(tmp_path), test_clip, max_bytes=10)
+    for i, key in enumerate(["a", "b", "c"]):
+        path = cache._path(key)
+        with open(path, "wb") as f:
+            f.write(b"12345678")
+        os.utime(path, (i, i))
+    assert cache.get("a") is not None
+    cache.evict()
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is None
+    assert cache.evictions == 2
@@ -0,0 +1,27 @@
+import numpy as np
+
+from deep_poop.effects import Invert
+from deep_poop.render_plan import RenderPlan, move_samples
+
+
+def test_stacked_image_effects_render_in_one_pass(scene):
+    source = list(scene.clip.iter_frames())
+    plan = RenderPlan(scene)
+    first = plan.add(Invert(intensity=1), 0, 0.1, 1)
+    second = plan.add(Invert(intensity=1), 0.05, 0.2, 1)
+    rendered = list(plan.render().iter_frames())
+    assert len(rendered) == len(source)
+    for i, (frame, source_frame) in enumerate(zip(rendered, source)):
+        inversions = sum(s.start_frame <= i < s.end_frame for s in (first, second))
+        expected = source_frame if inversions % 2 == 0 else 255 - source_frame
+        assert np.array_equal(frame, expected)
+
+
+def test_empty_plan_keeps_clip(scene):
+    assert RenderPlan(scene).render() is scene.clip
+
+
+def test_move_samples_with_frames():
+    samples = np.arange(12).reshape(6, 2)
+    moved = move_samples(samples, np.array([2, 0, 1]), 2)
+    assert moved[:, 0].tolist() == [8, 10, 0, 2, 4, 6]
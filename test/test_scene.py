@@ -0,0 +1,66 @@
+from deep_poop import scene as scene_module
+from deep_poop.analytics.analysis_cache import ANALYSIS_STATS
+from deep_poop.clips.frame_info import FrameInfo
+from deep_poop.scene import Scene
+
+
+def mean_face(images, batch_size):
+    return [[(int(image.mean()),) * 4] for image in images]
+
+
+def test_missing_frame_ranges(clip):
+    scene = Scene(video_clip=clip)
+    scene.frames = [None, None, FrameInfo(), None, FrameInfo(), FrameInfo(), None]
+    assert scene.missing_frame_ranges() == [(0, 2), (3, 4), (6, 7)]
+
+
+def test_analysis_decodes_only_missing_frames(clip, monkeypatch):
+    monkeypatch.setattr(scene_module, "batch_face_locations", mean_face)
+    scene = Scene(video_clip=clip)
+    scene.analyze_frames(keep_face_for_frames=1)
+    expected = [f.face_locations for f in scene.frames]
+    scene.frames[1] = scene.frames[2] = scene.frames[-1] = None
+    decoded = ANALYSIS_STATS.decoded
+    scene.analyze_frames(keep_face_for_frames=1)
+    assert ANALYSIS_STATS.decoded - decoded == 3
+    assert [f.face_locations for f in scene.frames] == expected
+
+
+def test_cached_scene_is_not_decoded(clip, tmp_path):
+    scene = Scene(video_clip=clip)
+    scene.enable_cache(str(tmp_path))
+    scene.analyze_frames()
+    cached_scene = Scene(video_clip=clip)
+    cached_scene.enable_cache(str(tmp_path))
+    decoded, cached = ANALYSIS_STATS.decoded, ANALYSIS_STATS.cached
+    cached_scene.analyze_frames()
+    assert ANALYSIS_STATS.decoded == decoded
+    assert ANALYSIS_STATS.cached - cached == cached_scene.frame_length()
+
+
+def test_faces_amount_follows_analysis(clip, monkeypatch):
+    monkeypatch.setattr(
+        scene_module,
+        "batch_face_locations",
+        lambda images, batch_size: [[(0, 1, 1, 0)] * 2 for _ in images],
+    )
+    scene = Scene(video_clip=clip)
+    assert scene.faces_amount() == 0
+    scene.analyze_frames()
+    assert scene.faces_amount() == 2
+    assert scene.subscene(0, 0.1).faces_amount() == 2
+
+
+def test_faces_are_detected_at_analysis_width(clip, monkeypatch):
+    analyzed_widths = []
+
+    def whole_image_face(images, batch_size):
+        analyzed_widths.extend(image.shape[1] for image in images)
+        return [[(0, image.shape[1], image.shape[0], 0)] for image in images]
+
+    monkeypatch.setattr(scene_module, "batch_face_locations", whole_image_face)
+    width, height = clip.size
+    scene = Scene(video_clip=clip, analysis_width=width // 2).subscene(0, 0.1)
+    scene.analyze_frames(keep_face_for_frames=1)
+    assert set(analyzed_widths) == {width // 2}
+    assert scene.frames[0].face_locations == [(0, width, height, 0)]
@@ -0,0 +1,148 @@
+import os
+import shutil
+
+import numpy as np
+
+from deep_poop import scene_cutter
+from deep_poop.scene_cutter import (
+    SceneCutter,
+    content_cuts,
+    load_content_scores,
+    nested_cuts,
+    sweep_cuts,
+)
+from test.conftest import test_clip
+
+
+def test_content_cuts_respect_min_len():
+    scores = np.array([np.nan, 0, 50, 60, 0, 0, 50, 0, 70])
+    assert content_cuts(scores, threshold=40, min_len=2) == [2, 6, 8]
+    assert content_cuts(scores, threshold=40, min_len=4) == [6]
+    assert content_cuts(scores, threshold=40, min_len=0) == [2, 3, 6, 8]
+
+
+def test_sweep_uses_stored_scores(tmp_path):
+    cutter = SceneCutter(10, 5, 5, 2, str(tmp_path))
+    scores, _ = cutter.content_scores(test_clip)
+    loaded = load_content_scores(str(tmp_path / "scene_stats.csv"))
+    assert np.array_equal(loaded, scores, equal_nan=True)
+    results = sweep_cuts(loaded, [10, 100], [5])
+    assert [r["threshold"] for r in results] == [10, 100]
+    assert len(results[0]["lengths"]) > 1
+    assert results[1]["lengths"].tolist() == [len(scores)]
+
+
+def test_subscenes_are_cut_within_scenes():
+    scores = np.array([np.nan, 0, 20, 0, 50, 0, 20, 20, 0, 0])
+    assert nested_cuts(scores, 40, 2, 10, 2) == [
+        (0, 4, [(0, 2), (2, 4)]),
+        (4, 10, [(4, 6), (6, 10)]),
+    ]
+
+
+def test_sharded_detection_equals_single_pass(tmp_path):
+    single = SceneCutter(10, 5, 5, 2, str(tmp_path / "single"))
+    sharded = SceneCutter(10, 5, 5, 2, str(tmp_path / "sharded"), processes=3)
+    scenes = single.split_scenes(test_clip, threshold=10, min_len=5)
+    assert len(scenes) > 1
+    assert sharded.split_scenes(test_clip, threshold=10, min_len=5) == scenes
+    # Scores are read back from the stats file without decoding again
+    assert sharded.split_scenes_sharded(test_clip, threshold=10, min_len=5) == scenes
+
+
+def test_scene_lists_are_cached_until_key_changes(tmp_path, monkeypatch):
+    video_file = str(tmp_path / "clip.mp4")
+    shutil.copy(test_clip, video_file)
+    cutter = SceneCutter(10, 5, 5, 2, str(tmp_path / "work"))
+    scenes = cutter.split_scenes(video_file, threshold=10, min_len=5)
+    detections = []
+    detect_scenes = cutter.detect_scenes
+
+    def counted(*args):
+        detections.append(args)
+        return detect_scenes(*args)
+
+    monkeypatch.setattr(cutter, "detect_scenes", counted)
+    assert cutter.split_scenes(video_file, threshold=10, min_len=5) == scenes
+    assert len(detections) == 0
+    cutter.split_scenes(video_file, threshold=20, min_len=5)
+    assert len(detections) == 1
+    os.utime(video_file, ns=(0, 0))
+    assert cutter.split_scenes(video_file, threshold=10, min_len=5) == scenes
+    assert len(detections) == 2
+
+
+def test_nested_scenes_come_from_stored_scores(tmp_path, monkeypatch):
+    cutter = SceneCutter(10, 5, 5, 2, str(tmp_path))
+    nested = cutter.split_nested_scenes(test_clip)
+    assert [scene for scene, _ in nested] == cutter.split_scenes(
+        test_clip, threshold=10, min_len=5
+    )
+    for (start, end), subscenes in nested:
+        assert subscenes[0][0] == start and subscenes[-1][1] == end
+    assert sum(len(subscenes) for _, subscenes in nested) > len(nested)
+
+    def decode(*args):
+        raise AssertionError("Video decoded again")
+
+    monkeypatch.setattr(scene_cutter, "_frame_metrics", decode)
+    cutter.subscene_threshold = 8
+    cutter.load_scene_lists = lambda: {}
+    assert [scene for scene, _ in cutter.split_nested_scenes(test_clip)] == [
+        scene for scene, _ in nested
+    ]
+
+
+def test_detection_downscale_targets_analysis_width(tmp_path):
+    cutter = SceneCutter(10, 5, 5, 2, str(tmp_path), analysis_width=640)
+    assert cutter.detection_downscale(3840) == 6
+    assert cutter.detection_downscale(480) == 1
+    assert SceneCutter(10, 5, 5, 2, str(tmp_path)).detection_downscale(3840) is None
+    explicit = SceneCutter(10, 5, 5, 2, str(tmp_path), downscale=2, analysis_width=640)
+    assert explicit.detection_downscale(3840) == 2
+
+
+def test_scores_are_recomputed_when_source_or_downscale_changes(tmp_path, monkeypatch):
+    video_file = str(tmp_path / "clip.mp4")
+    shutil.copy(test_clip, video_file)
+    work_dir = str(tmp_path / "work")
+    decoded = []
+    frame_metrics = scene_cutter._frame_metrics
+
+    def counted(args):
+        decoded.append(args)
+        return frame_metrics(args)
+
+    monkeypatch.setattr(scene_cutter, "_frame_metrics", counted)
+    scores, _ = SceneCutter(10, 5, 5, 2, work_dir).content_scores(video_file)
+    SceneCutter(10, 5, 5, 2, work_dir).content_scores(video_file)
+    assert len(decoded) == 1
+    downscaled, _ = SceneCutter(10, 5, 5, 2, work_dir, downscale=2).content_scores(
+        video_file
+    )
+    assert len(decoded) == 2
+    assert not np.array_equal(downscaled, scores, equal_nan=True)
+    os.utime(video_file, ns=(0, 0))
+    SceneCutter(10, 5, 5, 2, work_dir, downscale=2).content_scores(video_file)
+    assert len(decoded) == 3
+
+
+def test_only_missing_scores_are_decoded(tmp_path, monkeypatch):
+    cutter = SceneCutter(10, 5, 5, 2, str(tmp_path))
+    scores, _ = cutter.content_scores(test_clip)
+    stats_file = str(tmp_path / "scene_stats.csv")
+    with open(stats_file) as f:
+        lines = f.readlines()
+    with open(stats_file, "w") as f:
+        f.writelines(l for l in lines if l.split(",")[0] not in ("10", "11", "40"))
+    decoded = []
+    frame_metrics = scene_cutter._frame_metrics
+
+    def counted(args):
+        decoded.append(args[2:])
+        return frame_metrics(args)
+
+    monkeypatch.setattr(scene_cutter, "_frame_metrics", counted)
+    rescored, _ = cutter.content_scores(test_clip)
+    assert decoded == [(10, 12), (40, 41)]
+    assert np.array_equal(rescored, scores, equal_nan=True)
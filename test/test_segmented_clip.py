@@ -0,0 +1,43 @@
+import numpy as np
+from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.editor import VideoClip
+
+from deep_poop.clips.segmented_clip import SegmentedClip
+
+
+def numbered_clip(first: int, frames: int, fps: int = 10) -> VideoClip:
+    clip = VideoClip(
+        lambda t: np.full((2, 2, 3), first + int(t * fps + 1e-6), dtype=np.uint8),
+        duration=frames / fps,
+    ).set_fps(fps)
+    samples = np.repeat(np.arange(first, first + frames, dtype=float), 100)
+    return clip.set_audio(AudioArrayClip(np.stack([samples] * 2, axis=1), fps * 100))
+
+
+def test_splice_replaces_frame_range():
+    edited = SegmentedClip(numbered_clip(0, 20))
+    edited.splice(5, 8, numbered_clip(100, 2))
+    edited.splice(0, 1, numbered_clip(200, 1))
+    edited.splice(17, 19, numbered_clip(150, 3))
+    expected = [200, 1, 2, 3, 4, 100, 101] + list(range(8, 18)) + [150, 151, 152]
+    assert len(edited) == len(expected)
+    assert [edited.get_frame(i)[0, 0, 0] for i in range(len(edited))] == expected
+
+
+def test_resolved_clip_follows_segments():
+    edited = SegmentedClip(numbered_clip(0, 10))
+    edited.splice(2, 4, numbered_clip(50, 3))
+    clip = edited.to_clip()
+    assert clip.duration == 1.1
+    assert [f[0, 0, 0] for f in clip.iter_frames()] == [0, 1, 50, 51, 52] + list(
+        range(4, 10)
+    )
+    sound = clip.audio.get_frame(np.array([0.005, 0.215, 0.555]))
+    assert sound[:, 0].tolist() == [0, 50, 4]
+
+
+def test_resolved_clip_ignores_later_splices():
+    edited = SegmentedClip(numbered_clip(0, 10))
+    clip = edited.to_clip()
+    edited.splice(0, 10, numbered_clip(50, 2))
+    assert clip.get_frame(0.5)[0, 0, 0] == 5
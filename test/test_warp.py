@@ -0,0 +1,44 @@
+import numpy as np
+
+from deep_poop.effects import Bulge
+from deep_poop.effects.image.bulge import bulge_map
+from deep_poop.effects.warp import WarpMapCache
+from deep_poop.frame_pool import FramePool
+
+SHAPE = (60, 80, 3)
+
+
+def test_warp_cache_quantizes_strength():
+    cache = WarpMapCache(strength_step=0.5, center_step=0)
+    first = cache.get(bulge_map, SHAPE, (40, 30), 20, 2.1)
+    second = cache.get(bulge_map, SHAPE, (40, 30), 20, 1.9)
+    assert first is second
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_warp_cache_evicts_least_recently_used():
+    warp_map = bulge_map(SHAPE, (40, 30), 20, 2)
+    cache = WarpMapCache(max_bytes=2 * warp_map.nbytes, strength_step=0)
+    for strength in [1, 2, 3]:
+        cache.get(bulge_map, SHAPE, (40, 30), 20, strength)
+    cache.get(bulge_map, SHAPE, (40, 30), 20, 1)
+    assert cache.evictions >= 1
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.stats()["misses"] == 4
+
+
+def test_warp_map_only_changes_region():
+    image = np.random.randint(0, 255, SHAPE, dtype=np.uint8)
+    warped = bulge_map(SHAPE, (10, 10), 5, 3).apply(image)
+    assert np.array_equal(warped[20:], image[20:])
+
+
+def test_warp_cache_counts_lookups_of_workers(scene):
+    cache = WarpMapCache()
+    effect = Bulge(0, 1, intensity=1, warp_cache=cache)
+    effect.reseed(1)
+    with FramePool(2) as pool:
+        frames = list(effect.apply(scene, pool=pool).iter_frames())
+    assert cache.hits + cache.misses == len(frames)
+    assert cache.misses > 0